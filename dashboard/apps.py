@@ -1,4 +1,16 @@
+import os
+import sys
 from django.apps import AppConfig
 
 class DashboardConfig(AppConfig):
     name = 'dashboard'
+
+    def ready(self):
+        from . import signals, checks  # noqa: F401
+        from .instrumentacao import registrar_listener
+        # Antes de qualquer MongoClient ser criado, para valer também no cliente do djongo
+        registrar_listener()
+        # runserver: só no processo que serve (o filho do autoreloader ou com --noreload);
+        # sob ASGI quem chama é o setup/asgi.py
+        if sys.argv[1:2] == ['runserver'] and (os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv):
+            checks.avisar_indices_na_subida()
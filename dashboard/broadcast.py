@@ -0,0 +1,97 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from .models import Notificacao
+from .contadores import ler_contadores
+from .robo import ESTADO_DESCONHECIDO
+from .notificacoes import contar_nao_lidas
+from .coalescencia import coalescedor
+
+GROUP_NAME = 'dashboard_updates'
+
+STATUS_CONCLUIDO = 0
+STATUS_EM_ANDAMENTO = 1
+STATUS_PENDENTE = 2
+
+# Os frames abaixo são calculados uma única vez por evento (na view ou no consumer
+# que originou a mudança) e entregues já serializados a todos os membros do grupo,
+# então o custo no banco não cresce com o número de dashboards conectados.
+
+
+def get_dashboard_data():
+    # Uma única leitura do documento de contadores (ver dashboard.contadores)
+    contadores = ler_contadores()
+    em_andamento_count = contadores.get(f'status_{STATUS_EM_ANDAMENTO}', 0)
+    pedidos_concluidos_count = contadores.get(f'status_{STATUS_CONCLUIDO}', 0)
+    total_pedidos_count = em_andamento_count + pedidos_concluidos_count
+
+    pending_order_data = None
+    if contadores.get('pendente_id') is not None:
+        pending_order_data = {
+            'id': contadores['pendente_id'],
+            'data': contadores['pendente_data'].strftime("%d/%m/%Y %H:%M") if contadores.get('pendente_data') else "Sem data"
+        }
+
+    return {
+        'em_andamento_count': em_andamento_count,
+        'concluido_count': pedidos_concluidos_count,
+        'total_pedidos_count': total_pedidos_count,
+        'pending_order': pending_order_data,
+    }
+
+
+def frame_dashboard_update():
+    return {'type': 'dashboard_update', 'data': get_dashboard_data()}
+
+
+def frame_toast(mensagem, tipo):
+    return {
+        'type': 'dashboard_message',
+        'message_type': 'show_toast',
+        'toast_message': mensagem,
+        'toast_type': tipo
+    }
+
+
+def frame_robo_status(doc):
+    return {
+        'type': 'robo.status',
+        'status': doc.get('status', ESTADO_DESCONHECIDO) if doc else ESTADO_DESCONHECIDO,
+    }
+
+
+def serializar_notificacao(notification):
+    return {
+        'id': notification.id,
+        'titulo': notification.titulo,
+        'mensagem': notification.mensagem,
+        'data_criacao': notification.data_criacao.strftime("%d/%m/%Y %H:%M"),
+        'lida': notification.lida,
+        'tipo': notification.tipo,
+        'link': notification.link
+    }
+
+
+# Cria a notificação uma única vez e devolve o frame 'notification.new' para o grupo
+def frame_nova_notificacao(titulo, mensagem, tipo, link):
+    notification = Notificacao.objects.create(
+        titulo=titulo,
+        mensagem=mensagem,
+        tipo=tipo,
+        link=link
+    )
+    return {
+        'type': 'notification.new',
+        'notification': serializar_notificacao(notification),
+        'unread_count': contar_nao_lidas()
+    }
+
+
+# No máximo um group_send por evento (eventos próximos são mesclados, ver
+# dashboard.coalescencia); cada consumer só repassa os textos prontos ao socket
+async def broadcast(*frames, channel_layer=None):
+    channel_layer = channel_layer or get_channel_layer()
+    await coalescedor(GROUP_NAME).enviar(frames, channel_layer)
+
+
+def broadcast_sync(*frames, channel_layer=None):
+    async_to_sync(broadcast)(*frames, channel_layer=channel_layer)
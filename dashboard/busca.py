@@ -0,0 +1,119 @@
+import unicodedata
+from .models import Pedido, PEDIDO_STATUS_CHOICES
+from .catalogo import get_catalogo
+from .pedidos import PECAS_POR_MONTAGEM
+from .mongo import get_database
+
+# Busca de pedidos no servidor. Cada pedido guarda em 'busca' as chaves derivadas das
+# suas montagens, gravadas na criação e cobertas pelo índice (busca, id):
+#   'peca:<id>'          o pedido contém a peça em alguma montagem
+#   'montagem:<a>-<b>-<c>' alguma montagem é exatamente essa sequência de peças
+# As chaves usam ids de peça, então renomear uma peça no catálogo não as invalida.
+
+
+def chave_peca(peca_id):
+    return f'peca:{peca_id}'
+
+
+def chave_montagem(ids):
+    return 'montagem:' + '-'.join(str(peca_id) for peca_id in ids)
+
+
+def chaves_busca(pecas):
+    chaves = set()
+    for montagem in pecas if isinstance(pecas, list) else []:
+        if not isinstance(montagem, list):
+            continue
+        chaves.update(chave_peca(peca_id) for peca_id in montagem)
+        chaves.add(chave_montagem(montagem))
+    return sorted(chaves)
+
+
+def _normalizar(texto):
+    # 'Hexágono' e 'hexagono' são a mesma busca
+    sem_acento = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(sem_acento.lower().replace('_', ' ').split())
+
+
+STATUS_POR_NOME = {_normalizar(nome): valor for valor, nome in PEDIDO_STATUS_CHOICES}
+
+
+# Aceita o id da peça, o tipo ('hexagono') ou o nome ('Hexágono')
+def _resolver_peca(valor, catalogo):
+    texto = _normalizar(valor)
+    if texto.isdigit() and int(texto) in catalogo:
+        return int(texto)
+    for peca_id, peca in catalogo.items():
+        if texto in (_normalizar(peca.tipo), _normalizar(peca.name)):
+            return peca_id
+    raise ValueError(f'Peça não encontrada: {valor}')
+
+
+def _valores(params, nome):
+    brutos = params.getlist(nome) if hasattr(params, 'getlist') else [params.get(nome)]
+    partes = []
+    for bruto in brutos:
+        for valor in bruto if isinstance(bruto, list) else str(bruto or '').split(','):
+            if str(valor).strip():
+                partes.append(str(valor).strip())
+    return partes
+
+
+# Lê 'peca' (uma ou mais, todas precisam estar no pedido), 'montagem' (três peças, na
+# ordem) e 'search' (texto livre: id do pedido, nome de status ou peça) e devolve
+# {'pedido_id', 'status', 'busca'}. Lança ValueError com mensagem para o cliente.
+def parse_busca(params):
+    catalogo = get_catalogo()
+    resultado = {'pedido_id': None, 'status': None, 'busca': []}
+
+    for valor in _valores(params, 'peca'):
+        resultado['busca'].append(chave_peca(_resolver_peca(valor, catalogo)))
+
+    montagem = _valores(params, 'montagem')
+    if montagem:
+        if len(montagem) != PECAS_POR_MONTAGEM:
+            raise ValueError(f'Parâmetro "montagem" precisa de {PECAS_POR_MONTAGEM} peças separadas por vírgula.')
+        resultado['busca'].append(chave_montagem(_resolver_peca(valor, catalogo) for valor in montagem))
+
+    texto = _normalizar(params.get('search') or '').lstrip('#').strip()
+    if texto.isdigit():
+        resultado['pedido_id'] = int(texto)
+    elif texto in STATUS_POR_NOME:
+        resultado['status'] = STATUS_POR_NOME[texto]
+    elif texto:
+        resultado['busca'].append(chave_peca(_resolver_peca(texto, catalogo)))
+
+    resultado['busca'] = sorted(set(resultado['busca']))
+    return resultado
+
+
+# Filtro pymongo equivalente aos filtros do histórico (também usado pela exportação)
+def consulta_pedidos(status=None, data_inicio=None, data_fim=None, pedido_id=None, busca=None, **_):
+    consulta = {}
+    if status is not None:
+        consulta['status'] = status
+    intervalo = {}
+    if data_inicio is not None:
+        intervalo['$gte'] = data_inicio
+    if data_fim is not None:
+        intervalo['$lt'] = data_fim
+    if intervalo:
+        consulta['data'] = intervalo
+    if pedido_id is not None:
+        consulta['id'] = pedido_id
+    if busca:
+        consulta['busca'] = {'$all': list(busca)}
+    return consulta
+
+
+# Ids da página (id decrescente, antes do cursor) que atendem às chaves de busca.
+# Só o id é projetado, e o índice (busca, id) resolve a consulta.
+def ids_pagina_busca(filtros, cursor, limite):
+    consulta = consulta_pedidos(**filtros)
+    if cursor is not None:
+        filtro_id = {'$lt': cursor}
+        if 'id' in consulta:
+            filtro_id['$eq'] = consulta['id']
+        consulta['id'] = filtro_id
+    cursor_mongo = get_database()[Pedido._meta.db_table].find(consulta, {'_id': 0, 'id': 1})
+    return [doc['id'] for doc in cursor_mongo.sort('id', -1).limit(limite)]
@@ -0,0 +1,87 @@
+import hashlib
+import time
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from .contadores import versao_dados
+from .catalogo import versao_catalogo
+
+# GET condicional e cache de respostas das leituras (histórico, /pedidos/json/, gráfico).
+# A ETag é a versão dos dados de pedidos (dashboard.contadores, avançada a cada pedido
+# criado ou mudança de status), mais a versão do catálogo quando a resposta mostra nomes
+# de peças e o dia atual quando o período é relativo a hoje. Com a mesma ETag o cliente
+# recebe 304; sem ela, a resposta já montada sai do cache 'respostas', chaveado por
+# (ETag, caminho com parâmetros). Uma versão nova muda a chave, então nada precisa ser
+# invalidado. A ETag também muda a cada TIMEOUT do cache: alterações feitas fora da
+# aplicação (ex.: o Node-RED gravando direto no banco) não avançam a versão, e assim
+# ficam no máximo esse tempo sem aparecer.
+ALIAS_CACHE = 'respostas'
+
+
+# (índice da janela do TTL, início dela); (0, None) sem TTL
+def _janela():
+    ttl = settings.CACHES[ALIAS_CACHE].get('TIMEOUT') or 0
+    if ttl <= 0:
+        return 0, None
+    indice = int(time.time() // ttl)
+    return indice, datetime.fromtimestamp(indice * ttl, tz=dt_timezone.utc)
+
+
+# Devolve (ETag, Last-Modified). O Last-Modified tem de mudar sempre que a ETag muda,
+# senão um cliente que revalida só com If-Modified-Since recebe 304 com dados velhos:
+# é o mais novo entre a última alteração e o início da janela do TTL. O catálogo e o dia
+# não têm data de alteração, então respostas que dependem deles saem sem Last-Modified.
+def _etag(nome, catalogo, por_dia):
+    versao, alterado_em = versao_dados()
+    janela, inicio_janela = _janela()
+    partes = [nome, versao, int(alterado_em.timestamp() * 1000) if alterado_em else 0, janela]
+    if catalogo:
+        partes.append(versao_catalogo())
+    if por_dia:
+        partes.append(timezone.localdate().isoformat())
+
+    last_modified = None
+    if not catalogo and not por_dia:
+        datas = [data for data in (alterado_em, inicio_janela) if data is not None]
+        last_modified = max(datas) if datas else None
+    return '"' + '-'.join(str(parte) for parte in partes) + '"', last_modified
+
+
+def _carimbar(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # O navegador guarda a resposta, mas revalida (If-None-Match) antes de reutilizá-la
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+# Serve a resposta gerada por gerar() com ETag/Last-Modified, 304 quando o cliente já
+# tem a versão atual e cache da resposta 200. É síncrona: nas views assíncronas roda
+# inteira no executor, junto com gerar().
+def responder_versionado(request, nome, gerar, catalogo=False, por_dia=False):
+    if request.method not in ('GET', 'HEAD'):
+        return gerar()
+    etag, last_modified = _etag(nome, catalogo, por_dia)
+
+    condicional = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if condicional is not None:
+        return _carimbar(condicional, etag, last_modified)
+
+    cache = caches[ALIAS_CACHE]
+    chave = 'resposta:' + hashlib.sha1(f'{etag}|{request.get_full_path()}'.encode('utf-8')).hexdigest()
+    guardada = cache.get(chave)
+    if guardada is not None:
+        return _carimbar(HttpResponse(guardada['conteudo'], content_type=guardada['content_type']), etag, last_modified)
+
+    response = gerar()
+    if response.status_code != 200 or response.streaming:
+        return response
+    cache.set(chave, {'conteudo': response.content, 'content_type': response['Content-Type']})
+    return _carimbar(response, etag, last_modified)
@@ -0,0 +1,237 @@
+import asyncio
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import Peca, Pedido, Notificacao, TIPO_FORMA_CHOICES, PRIORIDADE_NORMAL
+from .mongo import get_database
+from .pedidos import PECAS_POR_MONTAGEM, _reservar_ids
+from .busca import chaves_busca
+from .contadores import reconciliar_contadores
+from .catalogo import invalidar_catalogo
+from .coalescencia import desembrulhar
+
+# Utilitários compartilhados pelos comandos de teste de carga/benchmark: geram uma
+# massa de dados, sobem workers Daphne em portas livres e medem requisições HTTP
+# concorrentes.
+
+# Distribuição de status dos pedidos gerados: a maior parte concluída, como em produção
+PESOS_STATUS = {0: 85, 1: 5, 2: 5, 3: 5}
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def esperar_porta(porta, timeout):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            with socket.create_connection(('127.0.0.1', porta), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def subir_daphne(porta, env_extra=None):
+    env = dict(os.environ, **(env_extra or {}))
+    return subprocess.Popen(
+        [sys.executable, '-m', 'daphne', '-b', '127.0.0.1', '-p', str(porta), 'setup.asgi:application'],
+        cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def encerrar(processos):
+    for processo in reversed(processos):
+        processo.terminate()
+    for processo in processos:
+        try:
+            processo.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            processo.kill()
+
+
+def percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return None
+    indice = min(len(valores_ordenados) - 1, int(round(p / 100 * (len(valores_ordenados) - 1))))
+    return valores_ordenados[indice]
+
+
+def resumir_latencias(latencias, duracao, erros=0):
+    ordenadas = sorted(latencias)
+    return {
+        'requisicoes': len(latencias) + erros,
+        'erros': erros,
+        'duracao_s': round(duracao, 3),
+        'req_por_s': round(len(latencias) / duracao, 1) if duracao > 0 else None,
+        'p50_ms': round(percentil(ordenadas, 50) * 1000, 2) if ordenadas else None,
+        'p95_ms': round(percentil(ordenadas, 95) * 1000, 2) if ordenadas else None,
+        'p99_ms': round(percentil(ordenadas, 99) * 1000, 2) if ordenadas else None,
+        'max_ms': round(ordenadas[-1] * 1000, 2) if ordenadas else None,
+    }
+
+
+# Chama funcao() 'repeticoes' vezes em sequência (após 'aquecimento' chamadas
+# descartadas) e resume as latências de cada chamada, como em medir_http.
+def medir_funcao(funcao, repeticoes, aquecimento=0):
+    for _ in range(aquecimento):
+        funcao()
+    latencias = []
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        antes = time.perf_counter()
+        funcao()
+        latencias.append(time.perf_counter() - antes)
+    return resumir_latencias(latencias, time.perf_counter() - inicio)
+
+
+# Dispara 'total' requisições contra host:porta com 'concorrencia' clientes, cada um
+# reutilizando sua conexão keep-alive. Respostas fora de 2xx/3xx contam como erro.
+def medir_http(porta, caminho, total, concorrencia, metodo='GET', corpo=None, host='127.0.0.1'):
+    restantes = iter(range(total))
+    trava = threading.Lock()
+    latencias, erros = [], [0]
+    cabecalhos = {'Content-Type': 'application/json'} if corpo is not None else {}
+
+    def cliente():
+        conexao = http.client.HTTPConnection(host, porta, timeout=30)
+        while True:
+            with trava:
+                if next(restantes, None) is None:
+                    break
+            inicio = time.perf_counter()
+            try:
+                conexao.request(metodo, caminho, body=corpo, headers=cabecalhos)
+                resposta = conexao.getresponse()
+                resposta.read()
+                ok = resposta.status < 400
+            except (OSError, http.client.HTTPException):
+                ok = False
+                conexao.close()
+                conexao = http.client.HTTPConnection(host, porta, timeout=30)
+            decorrido = time.perf_counter() - inicio
+            with trava:
+                if ok:
+                    latencias.append(decorrido)
+                else:
+                    erros[0] += 1
+        conexao.close()
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as pool:
+        for _ in range(concorrencia):
+            pool.submit(cliente)
+    return resumir_latencias(latencias, time.perf_counter() - inicio, erros[0])
+
+
+def _garantir_pecas():
+    if Peca.objects.count() < PECAS_POR_MONTAGEM:
+        for peca_id, (tipo, nome) in enumerate(TIPO_FORMA_CHOICES, 1):
+            Peca.objects.update_or_create(id=peca_id, defaults={'name': nome, 'tipo': tipo, 'qtd': 100})
+        invalidar_catalogo()
+    return list(Peca.objects.values_list('id', flat=True))
+
+
+def _inserir_em_lotes(modelo, total, lote, gerar_doc):
+    colecao = get_database()[modelo._meta.db_table]
+    for inicio in range(0, total, lote):
+        ids = _reservar_ids(min(lote, total - inicio), modelo)
+        colecao.insert_many([gerar_doc(doc_id) for doc_id in ids], ordered=False)
+
+
+# Semeia 'pedidos' pedidos e 'notificacoes' notificações espalhados pelos últimos 'dias'
+# dias, com insert_many em lotes e ids reservados no contador do djongo. Ao final os
+# contadores do dashboard são reconciliados. Devolve um resumo com os ids das peças.
+def gerar_dados(pedidos, notificacoes, dias=365, lote=5000, semente=None):
+    aleatorio = random.Random(semente)
+    pecas_ids = _garantir_pecas()
+    agora = timezone.now()
+    status, pesos = zip(*PESOS_STATUS.items())
+
+    def data_aleatoria():
+        return agora - timedelta(seconds=aleatorio.randrange(dias * 86400))
+
+    def pedido(doc_id):
+        montagens = [aleatorio.sample(pecas_ids, PECAS_POR_MONTAGEM) for _ in range(PECAS_POR_MONTAGEM)]
+        return {'id': doc_id, 'data': data_aleatoria(), 'pecas': montagens,
+                'status': aleatorio.choices(status, pesos)[0], 'prioridade': PRIORIDADE_NORMAL,
+                'busca': chaves_busca(montagens)}
+
+    def notificacao(doc_id):
+        return {'id': doc_id, 'titulo': f'Notificação de carga #{doc_id}', 'mensagem': 'Gerada para benchmark.',
+                'data_criacao': data_aleatoria(), 'lida': aleatorio.random() < 0.9, 'tipo': 'info', 'link': None}
+
+    _inserir_em_lotes(Pedido, pedidos, lote, pedido)
+    _inserir_em_lotes(Notificacao, notificacoes, lote, notificacao)
+    reconciliar_contadores()
+    return {'pedidos': pedidos, 'notificacoes': notificacoes, 'pecas_ids': pecas_ids}
+
+
+async def _drenar(ws, ociosidade=0.5):
+    while True:
+        try:
+            await asyncio.wait_for(ws.recv(), ociosidade)
+        except asyncio.TimeoutError:
+            return
+
+
+# Abre 'sockets' conexões em ws://127.0.0.1:porta/ws/dashboard/ e, para cada um dos
+# 'eventos', chama disparar() (síncrona, devolve o id do pedido afetado) e mede quanto
+# tempo o frame 'historico.delta' com esse id leva para chegar a cada socket.
+async def medir_fanout(porta, sockets, eventos, disparar, timeout=10.0):
+    import websockets
+
+    url = f'ws://127.0.0.1:{porta}/ws/dashboard/'
+    conexoes = await asyncio.gather(*(websockets.connect(url, max_size=None) for _ in range(sockets)))
+    latencias, ultimo_socket, perdidos = [], [], 0
+
+    async def aguardar(ws, pedido_id, inicio):
+        limite = time.perf_counter() + timeout
+        while time.perf_counter() < limite:
+            try:
+                frame = json.loads(await asyncio.wait_for(ws.recv(), limite - time.perf_counter()))
+            except asyncio.TimeoutError:
+                break
+            if any(f.get('type') == 'historico.delta' and any(p['id'] == pedido_id for p in f['pedidos'])
+                   for f in desembrulhar(frame)):
+                return time.perf_counter() - inicio
+        return None
+
+    try:
+        # Frames iniciais do connect não entram na medição
+        await asyncio.gather(*(_drenar(ws) for ws in conexoes))
+        for _ in range(eventos):
+            inicio = time.perf_counter()
+            pedido_id = await asyncio.to_thread(disparar)
+            recebidos = await asyncio.gather(*(aguardar(ws, pedido_id, inicio) for ws in conexoes))
+            entregues = [r for r in recebidos if r is not None]
+            perdidos += len(recebidos) - len(entregues)
+            latencias.extend(entregues)
+            if entregues:
+                ultimo_socket.append(max(entregues))
+    finally:
+        await asyncio.gather(*(ws.close() for ws in conexoes))
+
+    ordenadas, ultimos = sorted(latencias), sorted(ultimo_socket)
+    return {
+        'sockets': sockets,
+        'eventos': eventos,
+        'entregas': len(latencias),
+        'perdidos': perdidos,
+        'p50_ms': round(percentil(ordenadas, 50) * 1000, 2) if ordenadas else None,
+        'p99_ms': round(percentil(ordenadas, 99) * 1000, 2) if ordenadas else None,
+        'p99_ultimo_socket_ms': round(percentil(ultimos, 99) * 1000, 2) if ultimos else None,
+    }
@@ -0,0 +1,55 @@
+import threading
+import time
+from collections import namedtuple
+from django.conf import settings
+from .models import Peca
+from .versoes import proxima_versao, versao_atual
+
+# Cache em memória do catálogo de peças (id -> PecaCatalogo). O catálogo tem poucas
+# linhas e quase nunca muda, então cada processo o carrega uma vez e só o relê quando
+# a versão compartilhada em dashboard_versoes muda (conferida a cada
+# CATALOGO_VERIFICACAO_SEGUNDOS) ou quando um sinal de Peca o invalida localmente.
+CHAVE_VERSAO_CATALOGO = 'catalogo_pecas'
+
+PecaCatalogo = namedtuple('PecaCatalogo', ['id', 'name', 'tipo', 'color_hex', 'qtd'])
+
+_cache = {'pecas': None, 'versao': None, 'verificado_em': 0.0}
+_cache_lock = threading.Lock()
+
+
+def _carregar(versao):
+    pecas = {
+        p.id: PecaCatalogo(p.id, p.name, p.tipo, p.color_hex, p.qtd)
+        for p in Peca.objects.all()
+    }
+    _cache.update(pecas=pecas, versao=versao, verificado_em=time.monotonic())
+    return pecas
+
+
+# Devolve (catálogo, versão) lidos juntos, sem uma invalidação no meio
+def catalogo_com_versao():
+    with _cache_lock:
+        agora = time.monotonic()
+        if _cache['pecas'] is not None and agora - _cache['verificado_em'] < settings.CATALOGO_VERIFICACAO_SEGUNDOS:
+            return _cache['pecas'], _cache['versao']
+
+        versao = versao_atual(CHAVE_VERSAO_CATALOGO)
+        if _cache['pecas'] is not None and versao == _cache['versao']:
+            _cache['verificado_em'] = agora
+            return _cache['pecas'], versao
+        return _carregar(versao), versao
+
+
+def get_catalogo():
+    return catalogo_com_versao()[0]
+
+
+# Versão do catálogo carregado neste processo (faz parte das chaves de memoização)
+def versao_catalogo():
+    return catalogo_com_versao()[1]
+
+
+def invalidar_catalogo():
+    proxima_versao(CHAVE_VERSAO_CATALOGO)
+    with _cache_lock:
+        _cache.update(pecas=None, versao=None, verificado_em=0.0)
@@ -0,0 +1,52 @@
+import logging
+import threading
+from django.core.checks import Tags, Warning, register
+from pymongo.errors import PyMongoError
+from .indices import indices_faltando_rapido
+
+logger = logging.getLogger(__name__)
+
+_inicio = {'verificado': False}
+_inicio_trava = threading.Lock()
+
+
+def _avisos_indices():
+    try:
+        faltando = indices_faltando_rapido()
+    except PyMongoError as e:
+        return [Warning(
+            f'Não foi possível verificar os índices do MongoDB: {e}',
+            id='dashboard.W002',
+        )]
+    return [
+        Warning(
+            f'Índice "{nome}" {chave} ausente na coleção {tabela}.',
+            hint='Rode "python manage.py migrate" ou "python manage.py verificar_indices --criar".',
+            id='dashboard.W001',
+        )
+        for tabela, nome, chave in faltando
+    ]
+
+
+# Marcada como checagem de banco: o Django só passa 'databases' no 'check --database' e no
+# migrate, então os demais comandos (shell, test, makemigrations) não abrem conexão ao MongoDB
+@register(Tags.database)
+def verificar_indices(app_configs, databases=None, **kwargs):
+    if not databases:
+        return []
+    return _avisos_indices()
+
+
+# Relatório na subida do servidor (runserver e ASGI), que não roda checagens de banco.
+# Uma vez por processo, numa thread à parte: o timeout curto do pymongo não atrasa a subida
+def avisar_indices_na_subida():
+    with _inicio_trava:
+        if _inicio['verificado']:
+            return
+        _inicio['verificado'] = True
+
+    def verificar():
+        for aviso in _avisos_indices():
+            logger.warning('%s: %s %s', aviso.id, aviso.msg, aviso.hint or '')
+
+    threading.Thread(target=verificar, name='dashboard-indices', daemon=True).start()
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import threading
+import time
+from django.conf import settings
+from . import metricas
+from .codificacao import dumps_texto
+
+# Coalescência dos broadcasts de um grupo dentro do processo. Quando pedidos andam
+# rápido, cada evento (pedido criado, status alterado, despacho) geraria o seu
+# group_send com 3 a 5 frames para cada socket. O primeiro evento de uma janela de
+# BROADCAST_JANELA_MS agenda uma tarefa de descarga no event loop e, como todos os
+# seguintes, só entra no buffer e retorna: quem dispara (view, consumer) não espera a
+# janela. Ao fim dela a tarefa faz um único group_send com tudo o que chegou.
+# Um evento sozinho na janela sai como sempre saiu; vários viram um único frame 'lote'
+# em que os snapshots (dashboard_update, robo.status) ficam só com o mais novo e os
+# deltas do histórico viram um só, com a lista de versões que cobrem ('versoes').
+# A janela vale por processo: eventos de workers diferentes não se misturam.
+
+logger = logging.getLogger(__name__)
+
+TIPOS_SNAPSHOT = ('dashboard_update', 'robo.status')
+TIPO_DELTA = 'historico.delta'
+TIPO_LOTE = 'lote'
+
+GATILHOS = metricas.contador('dashboard_broadcast_triggers_total', 'Eventos de broadcast recebidos pelo coalescedor.')
+MESCLADOS = metricas.contador('dashboard_broadcast_merged_total', 'Eventos enviados junto com outro da mesma janela.')
+ENVIOS = metricas.contador('dashboard_broadcast_group_sends_total', 'group_send feitos para o grupo.')
+SUBSTITUIDOS = metricas.contador(
+    'dashboard_broadcast_frames_superseded_total', 'Frames descartados por um mais novo do mesmo tipo na mesma janela.',
+)
+
+
+def _mesclar_deltas(deltas):
+    pedidos = {}
+    versoes = []
+    for delta in sorted(deltas, key=lambda d: d['versao']):
+        versoes.extend(delta.get('versoes') or [delta['versao']])
+        for pedido in delta['pedidos']:
+            pedidos[pedido['id']] = pedido
+    return {
+        'type': TIPO_DELTA,
+        'versao': max(versoes),
+        'versoes': sorted(versoes),
+        'pedidos': sorted(pedidos.values(), key=lambda p: p['id'], reverse=True),
+    }
+
+
+# Junta os frames de vários eventos: notificações e toasts na ordem em que chegaram,
+# depois o snapshot mais novo de cada tipo e um único delta do histórico.
+# Devolve (frames, quantos frames foram substituídos).
+def mesclar_frames(eventos):
+    avulsos, snapshots, deltas = [], {}, []
+    substituidos = 0
+    for frames in eventos:
+        for frame in frames:
+            tipo = frame.get('type')
+            if tipo in TIPOS_SNAPSHOT:
+                substituidos += tipo in snapshots
+                snapshots[tipo] = frame
+            elif tipo == TIPO_DELTA:
+                deltas.append(frame)
+            else:
+                avulsos.append(frame)
+    mesclados = avulsos + [snapshots[tipo] for tipo in TIPOS_SNAPSHOT if tipo in snapshots]
+    if deltas:
+        substituidos += len(deltas) - 1
+        mesclados.append(_mesclar_deltas(deltas))
+    return mesclados, substituidos
+
+
+class Coalescedor:
+    def __init__(self, grupo):
+        self.grupo = grupo
+        self._trava = threading.Lock()
+        self._eventos = []
+        self._descarga = None
+
+    async def _group_send(self, channel_layer, frames):
+        ENVIOS.inc(metricas.rotulos(grupo=self.grupo))
+        await channel_layer.group_send(self.grupo, {
+            'type': 'broadcast.text',
+            'texts': [dumps_texto(frame) for frame in frames],
+            # Usado pela instrumentação do consumer para medir a espera na fila
+            'enviado_em': time.time()
+        })
+
+    def _descarga_pendente(self):
+        tarefa = self._descarga
+        return tarefa is not None and not tarefa.done() and not tarefa.get_loop().is_closed()
+
+    # Seguro entre threads: views síncronas chegam aqui por async_to_sync e o buffer é
+    # compartilhado. Sob o Daphne todas rodam no event loop do servidor.
+    async def enviar(self, frames, channel_layer):
+        janela = settings.BROADCAST_JANELA_MS / 1000
+        rotulos = metricas.rotulos(grupo=self.grupo)
+        GATILHOS.inc(rotulos)
+        if janela <= 0:
+            await self._group_send(channel_layer, frames)
+            return
+
+        with self._trava:
+            self._eventos.append(list(frames))
+            agendar = not self._descarga_pendente()
+            if agendar:
+                self._descarga = asyncio.get_running_loop().create_task(self._descarregar_depois(janela, channel_layer))
+        if not agendar:
+            MESCLADOS.inc(rotulos)
+
+    # Tarefa própria, desligada de quem disparou: cancelar a view ou o consumer não
+    # afeta a descarga, e eventos de outros chamadores não se perdem com eles.
+    async def _descarregar_depois(self, janela, channel_layer):
+        try:
+            await asyncio.sleep(janela)
+        except asyncio.CancelledError:
+            # O loop está encerrando antes do fim da janela (ex.: o loop temporário de um
+            # async_to_sync fora do servidor ASGI, ou o desligamento do worker): envia o
+            # que já chegou em vez de descartar
+            await self._descarregar(channel_layer)
+            raise
+        await self._descarregar(channel_layer)
+
+    async def _descarregar(self, channel_layer):
+        with self._trava:
+            eventos, self._eventos = self._eventos, []
+            if self._descarga is asyncio.current_task():
+                self._descarga = None
+        if not eventos:
+            return
+        try:
+            if len(eventos) == 1:
+                await self._group_send(channel_layer, eventos[0])
+                return
+            frames, substituidos = mesclar_frames(eventos)
+            SUBSTITUIDOS.inc(metricas.rotulos(grupo=self.grupo), substituidos)
+            await self._group_send(channel_layer, [{'type': TIPO_LOTE, 'gatilhos': len(eventos), 'frames': frames}])
+        except Exception:
+            # Ninguém aguarda esta tarefa: sem o log o erro passaria em silêncio
+            logger.exception("Erro no broadcast para o grupo %s (%d evento(s))", self.grupo, len(eventos))
+
+
+_coalescedores = {}
+_coalescedores_trava = threading.Lock()
+
+
+def coalescedor(grupo):
+    with _coalescedores_trava:
+        if grupo not in _coalescedores:
+            _coalescedores[grupo] = Coalescedor(grupo)
+        return _coalescedores[grupo]
+
+
+# Frames de uma mensagem recebida do socket, abrindo os lotes (para clientes em Python)
+def desembrulhar(frame):
+    if frame.get('type') == TIPO_LOTE:
+        return [interno for item in frame['frames'] for interno in desembrulhar(item)]
+    return [frame]
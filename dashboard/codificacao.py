@@ -0,0 +1,78 @@
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Serialização JSON única para frames do WebSocket, mensagens do channel layer e
+# respostas HTTP. O backend é escolhido por settings.JSON_BACKEND: 'orjson' (bem mais
+# rápido em payloads grandes como o histórico), 'stdlib' ou 'auto' (orjson se estiver
+# instalado). Os dois codificam datas nativamente em ISO 8601 e recorrem ao
+# DjangoJSONEncoder para tipos como Decimal e textos traduzíveis.
+
+_padrao = DjangoJSONEncoder().default
+
+
+class _Stdlib:
+    nome = 'stdlib'
+
+    def dumps(self, obj):
+        return json.dumps(obj, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, dados):
+        return json.loads(dados)
+
+
+class _Orjson:
+    nome = 'orjson'
+    # Chaves não-texto (ex.: ids inteiros) viram texto, como no json da biblioteca padrão
+    OPCOES = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z if orjson else 0
+
+    def dumps(self, obj):
+        return orjson.dumps(obj, default=_padrao, option=self.OPCOES)
+
+    def loads(self, dados):
+        return orjson.loads(dados)
+
+
+BACKENDS = {'stdlib': _Stdlib}
+if orjson is not None:
+    BACKENDS['orjson'] = _Orjson
+
+_backend = {'nome': None, 'instancia': None}
+
+
+def backend():
+    nome = settings.JSON_BACKEND
+    if _backend['nome'] != nome:
+        escolhido = ('orjson' if orjson is not None else 'stdlib') if nome == 'auto' else nome
+        if escolhido not in BACKENDS:
+            raise ValueError(f'JSON_BACKEND inválido ou não instalado: {nome}')
+        _backend.update(nome=nome, instancia=BACKENDS[escolhido]())
+    return _backend['instancia']
+
+
+# bytes UTF-8, prontos para o corpo HTTP ou send(bytes_data=...)
+def dumps(obj):
+    return backend().dumps(obj)
+
+
+# Texto para frames de texto do WebSocket (o navegador lê event.data como string)
+def dumps_texto(obj):
+    return backend().dumps(obj).decode('utf-8')
+
+
+# Aceita str ou bytes; lança ValueError (json.JSONDecodeError ou orjson.JSONDecodeError)
+def loads(dados):
+    return backend().loads(dados)
+
+
+# Substituto do JsonResponse com o corpo gerado pelo backend configurado
+class RespostaJson(HttpResponse):
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
@@ -1,19 +1,39 @@
-import json
 from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.generic.http import AsyncHttpConsumer
 from asgiref.sync import sync_to_async
-from dashboard.models import Pedido, Peca, Notificacao
-from django.db import transaction
+from dashboard.models import Pedido
 from django.utils import timezone
 from django.db.models import Q, Count
-from django.core.serializers.json import DjangoJSONEncoder
+from django.conf import settings
+from django.http import QueryDict
+from dashboard.paginacao import parse_filtros_historico, buscar_pagina_pedidos
+from dashboard.historico_delta import montar_delta_historico, versao_historico
+from dashboard.serializacao import STATUS_MAP, formatar_pedidos
+from dashboard.transicoes import TransicaoInvalida, avancar_status, parse_status_esperado
+from dashboard.notificacoes import contar_nao_lidas, listar_recentes
+from dashboard.broadcast import (
+    GROUP_NAME,
+    broadcast, get_dashboard_data, frame_dashboard_update,
+    frame_nova_notificacao, frame_robo_status, frame_toast, serializar_notificacao
+)
+from dashboard import robo, repositorio
+from dashboard.robo_stream import iniciar_monitor_robo
+from dashboard.despacho import apos_mudanca_na_fila
+from dashboard.retencao import iniciar_retencao_periodica
+from dashboard.instrumentacao import InstrumentacaoConsumerMixin
+from dashboard.codificacao import dumps, dumps_texto, loads
+from dashboard.catalogo import get_catalogo
+from dashboard.exportacao import FORMATOS, gerar_exportacao, nome_arquivo, parse_exportacao
+from dashboard.executor import em_executor
+
+class DashboardConsumer(InstrumentacaoConsumerMixin, AsyncWebsocketConsumer):
+    tipos_mensagem_cliente = frozenset({
+        'mark_notification_read', 'mark_all_notifications_read', 'fetch_notifications',
+        'fetch_unread_count', 'process_pending_order', 'fetch_historico', 'historico_resync',
+    })
 
-STATUS_CONCLUIDO = 0
-STATUS_EM_ANDAMENTO = 1
-STATUS_PENDENTE = 2
-
-class DashboardConsumer(AsyncWebsocketConsumer):
     async def connect(self):
-        self.group_name = 'dashboard_updates'
+        self.group_name = GROUP_NAME
 
         await self.channel_layer.group_add(
             self.group_name,
@@ -22,7 +42,12 @@ class DashboardConsumer(AsyncWebsocketConsumer):
         await self.accept()
         print("WebSocket conectado!")
 
-        await self.send_dashboard_update()
+        if settings.ROBO_STREAM_AUTOSTART:
+            iniciar_monitor_robo()
+        iniciar_retencao_periodica()
+
+        await self.send_dashboard_data()
+        await self.send_robo_status()
         await self.send_initial_notifications_data()
         await self.send_historico_update()  # Envia os dados do histórico no connect
 
@@ -33,9 +58,10 @@ class DashboardConsumer(AsyncWebsocketConsumer):
         )
         print("WebSocket desconectado!")
 
-    async def receive(self, text_data):
-        data = json.loads(text_data)
+    async def receive(self, text_data=None, bytes_data=None):
+        data = loads(text_data if text_data is not None else bytes_data)
         message_type = data.get('type')
+        self.rotular_mensagem(message_type)
         print(f"Mensagem recebida do cliente: {message_type}")
 
         if message_type == 'mark_notification_read':
@@ -49,16 +75,21 @@ class DashboardConsumer(AsyncWebsocketConsumer):
             await self.send_unread_count()
         elif message_type == 'process_pending_order':
             pedido_id = data.get('pedido_id')
-            await self.process_pending_order(pedido_id)
+            # 'status_esperado' opcional: só avança se o pedido ainda estiver nesse status
+            await self.process_pending_order(pedido_id, data.get('status_esperado'))
+        elif message_type == 'fetch_historico':
+            await self.fetch_historico_page(data)
+        elif message_type == 'historico_resync':
+            await self.send_historico_update()
 
     async def dashboard_update(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=dumps_texto({
             'type': 'dashboard_update',
             'data': event['data']
         }))
 
     async def dashboard_message(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=dumps_texto({
             'type': 'dashboard_message',
             'message_type': event['message_type'],
             'toast_message': event['toast_message'],
@@ -66,216 +97,117 @@ class DashboardConsumer(AsyncWebsocketConsumer):
         }))
 
     async def notification_update(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=dumps_texto({
             'type': 'notification.update',
             'unread_count': event['unread_count']
         }))
 
     async def notification_new(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=dumps_texto({
             'type': 'notification.new',
             'notification': event['notification'],
             'unread_count': event['unread_count']
         }))
 
-    async def notification_create(self, event):
-        titulo = event['titulo']
-        mensagem = event['mensagem']
-        tipo = event['tipo']
-        link = event['link']
-
-        notification_info = await self._create_notification_and_get_data(titulo, mensagem, tipo, link)
-
-        await self.channel_layer.group_send(
-            self.group_name,
-            {
-                'type': 'notification.new',
-                'notification': notification_info['notification_data'],
-                'unread_count': notification_info['unread_count']
-            }
-        )
-
-    async def dashboard_update_trigger(self, event):
-        print("Recebendo dashboard_update_trigger, re-enviando dados do dashboard.")
-        await self.send_dashboard_update()
-
-    async def historico_update_trigger(self, event):
-        print(f"historico_update_trigger recebido pelo consumer {self.channel_name}")
-        await self.send_historico_update()
+    async def broadcast_text(self, event):
+        # Frames já serializados uma única vez por quem originou o evento (ver dashboard.broadcast)
+        for text in event['texts']:
+            await self.send(text_data=text)
 
     @sync_to_async
     def get_dashboard_data_from_db(self):
-        em_andamento_count = Pedido.objects.filter(status=STATUS_EM_ANDAMENTO).count()
-        pedidos_concluidos_count = Pedido.objects.filter(status=STATUS_CONCLUIDO).count()
-        total_pedidos_count = em_andamento_count + pedidos_concluidos_count
-
-        pending_order_obj = Pedido.objects.filter(status=STATUS_PENDENTE).first()
-        pending_order_data = None
-        if pending_order_obj:
-            pending_order_data = {
-                'id': pending_order_obj.id,
-                'data': pending_order_obj.data.strftime("%d/%m/%Y %H:%M")
-            }
-
-        return {
-            'em_andamento_count': em_andamento_count,
-            'concluido_count': pedidos_concluidos_count,
-            'total_pedidos_count': total_pedidos_count,
-            'pending_order': pending_order_data,
-        }
+        return get_dashboard_data()
 
     @sync_to_async
-    def get_pedidos_data(self):
-        pedidos = Pedido.objects.all().order_by('-id')
-        all_pecas = {p.id: p for p in Peca.objects.all()}
-
-        status_map = {
-            0: "Concluído",
-            1: "Em Andamento",
-            2: "Pendente"
-        }
-
-        pedidos_formatados = []
-
-        for pedido in pedidos:
-            pecas_ids, pecas_shapes, pecas_names = [], [], []
-            if isinstance(pedido.pecas, list):
-                for montagem in pedido.pecas:
-                    if isinstance(montagem, list):
-                        for pid in montagem:
-                            peca = all_pecas.get(pid)
-                            if peca:
-                                pecas_ids.append(peca.id)
-                                pecas_shapes.append(peca.tipo)
-                                pecas_names.append(peca.name)
-                            else:
-                                pecas_ids.append(None)
-                                pecas_shapes.append("desconhecida")
-                                pecas_names.append("Peça não encontrada")
-
-            pedidos_formatados.append({
-                'id': pedido.id,
-                'status': status_map.get(pedido.status, "Desconhecido"),
-                'pecas_list_ids': pecas_ids,
-                'pecas_list_shapes': pecas_shapes,
-                'pecas_list_names': pecas_names,
-                'data': pedido.data.strftime("%d/%m/%Y %H:%M") if pedido.data else "Sem data"
-            })
-
-        return pedidos_formatados
-
-    async def send_historico_update(self):
-        pedidos_data = await self.get_pedidos_data()
-        await self.send(text_data=json.dumps({
+    def get_pedidos_data(self, filtros=None):
+        # A versão é lida antes da consulta: deltas posteriores a ela já podem estar
+        # refletidos no snapshot, e o cliente os aplica de forma idempotente.
+        versao = versao_historico()
+        pedidos, next_cursor = buscar_pagina_pedidos(**(filtros or {}))
+        return {'pedidos': formatar_pedidos(pedidos), 'next_cursor': next_cursor, 'versao': versao}
+
+    async def send_historico_update(self, filtros=None):
+        pedidos_data = await self.get_pedidos_data(filtros)
+        await self.send(text_data=dumps_texto({
             'type': 'historico_update',
-            'pedidos': pedidos_data
-        }, cls=DjangoJSONEncoder))
+            'pedidos': pedidos_data['pedidos'],
+            'next_cursor': pedidos_data['next_cursor'],
+            'versao': pedidos_data['versao']
+        }))
 
-    @sync_to_async
-    def _create_notification_and_get_data(self, titulo, mensagem, tipo, link):
-        notification = Notificacao.objects.create(
-            titulo=titulo,
-            mensagem=mensagem,
-            tipo=tipo,
-            link=link
-        )
-        all_notifications = list(Notificacao.objects.all())
-        unread_count = sum(1 for n in all_notifications if not n.lida)
-        return {
-            'notification_data': {
-                'id': notification.id,
-                'titulo': notification.titulo,
-                'mensagem': notification.mensagem,
-                'data_criacao': notification.data_criacao.strftime("%d/%m/%Y %H:%M"),
-                'lida': notification.lida,
-                'tipo': notification.tipo,
-                'link': notification.link
-            },
-            'unread_count': unread_count
-        }
+    async def fetch_historico_page(self, data):
+        # Cliente pede outra página (ou outro filtro) do histórico: cursor, limit, status, data_inicio, data_fim
+        try:
+            filtros = parse_filtros_historico(data)
+        except ValueError as e:
+            await self.send(text_data=dumps_texto(frame_toast(str(e), 'error')))
+            return
+        await self.send_historico_update(filtros)
 
     @sync_to_async
     def _get_notifications_data_from_db(self):
-        all_notifications_qs = Notificacao.objects.all()
-        notifications_list_raw = list(all_notifications_qs)
-        notifications_list_raw.sort(key=lambda x: x.data_criacao, reverse=True)
-        display_notifications = notifications_list_raw[:10]
-        unread_count = sum(1 for n in notifications_list_raw if not n.lida)
-
-        notifications_list = [
-            {
-                'id': n.id,
-                'titulo': n.titulo,
-                'mensagem': n.mensagem,
-                'data_criacao': n.data_criacao.strftime("%d/%m/%Y %H:%M"),
-                'lida': n.lida,
-                'tipo': n.tipo,
-                'link': n.link
-            } for n in display_notifications
-        ]
-        return {'notifications': notifications_list, 'unread_count': unread_count}
+        notifications_list = [serializar_notificacao(n) for n in listar_recentes()]
+        return {'notifications': notifications_list, 'unread_count': contar_nao_lidas()}
 
     @sync_to_async
     def _mark_notification_as_read_in_db(self, notification_id):
         try:
-            notification = Notificacao.objects.get(id=notification_id)
-            if not notification.lida:
-                notification.lida = True
-                notification.save()
-
-            all_notifications = list(Notificacao.objects.all())
-            unread_count = sum(1 for n in all_notifications if not n.lida)
-            return {'status': 'success', 'unread_count': unread_count}
-        except Notificacao.DoesNotExist:
+            encontrada = repositorio.marcar_notificacao_lida(int(notification_id))
+        except (TypeError, ValueError):
+            encontrada = False
+        if not encontrada:
             return {'status': 'error', 'message': 'Notificação não encontrada'}
+        return {'status': 'success', 'unread_count': contar_nao_lidas()}
 
     @sync_to_async
     def _mark_all_notifications_as_read_in_db(self):
-        with transaction.atomic():
-            Notificacao.objects.filter(lida=False).update(lida=True)
+        repositorio.marcar_todas_lidas()
         return {'status': 'success', 'unread_count': 0}
 
     @sync_to_async
-    def _process_pending_order_in_db(self, pedido_id):
+    def _process_pending_order_in_db(self, pedido_id, status_esperado=None):
+        # O id chega do JSON do cliente (às vezes como texto) e vai direto ao filtro do pymongo
+        try:
+            pedido_id = int(pedido_id)
+        except (TypeError, ValueError):
+            return {'status': 'error', 'message': 'ID de pedido inválido.'}
         try:
-            pedido = Pedido.objects.get(id=pedido_id)
-            if pedido.status == STATUS_PENDENTE:
-                pedido.status = STATUS_EM_ANDAMENTO
-                msg_status = "Em Andamento"
-            elif pedido.status == STATUS_EM_ANDAMENTO:
-                pedido.status = STATUS_CONCLUIDO
-                msg_status = "Concluído"
-            else:
-                return {'status': 'error', 'message': 'Pedido não está em estado processável.'}
-
-            pedido.save()
-            return {
-                'status': 'success',
-                'message': f'Pedido #{pedido.id} atualizado para "{msg_status}".',
-                'pedido_status': msg_status
-            }
+            transicao = avancar_status(pedido_id, parse_status_esperado(status_esperado))
         except Pedido.DoesNotExist:
             return {'status': 'error', 'message': 'Pedido não encontrado.'}
+        except TransicaoInvalida as e:
+            return {'status': 'error', 'message': str(e)}
         except Exception as e:
             return {'status': 'error', 'message': f'Erro ao processar pedido: {str(e)}'}
 
-    async def send_dashboard_update(self):
+        msg_status = STATUS_MAP[transicao.status_novo]
+        return {
+            'status': 'success',
+            'pedido_id': pedido_id,
+            'message': f'Pedido #{pedido_id} atualizado para "{msg_status}".',
+            'pedido_status': msg_status,
+            'status_novo': transicao.status_novo
+        }
+
+    async def send_dashboard_data(self):
+        # Só para este socket (connect); mudanças chegam a todos via broadcast
         dashboard_data = await self.get_dashboard_data_from_db()
-        await self.channel_layer.group_send(
-            self.group_name,
-            {
-                'type': 'dashboard_update',
-                'data': dashboard_data
-            }
-        )
+        await self.send(text_data=dumps_texto({
+            'type': 'dashboard_update',
+            'data': dashboard_data
+        }))
+
+    async def send_robo_status(self):
+        doc = await sync_to_async(robo.ultimo_status)()
+        await self.send(text_data=dumps_texto(frame_robo_status(doc)))
 
     async def send_initial_notifications_data(self):
         notifications_data = await self._get_notifications_data_from_db()
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=dumps_texto({
             'type': 'notification.update',
             'unread_count': notifications_data['unread_count']
         }))
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=dumps_texto({
             'type': 'notifications.list',
             'notifications': notifications_data['notifications'],
             'unread_count': notifications_data['unread_count']
@@ -283,57 +215,86 @@ class DashboardConsumer(AsyncWebsocketConsumer):
 
     async def send_notifications_list(self):
         notifications_data = await self._get_notifications_data_from_db()
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=dumps_texto({
             'type': 'notifications.list',
             'notifications': notifications_data['notifications'],
             'unread_count': notifications_data['unread_count']
         }))
 
     async def send_unread_count(self):
-        all_notifications = await sync_to_async(list)(Notificacao.objects.all())
-        unread_count = sum(1 for n in all_notifications if not n.lida)
-        await self.send(text_data=json.dumps({
+        unread_count = await sync_to_async(contar_nao_lidas)()
+        await self.send(text_data=dumps_texto({
             'type': 'notification.update',
             'unread_count': unread_count
         }))
 
-    async def process_pending_order(self, pedido_id):
-        result = await self._process_pending_order_in_db(pedido_id)
+    async def mark_notification_as_read(self, notification_id):
+        result = await self._mark_notification_as_read_in_db(notification_id)
         if result['status'] == 'success':
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    'type': 'notification.create',
-                    'titulo': f"Status do Pedido #{pedido_id} Atualizado!",
-                    'mensagem': f"O pedido #{pedido_id} foi marcado como '{result['pedido_status']}'.",
-                    'tipo': "pedido_status",
-                    'link': f"/pedidos/historico?search={pedido_id}"
-                }
-            )
-            await self.send_dashboard_update()
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    'type': 'dashboard.message',
-                    'message_type': 'show_toast',
-                    'toast_message': result['message'],
-                    'toast_type': 'success'
-                }
-            )
-            # Envia também o update do histórico para atualizar a lista de pedidos
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    'type': 'historico_update_trigger'
-                }
+            # A contagem é a mesma para todos os dashboards
+            await broadcast(
+                {'type': 'notification.update', 'unread_count': result['unread_count']},
+                channel_layer=self.channel_layer
             )
         else:
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    'type': 'dashboard.message',
-                    'message_type': 'show_toast',
-                    'toast_message': result['message'],
-                    'toast_type': 'error'
-                }
-            )
\ No newline at end of file
+            await self.send(text_data=dumps_texto(frame_toast(result['message'], 'error')))
+
+    async def mark_all_notifications_as_read(self):
+        result = await self._mark_all_notifications_as_read_in_db()
+        await broadcast(
+            {'type': 'notification.update', 'unread_count': result['unread_count']},
+            channel_layer=self.channel_layer
+        )
+        await self.send_notifications_list()
+
+    @sync_to_async
+    def _montar_frames_pedido_processado(self, pedido_id, result):
+        return [
+            frame_nova_notificacao(
+                f"Status do Pedido #{pedido_id} Atualizado!",
+                f"O pedido #{pedido_id} foi marcado como '{result['pedido_status']}'.",
+                "pedido_status",
+                f"/pedidos/historico?search={pedido_id}"
+            ),
+            frame_dashboard_update(),
+            frame_toast(result['message'], 'success'),
+            # Só a linha alterada do histórico, não a lista inteira
+            montar_delta_historico([pedido_id]),
+            # Pedido concluído libera o robô para o próximo da fila
+            *apos_mudanca_na_fila(pedido_id, result['status_novo']),
+        ]
+
+    async def process_pending_order(self, pedido_id, status_esperado=None):
+        result = await self._process_pending_order_in_db(pedido_id, status_esperado)
+        if result['status'] == 'success':
+            frames = await self._montar_frames_pedido_processado(result['pedido_id'], result)
+            await broadcast(*frames, channel_layer=self.channel_layer)
+        else:
+            await broadcast(frame_toast(result['message'], 'error'), channel_layer=self.channel_layer)
+
+
+# Exportação do histórico sob ASGI (ver views.exportar_pedidos). Cada pedaço do gerador
+# (um lote do MongoDB) é produzido no executor e enviado com more_body, então um
+# download grande não bloqueia o event loop que atende os WebSockets do worker.
+class ExportacaoConsumer(AsyncHttpConsumer):
+    async def handle(self, body):
+        try:
+            formato, filtros = parse_exportacao(QueryDict(self.scope.get('query_string', b'')))
+        except ValueError as e:
+            await self.send_response(
+                400, dumps({'message': str(e)}), headers=[(b'Content-Type', b'application/json')],
+            )
+            return
+
+        catalogo = await em_executor(get_catalogo)
+        gerador = gerar_exportacao(formato, filtros, catalogo)
+        await self.send_headers(headers=[
+            (b'Content-Type', FORMATOS[formato][0].encode('ascii')),
+            (b'Content-Disposition', f'attachment; filename="{nome_arquivo(formato)}"'.encode('ascii')),
+        ])
+        while True:
+            parte = await em_executor(next, gerador, None)
+            if parte is None:
+                break
+            await self.send_body(parte.encode('utf-8'), more_body=True)
+        await self.send_body(b'')
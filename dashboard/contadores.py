@@ -0,0 +1,134 @@
+from collections import Counter
+from datetime import timezone as dt_timezone
+from pymongo import ReturnDocument
+from .models import Pedido, PEDIDO_STATUS_CHOICES, PRIORIDADE_NORMAL
+from .mongo import get_database
+from .repositorio import primeiro_da_fila
+
+# Documento único com a contagem de pedidos por status e o pedido pendente atual
+# (o primeiro da fila: menor valor de prioridade e, entre iguais, o mais antigo):
+# {'_id': 'pedidos', 'status_0': 10, 'status_1': 1, 'status_2': 1, 'status_3': 0,
+#  'pendente_id': 42, 'pendente_data': datetime, 'pendente_prioridade': 2}
+# É mantido pelos mesmos caminhos que alteram Pedido.status, então o dashboard
+# é servido com uma única leitura em vez de count() + first() a cada render.
+# Cada alteração também carimba o documento com 'versao' (sempre crescente) e
+# 'alterado_em', a versão dos dados de pedidos usada em ETags e no cache de respostas.
+COLECAO_CONTADORES = 'dashboard_contadores'
+CHAVE_PEDIDOS = 'pedidos'
+
+STATUS_PENDENTE = 2
+
+# Trecho de pipeline que avança a versão dos dados na mesma escrita dos contadores
+CARIMBO = {'versao': {'$add': [{'$ifNull': ['$versao', 0]}, 1]}, 'alterado_em': '$$NOW'}
+
+
+def _colecao():
+    return get_database()[COLECAO_CONTADORES]
+
+
+def _campo(status):
+    return f'status_{status}'
+
+
+def reconciliar_contadores():
+    pedidos = get_database()[Pedido._meta.db_table]
+    doc = {'_id': CHAVE_PEDIDOS, 'pendente_id': None, 'pendente_data': None, 'pendente_prioridade': None}
+    for status, _ in PEDIDO_STATUS_CHOICES:
+        doc[_campo(status)] = 0
+    for grupo in pedidos.aggregate([{'$group': {'_id': '$status', 'total': {'$sum': 1}}}]):
+        if grupo['_id'] is not None:
+            doc[_campo(grupo['_id'])] = grupo['total']
+
+    pendente = primeiro_da_fila()
+    if pendente:
+        doc['pendente_id'] = pendente.id
+        doc['pendente_data'] = pendente.data
+        doc['pendente_prioridade'] = pendente.prioridade
+
+    # Update com pipeline em vez de replace: a versão continua crescendo
+    campos = {campo: {'$literal': valor} for campo, valor in doc.items() if campo != '_id'}
+    return _colecao().find_one_and_update(
+        {'_id': CHAVE_PEDIDOS}, [{'$set': {**campos, **CARIMBO}}],
+        upsert=True, return_document=ReturnDocument.AFTER,
+    )
+
+
+def ler_contadores():
+    doc = _colecao().find_one({'_id': CHAVE_PEDIDOS})
+    return doc if doc is not None else reconciliar_contadores()
+
+
+# (versão, datetime da última alteração) dos dados de pedidos
+def versao_dados():
+    doc = ler_contadores()
+    alterado_em = doc.get('alterado_em')
+    if alterado_em is not None and alterado_em.tzinfo is None:
+        # O pymongo devolve datas em UTC sem fuso
+        alterado_em = alterado_em.replace(tzinfo=dt_timezone.utc)
+    return doc.get('versao', 0), alterado_em
+
+
+# Pedido criado pela aplicação, que chama registrar_criacao logo depois do save: o sinal
+# post_save (dashboard.signals) não precisa avançar a versão uma segunda vez
+def criado_pela_aplicacao(pedido):
+    pedido._versao_registrada = True
+    return pedido
+
+
+def versao_ja_registrada(pedido, created):
+    return created and getattr(pedido, '_versao_registrada', False)
+
+
+# Para alterações que não passam pelos contadores (ex.: edição pelo admin, exclusão)
+def marcar_alteracao():
+    _colecao().update_one({'_id': CHAVE_PEDIDOS}, [{'$set': CARIMBO}])
+
+
+def registrar_criacao(*pedidos):
+    atualizacao = dict(CARIMBO)
+    for status, quantidade in Counter(p.status for p in pedidos).items():
+        campo = _campo(status)
+        atualizacao[campo] = {'$add': [{'$ifNull': ['$' + campo, 0]}, quantidade]}
+
+    pendentes = [p for p in pedidos if p.status == STATUS_PENDENTE]
+    if pendentes:
+        primeiro = min(pendentes, key=lambda p: (p.prioridade, p.id))
+        # O novo pedido passa à frente do atual se a fila estava vazia ou se é mais prioritário
+        assume = {'$or': [
+            {'$eq': [{'$ifNull': ['$pendente_id', None]}, None]},
+            {'$lt': [primeiro.prioridade, {'$ifNull': ['$pendente_prioridade', PRIORIDADE_NORMAL]}]},
+        ]}
+        atualizacao['pendente_id'] = {'$cond': [assume, primeiro.id, '$pendente_id']}
+        atualizacao['pendente_data'] = {'$cond': [assume, primeiro.data, '$pendente_data']}
+        atualizacao['pendente_prioridade'] = {'$cond': [assume, primeiro.prioridade, '$pendente_prioridade']}
+    # Update com pipeline: contagem e pedido pendente mudam numa única operação atômica
+    resultado = _colecao().update_one({'_id': CHAVE_PEDIDOS}, [{'$set': atualizacao}])
+    if resultado.matched_count == 0:
+        reconciliar_contadores()
+
+
+def _promover_proximo_pendente():
+    proximo = primeiro_da_fila()
+    if proximo:
+        _colecao().update_one(
+            {'_id': CHAVE_PEDIDOS, 'pendente_id': None},
+            {'$set': {'pendente_id': proximo.id, 'pendente_data': proximo.data, 'pendente_prioridade': proximo.prioridade}}
+        )
+
+
+def registrar_transicao(pedido_id, status_anterior, status_novo):
+    campo_anterior, campo_novo = _campo(status_anterior), _campo(status_novo)
+    saiu_do_pendente = {'$eq': ['$pendente_id', pedido_id]}
+    doc = _colecao().find_one_and_update({'_id': CHAVE_PEDIDOS}, [{'$set': {
+        campo_anterior: {'$subtract': [{'$ifNull': ['$' + campo_anterior, 0]}, 1]},
+        campo_novo: {'$add': [{'$ifNull': ['$' + campo_novo, 0]}, 1]},
+        'pendente_id': {'$cond': [saiu_do_pendente, None, '$pendente_id']},
+        'pendente_data': {'$cond': [saiu_do_pendente, None, '$pendente_data']},
+        'pendente_prioridade': {'$cond': [saiu_do_pendente, None, '$pendente_prioridade']},
+        **CARIMBO,
+    }}], return_document=ReturnDocument.AFTER)
+    if doc is None:
+        reconciliar_contadores()
+    elif doc.get('pendente_id') is None and doc.get(_campo(STATUS_PENDENTE), 0) > 0:
+        # Ainda há pedidos pendentes na fila: o próximo dela passa a ser o atual
+        _promover_proximo_pendente()
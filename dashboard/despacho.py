@@ -0,0 +1,136 @@
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from pymongo import ReturnDocument
+from .models import Pedido
+from .mongo import get_database
+from . import robo
+from .contadores import registrar_transicao
+from .historico_delta import montar_delta_historico
+from .broadcast import frame_dashboard_update, frame_nova_notificacao, frame_toast
+
+# Despacho automático da fila de pedidos para o robô. O documento
+# {'_id': 'robo', 'pedido_id': ...} em 'dashboard_despacho' é a vaga do robô: quem
+# conseguir ocupá-la com find_one_and_update é o único que pode tirar o próximo pedido
+# da fila (outro find_one_and_update, status 2 -> 1, por prioridade e chegada). Assim
+# vários workers ou o monitor do robô podem tentar ao mesmo tempo sem despachar dois
+# pedidos. O Node-RED pega o pedido 'Em Andamento' como já fazia com o manual.
+COLECAO_DESPACHO = 'dashboard_despacho'
+CHAVE_ROBO = 'robo'
+
+STATUS_CONCLUIDO = 0
+STATUS_EM_ANDAMENTO = 1
+STATUS_PENDENTE = 2
+STATUS_CANCELADO = 3
+
+# Vaga reservada enquanto o pedido é reivindicado; expira se o processo cair no meio
+RESERVADO = -1
+RESERVA_EXPIRA_SEGUNDOS = 30
+
+
+def _colecao():
+    return get_database()[COLECAO_DESPACHO]
+
+
+def _pedidos():
+    return get_database()[Pedido._meta.db_table]
+
+
+def robo_ocioso(doc=None):
+    doc = robo.ler_ultimo_status() if doc is None else doc
+    return bool(doc) and doc.get('status') == settings.ROBO_ESTADO_OCIOSO
+
+
+def _ocupar_vaga(dono):
+    colecao = _colecao()
+    colecao.update_one({'_id': CHAVE_ROBO}, {'$setOnInsert': {'pedido_id': None}}, upsert=True)
+    agora = timezone.now()
+    return colecao.find_one_and_update(
+        {'_id': CHAVE_ROBO, '$or': [
+            {'pedido_id': None},
+            {'pedido_id': RESERVADO, 'reservado_em': {'$lt': agora - timedelta(seconds=RESERVA_EXPIRA_SEGUNDOS)}},
+        ]},
+        {'$set': {'pedido_id': RESERVADO, 'reservado_por': dono, 'reservado_em': agora}},
+    ) is not None
+
+
+def _devolver_vaga(dono):
+    _colecao().update_one(
+        {'_id': CHAVE_ROBO, 'pedido_id': RESERVADO, 'reservado_por': dono},
+        {'$set': {'pedido_id': None}},
+    )
+
+
+def _reivindicar_proximo():
+    return _pedidos().find_one_and_update(
+        {'status': STATUS_PENDENTE},
+        {'$set': {'status': STATUS_EM_ANDAMENTO}},
+        sort=[('prioridade', 1), ('id', 1)],
+        projection={'_id': 0, 'id': 1},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def liberar_robo(pedido_id):
+    _colecao().update_one({'_id': CHAVE_ROBO, 'pedido_id': pedido_id}, {'$set': {'pedido_id': None}})
+
+
+# Se o pedido na vaga já saiu de 'Em Andamento' por outro caminho (ex.: o Node-RED
+# gravou a conclusão direto no banco), a vaga é liberada.
+def _liberar_se_finalizado():
+    vaga = _colecao().find_one({'_id': CHAVE_ROBO})
+    if not vaga or vaga.get('pedido_id') in (None, RESERVADO):
+        return
+    pedido = _pedidos().find_one({'id': vaga['pedido_id']}, {'_id': 0, 'status': 1})
+    if pedido is None or pedido.get('status') != STATUS_EM_ANDAMENTO:
+        liberar_robo(vaga['pedido_id'])
+
+
+def frames_despacho(pedido_id):
+    return [
+        frame_nova_notificacao(
+            f"Pedido #{pedido_id} Enviado ao Robô",
+            f"O pedido #{pedido_id} saiu da fila e está em montagem.",
+            "pedido_status",
+            f"/pedidos/historico?search={pedido_id}"
+        ),
+        frame_dashboard_update(),
+        frame_toast(f'🤖 Pedido #{pedido_id} enviado ao robô.', 'info'),
+        montar_delta_historico([pedido_id]),
+    ]
+
+
+# Entrega o próximo pedido da fila ao robô se ele estiver ocioso e a vaga estiver livre.
+# Devolve os frames para o grupo do dashboard (lista vazia se nada foi despachado).
+def despachar_proximo(doc_robo=None):
+    if not settings.DESPACHO_AUTOMATICO or not robo_ocioso(doc_robo):
+        return []
+    _liberar_se_finalizado()
+
+    dono = uuid.uuid4().hex
+    if not _ocupar_vaga(dono):
+        return []
+    try:
+        pedido = _reivindicar_proximo()
+    except Exception:
+        _devolver_vaga(dono)
+        raise
+    if pedido is None:
+        _devolver_vaga(dono)
+        return []
+
+    _colecao().update_one(
+        {'_id': CHAVE_ROBO, 'reservado_por': dono},
+        {'$set': {'pedido_id': pedido['id'], 'despachado_em': timezone.now()}},
+    )
+    registrar_transicao(pedido['id'], STATUS_PENDENTE, STATUS_EM_ANDAMENTO)
+    return frames_despacho(pedido['id'])
+
+
+# Chamado por quem muda o status de um pedido (view, consumer): um pedido que termina
+# libera o robô, e um pedido novo na fila pode ser despachado de imediato.
+def apos_mudanca_na_fila(pedido_id=None, status_novo=None):
+    if pedido_id is not None and status_novo in (STATUS_CONCLUIDO, STATUS_CANCELADO):
+        liberar_robo(pedido_id)
+    return despachar_proximo()
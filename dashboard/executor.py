@@ -0,0 +1,42 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.ASYNC_VIEWS_THREADS,
+                    thread_name_prefix='dashboard-views',
+                )
+    return _executor
+
+
+def _executar(func, args, kwargs):
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+# Roda a parte bloqueante (ORM/djongo, pymongo, render) de uma view assíncrona num pool
+# de tamanho fixo. Sob ASGI o Django serializa views síncronas numa única thread
+# (thread_sensitive); aqui até ASYNC_VIEWS_THREADS requisições andam em paralelo e o
+# limite impede que uma rajada abra mais conexões do que o pool do MongoDB comporta.
+async def em_executor(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    # Copia o contexto para a thread do pool (run_in_executor não faz isso sozinho),
+    # mantendo a medição da requisição atual (dashboard.instrumentacao)
+    contexto = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), contexto.run, functools.partial(_executar, func, args, kwargs))
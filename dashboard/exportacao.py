@@ -0,0 +1,107 @@
+import csv
+from datetime import timezone as dt_timezone
+from django.utils import timezone
+from .models import Pedido
+from .serializacao import STATUS_MAP
+from .busca import consulta_pedidos
+from .paginacao import parse_filtros_historico
+from .codificacao import dumps_texto
+from .mongo import get_database
+
+LOTE_EXPORTACAO = 2000
+
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson; charset=utf-8', 'jsonl'),
+}
+
+COLUNAS_CSV = ['id', 'data', 'status_codigo', 'status', 'pecas_ids', 'pecas_nomes', 'pecas_tipos']
+
+PROJECAO = {'_id': 0, 'id': 1, 'data': 1, 'status': 1, 'pecas': 1}
+
+
+# (formato, filtros) a partir da query string; ValueError com a mensagem para o cliente
+def parse_exportacao(params):
+    formato = params.get('formato', 'csv')
+    if formato not in FORMATOS:
+        raise ValueError(f'Formato inválido: {formato} (use csv ou jsonl)')
+    return formato, parse_filtros_historico(params)
+
+
+def nome_arquivo(formato):
+    return f"pedidos-{timezone.localtime().strftime('%Y%m%d-%H%M')}.{FORMATOS[formato][1]}"
+
+
+class _Eco:
+    # Pseudo-arquivo para o csv.writer: devolve a linha em vez de gravá-la
+    def write(self, valor):
+        return valor
+
+
+# Lê os pedidos em ordem de id, um lote por consulta (paginação por chave), para que a
+# exportação não mantenha um cursor aberto enquanto o cliente consome o download.
+def iterar_pedidos(filtros, lote=LOTE_EXPORTACAO):
+    colecao = get_database()[Pedido._meta.db_table]
+    consulta = consulta_pedidos(**filtros)
+    ultimo_id = None
+    while True:
+        pagina = dict(consulta)
+        if ultimo_id is not None:
+            pagina['id'] = {'$gt': ultimo_id}
+        docs = list(colecao.find(pagina, PROJECAO).sort('id', 1).limit(lote))
+        if not docs:
+            return
+        yield docs
+        ultimo_id = docs[-1]['id']
+        if len(docs) < lote:
+            return
+
+
+def _data_local(valor):
+    if valor is None:
+        return None
+    if timezone.is_naive(valor):
+        # O pymongo devolve datas em UTC sem fuso
+        valor = valor.replace(tzinfo=dt_timezone.utc)
+    return timezone.localtime(valor).isoformat()
+
+
+def _linha(doc, catalogo):
+    ids, nomes, tipos = [], [], []
+    for montagem in doc.get('pecas') or []:
+        if not isinstance(montagem, list):
+            continue
+        for pid in montagem:
+            peca = catalogo.get(pid)
+            ids.append(pid)
+            nomes.append(peca.name if peca else "Peça não encontrada")
+            tipos.append(peca.tipo if peca else "desconhecida")
+    return {
+        'id': doc['id'],
+        'data': _data_local(doc.get('data')),
+        'status_codigo': doc.get('status'),
+        'status': STATUS_MAP.get(doc.get('status'), "Desconhecido"),
+        'pecas_ids': ids,
+        'pecas_nomes': nomes,
+        'pecas_tipos': tipos,
+    }
+
+
+# Gera o arquivo em pedaços (um por lote lido). Usa só o pymongo e o catálogo já
+# carregado. Cada next() faz uma consulta bloqueante: sob ASGI quem consome o gerador
+# é o ExportacaoConsumer, que pede cada pedaço no executor e não trava o event loop.
+def gerar_exportacao(formato, filtros, catalogo, lote=LOTE_EXPORTACAO):
+    if formato == 'csv':
+        escritor = csv.writer(_Eco())
+        yield escritor.writerow(COLUNAS_CSV)
+        for docs in iterar_pedidos(filtros, lote):
+            linhas = []
+            for doc in docs:
+                linha = _linha(doc, catalogo)
+                for campo in ('pecas_ids', 'pecas_nomes', 'pecas_tipos'):
+                    linha[campo] = ';'.join(str(valor) for valor in linha[campo])
+                linhas.append(escritor.writerow([linha[coluna] for coluna in COLUNAS_CSV]))
+            yield ''.join(linhas)
+    else:
+        for docs in iterar_pedidos(filtros, lote):
+            yield ''.join(dumps_texto(_linha(doc, catalogo)) + '\n' for doc in docs)
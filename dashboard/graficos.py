@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+from django.utils import timezone
+from .models import Pedido
+from .mongo import get_database
+
+STATUS_CONCLUIDO = 0
+
+# Período -> (dias na janela, tamanho do bucket). None = do dia 1 do mês até hoje.
+PERIODOS = {
+    '7days': (7, 'dia'),
+    '30days': (30, 'dia'),
+    'this_month': (None, 'dia'),
+    '90days': (90, 'semana'),
+    '12months': (365, 'mes'),
+}
+PERIODO_PADRAO = '7days'
+
+# Formato do $dateToString para a chave de cada bucket (%G-%V = ano/semana ISO)
+FORMATO_BUCKET = {
+    'dia': '%Y-%m-%d',
+    'semana': '%G-%V',
+    'mes': '%Y-%m',
+}
+
+
+def _colecao_pedidos():
+    # O $match por intervalo de datas usa o índice 'pedido_data_idx' (ver Pedido.Meta.indexes)
+    return get_database()[Pedido._meta.db_table]
+
+
+def _chave_e_label(dia, bucket):
+    if bucket == 'semana':
+        ano, semana, _ = dia.isocalendar()
+        inicio_semana = dia - timedelta(days=dia.weekday())
+        return f"{ano}-{semana:02d}", inicio_semana.strftime("%d/%m")
+    if bucket == 'mes':
+        return dia.strftime("%Y-%m"), dia.strftime("%m/%Y")
+    return dia.strftime("%Y-%m-%d"), dia.strftime("%d/%m")
+
+
+def intervalo_periodo(period, hoje=None):
+    dias, bucket = PERIODOS.get(period, PERIODOS[PERIODO_PADRAO])
+    end_date = hoje or timezone.localdate()
+    if dias is None:
+        start_date = end_date.replace(day=1)
+    elif bucket == 'mes':
+        # 12 meses completos, começando no dia 1 do mês mais antigo
+        ano, mes = end_date.year, end_date.month - 11
+        if mes <= 0:
+            ano, mes = ano - 1, mes + 12
+        start_date = end_date.replace(year=ano, month=mes, day=1)
+    else:
+        start_date = end_date - timedelta(days=dias - 1)
+    return start_date, end_date, bucket
+
+
+# Conta pedidos criados/concluídos por bucket com um $group no MongoDB, lendo só
+# os documentos dentro da janela pedida.
+def dados_grafico_pedidos(period, hoje=None):
+    start_date, end_date, bucket = intervalo_periodo(period, hoje)
+    tz = timezone.get_current_timezone()
+    inicio = timezone.make_aware(datetime.combine(start_date, datetime.min.time()), tz)
+    fim = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), datetime.min.time()), tz)
+
+    pipeline = [
+        {'$match': {'data': {'$gte': inicio, '$lt': fim}}},
+        {'$group': {
+            '_id': {'$dateToString': {
+                'format': FORMATO_BUCKET[bucket],
+                'date': '$data',
+                'timezone': timezone.get_current_timezone_name(),
+            }},
+            'created': {'$sum': 1},
+            'completed': {'$sum': {'$cond': [{'$eq': ['$status', STATUS_CONCLUIDO]}, 1, 0]}},
+        }},
+    ]
+    por_bucket = {doc['_id']: doc for doc in _colecao_pedidos().aggregate(pipeline)}
+
+    labels, created_counts, completed_counts = [], [], []
+    vistos = set()
+    for i in range((end_date - start_date).days + 1):
+        chave, label = _chave_e_label(start_date + timedelta(days=i), bucket)
+        if chave in vistos:
+            continue
+        vistos.add(chave)
+        doc = por_bucket.get(chave, {})
+        labels.append(label)
+        created_counts.append(doc.get('created', 0))
+        completed_counts.append(doc.get('completed', 0))
+
+    return {
+        'labels': labels,
+        'created_counts': created_counts,
+        'completed_counts': completed_counts,
+    }
@@ -0,0 +1,21 @@
+from .repositorio import pedidos_por_ids
+from .serializacao import formatar_pedidos
+from .versoes import proxima_versao, versao_atual
+
+CHAVE_VERSAO_HISTORICO = 'historico'
+
+
+def versao_historico():
+    return versao_atual(CHAVE_VERSAO_HISTORICO)
+
+
+# Monta a mensagem 'historico.delta' com apenas os pedidos criados/alterados.
+# Cada delta recebe a próxima versão do histórico; o cliente que perceber um salto
+# na numeração pede um 'historico_resync' e recebe o snapshot completo.
+def montar_delta_historico(pedido_ids):
+    pedidos = pedidos_por_ids(pedido_ids)
+    return {
+        'type': 'historico.delta',
+        'versao': proxima_versao(CHAVE_VERSAO_HISTORICO),
+        'pedidos': formatar_pedidos(pedidos),
+    }
@@ -0,0 +1,58 @@
+from django.apps import apps as django_apps
+from pymongo import MongoClient
+from .mongo import get_database, _client_kwargs
+
+
+# Índices declarados em Meta.indexes dos modelos do app, como (tabela, nome, chave pymongo).
+# 'app_registry' permite usar o estado histórico dos modelos dentro de migrações.
+def indices_declarados(app_registry=None):
+    registry = app_registry or django_apps
+    for model in registry.get_app_config('dashboard').get_models():
+        for index in model._meta.indexes:
+            chave = [
+                (model._meta.get_field(campo.lstrip('-')).column, -1 if campo.startswith('-') else 1)
+                for campo in index.fields
+            ]
+            yield model._meta.db_table, index.name, chave
+
+
+def _chaves_existentes(colecao):
+    return {
+        tuple((campo, int(direcao)) for campo, direcao in info['key'])
+        for info in colecao.index_information().values()
+    }
+
+
+# Um índice conta como existente se já houver outro com a mesma chave (ex.: 'data_1'
+# criado manualmente), já que o MongoDB recusa dois índices iguais com nomes diferentes.
+def indices_faltando(db=None, app_registry=None):
+    db = get_database() if db is None else db
+    existentes_por_tabela = {}
+    faltando = []
+    for tabela, nome, chave in indices_declarados(app_registry):
+        if tabela not in existentes_por_tabela:
+            existentes_por_tabela[tabela] = _chaves_existentes(db[tabela])
+        if tuple(chave) not in existentes_por_tabela[tabela]:
+            faltando.append((tabela, nome, chave))
+    return faltando
+
+
+def criar_indices(db=None, app_registry=None):
+    db = get_database() if db is None else db
+    criados = indices_faltando(db, app_registry)
+    for tabela, nome, chave in criados:
+        db[tabela].create_index(chave, name=nome)
+    return criados
+
+
+# Conexão curta e separada do pool, para a verificação na inicialização não travar
+# comandos do manage.py por 30s quando o MongoDB está fora do ar.
+def indices_faltando_rapido(timeout_ms=2000):
+    from django.conf import settings
+    kwargs = _client_kwargs()
+    kwargs.update(serverSelectionTimeoutMS=timeout_ms, minPoolSize=0)
+    client = MongoClient(**kwargs)
+    try:
+        return indices_faltando(client[settings.DATABASES['default'].get('NAME', 'pi-iv')])
+    finally:
+        client.close()
@@ -0,0 +1,192 @@
+import asyncio
+import contextvars
+import logging
+import time
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.decorators import sync_and_async_middleware
+from pymongo import monitoring
+from . import metricas
+from .codificacao import dumps_texto
+
+logger = logging.getLogger('dashboard.instrumentacao')
+
+# Medição da unidade de trabalho atual (requisição HTTP ou mensagem do consumer).
+# Como é um ContextVar, acompanha o código em sync_to_async e no executor das views
+# assíncronas; comandos MongoDB fora de uma medição (monitor do robô, jobs) são ignorados.
+_medicao_atual = contextvars.ContextVar('dashboard_medicao', default=None)
+
+HTTP_SEGUNDOS = metricas.histograma('dashboard_http_request_seconds', 'Tempo de parede das requisições HTTP.')
+HTTP_TOTAL = metricas.contador('dashboard_http_requests_total', 'Requisições HTTP por view, método e status.')
+HTTP_BYTES = metricas.contador('dashboard_http_response_bytes_total', 'Bytes do corpo das respostas HTTP.')
+WS_SEGUNDOS = metricas.histograma('dashboard_ws_message_seconds', 'Tempo de parede por mensagem tratada no consumer.')
+WS_ENVIADOS = metricas.contador('dashboard_ws_frames_sent_total', 'Frames enviados aos sockets.')
+WS_BYTES = metricas.contador('dashboard_ws_sent_bytes_total', 'Bytes enviados aos sockets.')
+DB_OPERACOES = metricas.contador('dashboard_db_operations_total', 'Comandos MongoDB (djongo e pymongo) por unidade de trabalho.')
+DB_SEGUNDOS = metricas.contador('dashboard_db_seconds_total', 'Tempo gasto em comandos MongoDB por unidade de trabalho.')
+FILA_SEGUNDOS = metricas.histograma('dashboard_queue_delay_seconds', 'Espera entre o envio de um evento e o início do tratamento.')
+
+
+class Medicao:
+    __slots__ = ('origem', 'alvo', 'inicio', 'consultas', 'tempo_db', 'bytes', 'espera')
+
+    def __init__(self, origem, alvo=None, espera=None):
+        self.origem = origem
+        self.alvo = alvo
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tempo_db = 0.0
+        self.bytes = 0
+        self.espera = espera
+
+    def registrar_db(self, duracao_micros):
+        self.consultas += 1
+        self.tempo_db += duracao_micros / 1e6
+
+    def finalizar(self, **extras):
+        duracao = time.perf_counter() - self.inicio
+        rotulos = metricas.rotulos(origem=self.origem, alvo=self.alvo)
+        DB_OPERACOES.inc(rotulos, self.consultas)
+        DB_SEGUNDOS.inc(rotulos, self.tempo_db)
+        if self.espera is not None:
+            FILA_SEGUNDOS.observar(metricas.rotulos(origem=self.origem), max(self.espera, 0.0))
+
+        registro = {
+            'origem': self.origem,
+            'alvo': self.alvo,
+            'duracao_ms': round(duracao * 1000, 2),
+            'db_consultas': self.consultas,
+            'db_ms': round(self.tempo_db * 1000, 2),
+            'bytes': self.bytes,
+            'espera_ms': round(self.espera * 1000, 2) if self.espera is not None else None,
+            **extras,
+        }
+        if duracao * 1000 >= settings.INSTRUMENTACAO_LENTO_MS:
+            logger.warning(dumps_texto(registro))
+        else:
+            logger.debug(dumps_texto(registro))
+        return duracao
+
+
+def medicao_atual():
+    return _medicao_atual.get()
+
+
+# Listener de comandos do pymongo: vale para o cliente do djongo e para o cliente
+# compartilhado de dashboard/mongo.py, desde que registrado antes de criá-los (apps.ready).
+class ListenerComandos(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        medicao = _medicao_atual.get()
+        if medicao is not None:
+            medicao.registrar_db(event.duration_micros)
+
+    def failed(self, event):
+        self.succeeded(event)
+
+
+_listener = None
+
+
+def registrar_listener():
+    global _listener
+    if _listener is None and settings.INSTRUMENTACAO_ATIVA:
+        _listener = ListenerComandos()
+        monitoring.register(_listener)
+
+
+def _espera_http(request):
+    # Proxy na frente do Daphne pode informar quando recebeu a requisição (epoch em
+    # segundos), ex. no nginx: proxy_set_header X-Request-Start "t=${msec}";
+    valor = request.META.get('HTTP_X_REQUEST_START', '')
+    try:
+        return time.time() - float(valor.lstrip('t='))
+    except ValueError:
+        return None
+
+
+def _finalizar_http(medicao, request, response):
+    match = getattr(request, 'resolver_match', None)
+    medicao.alvo = match.view_name if match else 'nao_resolvida'
+    if not getattr(response, 'streaming', False):
+        medicao.bytes = len(response.content)
+    duracao = medicao.finalizar(metodo=request.method, status=response.status_code, caminho=request.path)
+    HTTP_SEGUNDOS.observar(metricas.rotulos(view=medicao.alvo), duracao)
+    HTTP_TOTAL.inc(metricas.rotulos(view=medicao.alvo, metodo=request.method, status=response.status_code))
+    HTTP_BYTES.inc(metricas.rotulos(view=medicao.alvo), medicao.bytes)
+
+
+@sync_and_async_middleware
+def InstrumentacaoMiddleware(get_response):
+    if not settings.INSTRUMENTACAO_ATIVA:
+        raise MiddlewareNotUsed
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            medicao = Medicao('http', espera=_espera_http(request))
+            token = _medicao_atual.set(medicao)
+            try:
+                response = await get_response(request)
+            finally:
+                _medicao_atual.reset(token)
+            _finalizar_http(medicao, request, response)
+            return response
+    else:
+        def middleware(request):
+            medicao = Medicao('http', espera=_espera_http(request))
+            token = _medicao_atual.set(medicao)
+            try:
+                response = get_response(request)
+            finally:
+                _medicao_atual.reset(token)
+            _finalizar_http(medicao, request, response)
+            return response
+    return middleware
+
+
+def _tipo_mensagem(message):
+    if message['type'] != 'websocket.receive':
+        return message['type']
+    # O consumer troca pelo tipo real (rotular_mensagem) depois de decodificar o JSON;
+    # se a decodificação falhar, fica este
+    return 'receive:invalida'
+
+
+# Mixin para consumers assíncronos: mede cada mensagem despachada (eventos do socket e
+# do channel layer) e conta os frames/bytes enviados. A espera na fila vem do campo
+# 'enviado_em' que dashboard.broadcast coloca nas mensagens de grupo. O JSON das
+# mensagens do cliente não é lido aqui: o receive do consumer informa o tipo.
+class InstrumentacaoConsumerMixin:
+    tipos_mensagem_cliente = frozenset()
+
+    async def dispatch(self, message):
+        if not settings.INSTRUMENTACAO_ATIVA:
+            return await super().dispatch(message)
+        enviado_em = message.get('enviado_em')
+        medicao = Medicao('ws', _tipo_mensagem(message), time.time() - enviado_em if enviado_em else None)
+        token = _medicao_atual.set(medicao)
+        try:
+            return await super().dispatch(message)
+        finally:
+            _medicao_atual.reset(token)
+            duracao = medicao.finalizar()
+            WS_SEGUNDOS.observar(metricas.rotulos(tipo=medicao.alvo), duracao)
+
+    # Chamado pelo receive com o 'type' já decodificado, antes de qualquer envio
+    def rotular_mensagem(self, tipo):
+        medicao = _medicao_atual.get()
+        if medicao is not None:
+            # O tipo vem do cliente: só vira rótulo se o consumer o conhece
+            medicao.alvo = f'receive:{tipo}' if tipo in self.tipos_mensagem_cliente else 'receive:outro'
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        medicao = _medicao_atual.get()
+        if settings.INSTRUMENTACAO_ATIVA and (text_data is not None or bytes_data is not None):
+            tamanho = len(text_data.encode('utf-8')) if text_data is not None else len(bytes_data)
+            tipo = medicao.alvo if medicao is not None else 'desconhecido'
+            WS_ENVIADOS.inc(metricas.rotulos(tipo=tipo))
+            WS_BYTES.inc(metricas.rotulos(tipo=tipo), tamanho)
+            if medicao is not None:
+                medicao.bytes += tamanho
+        return await super().send(text_data=text_data, bytes_data=bytes_data, close=close)
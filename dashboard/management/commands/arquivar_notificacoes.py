@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from dashboard.retencao import DESTINOS, LOTE_PADRAO, arquivar_notificacoes
+
+
+class Command(BaseCommand):
+    help = 'Arquiva notificações lidas mais antigas que N dias e as remove da coleção principal.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=settings.NOTIFICACOES_RETENCAO_DIAS,
+                            help='Idade mínima (em dias) das notificações lidas a arquivar.')
+        parser.add_argument('--destino', choices=DESTINOS, default='colecao',
+                            help='Coleção compacta de arquivo ou arquivo JSONL.')
+        parser.add_argument('--arquivo', help='Caminho do arquivo JSONL (com --destino jsonl).')
+        parser.add_argument('--lote', type=int, default=LOTE_PADRAO, help='Notificações por lote.')
+        parser.add_argument('--simular', action='store_true', help='Só conta, sem mover nada.')
+
+    def handle(self, *args, **options):
+        try:
+            movidas = arquivar_notificacoes(
+                dias=options['dias'],
+                destino=options['destino'],
+                arquivo=options['arquivo'],
+                lote=options['lote'],
+                simular=options['simular'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        verbo = 'seriam arquivadas' if options['simular'] else 'arquivadas'
+        self.stdout.write(self.style.SUCCESS(f"{movidas} notificação(ões) {verbo}."))
@@ -0,0 +1,204 @@
+import asyncio
+import http.client
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from dashboard.carga import porta_livre, esperar_porta, subir_daphne, encerrar, medir_http, medir_fanout
+from dashboard.mongo import get_client
+
+ENDPOINTS_PADRAO = [
+    '/',
+    '/pedidos/historico',
+    '/pedidos/historico?status=0',
+    '/pedidos/json/',
+    '/api/graficoPedidos/?period=30days',
+    '/api/graficoPedidos/?period=12months',
+]
+
+# Métricas comparadas com o baseline: (campo, True se maior é melhor)
+METRICAS_REGRESSAO = [('req_por_s', True), ('p99_ms', False)]
+
+
+class Command(BaseCommand):
+    help = ('Benchmark reproduzível: semeia um banco separado (MONGO_DB) com N pedidos e '
+            'notificações, sobe um Daphne contra ele, mede os endpoints HTTP sob carga e a '
+            'latência do fan-out do DashboardConsumer com S sockets, e grava os resultados '
+            'em JSON. Com --baseline falha se alguma métrica piorar além da tolerância.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pedidos', type=int, default=100000)
+        parser.add_argument('--notificacoes', type=int, default=20000)
+        parser.add_argument('--semente', type=int, default=42)
+        parser.add_argument('--banco', help='Banco usado no benchmark (padrão: <NAME>-benchmark).')
+        parser.add_argument('--sem-seed', action='store_true', help='Reaproveita a massa já existente no banco.')
+        parser.add_argument('--manter-banco', action='store_true', help='Não apaga o banco ao final.')
+        parser.add_argument('--mongod-local', action='store_true',
+                            help='Sobe um mongod temporário (dbpath descartável) em vez de usar o servidor configurado.')
+        parser.add_argument('--requisicoes', type=int, default=1000, help='Requisições por endpoint.')
+        parser.add_argument('--concorrencia', type=int, default=32)
+        parser.add_argument('--endpoint', action='append', dest='endpoints')
+        parser.add_argument('--sockets', type=int, default=200)
+        parser.add_argument('--eventos', type=int, default=20, help='Broadcasts medidos no fan-out.')
+        parser.add_argument('--views-async', action='store_true', help='Roda o worker com VIEWS_ASYNC=1.')
+        parser.add_argument('--saida', default='benchmark.json')
+        parser.add_argument('--baseline', help='Resultado anterior para comparação.')
+        parser.add_argument('--tolerancia', type=float, default=0.2, help='Piora relativa aceita (0.2 = 20%%).')
+        parser.add_argument('--timeout', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        banco = options['banco'] or f"{settings.DATABASES['default']['NAME']}-benchmark"
+        if banco == settings.DATABASES['default']['NAME']:
+            raise CommandError('O benchmark precisa de um banco separado do configurado em DATABASES.')
+        env = {'MONGO_DB': banco, 'ROBO_STREAM_AUTOSTART': '0', 'VIEWS_ASYNC': '1' if options['views_async'] else '0'}
+        processos, dbpath = [], None
+        try:
+            if options['mongod_local']:
+                dbpath = tempfile.mkdtemp(prefix='benchmark-mongod-')
+                env.update(self._subir_mongod(processos, dbpath, options['timeout']))
+
+            semente = None
+            if not options['sem_seed']:
+                self._manage(env, 'migrate', '--noinput')
+                semente = json.loads(self._manage(
+                    env, 'gerar_dados_carga', '--json', f"--pedidos={options['pedidos']}",
+                    f"--notificacoes={options['notificacoes']}", f"--semente={options['semente']}",
+                ).strip().splitlines()[-1])
+                self.stdout.write(f"Massa gerada em {semente['duracao_s']} s no banco '{banco}'.")
+
+            porta = porta_livre()
+            processos.append(subir_daphne(porta, env))
+            if not esperar_porta(porta, options['timeout']):
+                raise CommandError('Daphne não subiu.')
+
+            resultados = {
+                'meta': self._meta(options, banco),
+                'http': self._medir_http(porta, options),
+                'websocket': self._medir_websocket(porta, options, semente),
+            }
+        finally:
+            encerrar(processos)
+            if dbpath:
+                shutil.rmtree(dbpath, ignore_errors=True)
+            elif not options['manter_banco'] and not options['sem_seed']:
+                get_client().drop_database(banco)
+
+        with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+            json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Resultados gravados em {options['saida']}."))
+
+        if options['baseline']:
+            regressoes = self._comparar(resultados, options['baseline'], options['tolerancia'])
+            for regressao in regressoes:
+                self.stderr.write(regressao)
+            if regressoes:
+                raise CommandError(f'{len(regressoes)} regressão(ões) em relação a {options["baseline"]}.')
+
+    def _manage(self, env, *args):
+        resultado = subprocess.run(
+            [sys.executable, 'manage.py', *args], cwd=settings.BASE_DIR,
+            env=dict(os.environ, **env), capture_output=True, text=True,
+        )
+        if resultado.returncode != 0:
+            raise CommandError(f"manage.py {args[0]} falhou:\n{resultado.stderr}")
+        return resultado.stdout
+
+    def _subir_mongod(self, processos, dbpath, timeout):
+        executavel = shutil.which('mongod')
+        if not executavel:
+            raise CommandError('mongod não encontrado no PATH; rode sem --mongod-local contra um servidor de teste.')
+        porta = porta_livre()
+        processos.append(subprocess.Popen(
+            [executavel, '--port', str(porta), '--bind_ip', '127.0.0.1', '--dbpath', dbpath],
+            stdout=subprocess.DEVNULL,
+        ))
+        if not esperar_porta(porta, timeout):
+            raise CommandError('mongod local não respondeu.')
+        return {'MONGO_HOST': '127.0.0.1', 'MONGO_PORT': str(porta)}
+
+    def _meta(self, options, banco):
+        try:
+            commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+                                    capture_output=True, text=True).stdout.strip() or None
+        except OSError:
+            commit = None
+        parametros = {k: options[k] for k in ('pedidos', 'notificacoes', 'semente', 'requisicoes',
+                                              'concorrencia', 'sockets', 'eventos', 'views_async', 'mongod_local')}
+        return {
+            'data': timezone.now().isoformat(),
+            'commit': commit,
+            'python': platform.python_version(),
+            'banco': banco,
+            'parametros': parametros,
+        }
+
+    def _medir_http(self, porta, options):
+        resultados = {}
+        for caminho in options['endpoints'] or ENDPOINTS_PADRAO:
+            medir_http(porta, caminho, 20, 4)
+            resumo = medir_http(porta, caminho, options['requisicoes'], options['concorrencia'])
+            resultados[caminho] = resumo
+            self.stdout.write(
+                f"{caminho:40} {resumo['req_por_s'] or 0:8.1f} req/s  p50 {resumo['p50_ms'] or 0:7.1f} ms  "
+                f"p99 {resumo['p99_ms'] or 0:7.1f} ms  erros {resumo['erros']}"
+            )
+        return resultados
+
+    def _medir_websocket(self, porta, options, semente):
+        if not options['sockets'] or not options['eventos']:
+            return None
+        try:
+            import websockets  # noqa: F401
+        except ImportError:
+            raise CommandError('Instale o pacote "websockets" para medir o fan-out.')
+
+        pecas_ids = (semente or {}).get('pecas_ids') or [1, 2, 3]
+        corpo = json.dumps({'pedidos': [{f'peca{i}': pecas_ids[(i - 1) % 3] for i in range(1, 10)}]})
+
+        # Cada evento cria um pedido pelo endpoint de lote, que dispara o broadcast completo
+        def disparar():
+            conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=30)
+            try:
+                conexao.request('POST', '/api/pedidos/lote/', body=corpo, headers={'Content-Type': 'application/json'})
+                resposta = conexao.getresponse()
+                dados = json.loads(resposta.read())
+            finally:
+                conexao.close()
+            if resposta.status != 201:
+                raise CommandError(f"Falha ao disparar evento: {dados.get('message')}")
+            return dados['pedido_ids'][0]
+
+        resumo = asyncio.run(medir_fanout(porta, options['sockets'], options['eventos'], disparar))
+        self.stdout.write(
+            f"fan-out {resumo['sockets']} sockets: p50 {resumo['p50_ms'] or 0:.1f} ms  "
+            f"p99 {resumo['p99_ms'] or 0:.1f} ms  último socket p99 {resumo['p99_ultimo_socket_ms'] or 0:.1f} ms  "
+            f"perdidos {resumo['perdidos']}"
+        )
+        return resumo
+
+    def _comparar(self, resultados, caminho_baseline, tolerancia):
+        with open(caminho_baseline, encoding='utf-8') as arquivo:
+            baseline = json.load(arquivo)
+        regressoes = []
+        for endpoint, atual in resultados['http'].items():
+            anterior = baseline.get('http', {}).get(endpoint)
+            if not anterior:
+                continue
+            for campo, maior_melhor in METRICAS_REGRESSAO:
+                antes, agora = anterior.get(campo), atual.get(campo)
+                if not antes or agora is None:
+                    continue
+                piora = (antes - agora) / antes if maior_melhor else (agora - antes) / antes
+                if piora > tolerancia:
+                    regressoes.append(f"{endpoint} {campo}: {antes} -> {agora} ({piora:+.0%})")
+        ws_antes, ws_agora = baseline.get('websocket') or {}, resultados['websocket'] or {}
+        antes, agora = ws_antes.get('p99_ultimo_socket_ms'), ws_agora.get('p99_ultimo_socket_ms')
+        if antes and agora is not None and (agora - antes) / antes > tolerancia:
+            regressoes.append(f"fan-out p99_ultimo_socket_ms: {antes} -> {agora} ({(agora - antes) / antes:+.0%})")
+        return regressoes
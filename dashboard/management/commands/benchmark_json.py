@@ -0,0 +1,76 @@
+import json
+import random
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from dashboard.carga import medir_funcao
+from dashboard.codificacao import BACKENDS
+from dashboard.serializacao import STATUS_MAP
+
+PECAS = [(1, 'circulo', 'Círculo'), (2, 'hexagono', 'Hexágono'), (3, 'quadrado', 'Quadrado')]
+
+
+# Frame 'historico_update' com 'pedidos' pedidos no formato de serializacao.formatar_pedidos,
+# mais um datetime por pedido para exercitar a codificação de datas
+def payload_historico(pedidos, semente=0):
+    aleatorio = random.Random(semente)
+    agora = timezone.now()
+    itens = []
+    for pedido_id in range(pedidos, 0, -1):
+        pecas = [aleatorio.choice(PECAS) for _ in range(9)]
+        data = agora - timedelta(minutes=pedido_id)
+        itens.append({
+            'id': pedido_id,
+            'status': STATUS_MAP[aleatorio.choice(list(STATUS_MAP))],
+            'pecas_list_ids': [p[0] for p in pecas],
+            'pecas_list_shapes': [p[1] for p in pecas],
+            'pecas_list_names': [p[2] for p in pecas],
+            'data': data.strftime("%d/%m/%Y %H:%M"),
+            'atualizado_em': data,
+        })
+    return {'type': 'historico_update', 'pedidos': itens, 'next_cursor': None, 'versao': 1}
+
+
+class Command(BaseCommand):
+    help = ('Compara os backends de JSON (dashboard/codificacao.py) e o caminho antigo '
+            '(json.dumps com DjangoJSONEncoder) codificando e decodificando páginas grandes '
+            'do histórico. Não usa o banco.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pedidos', type=int, action='append', dest='tamanhos',
+                            help='Pedidos por payload (pode repetir). Padrão: 200, 2000 e 20000.')
+        parser.add_argument('--repeticoes', type=int, default=50)
+        parser.add_argument('--aquecimento', type=int, default=5)
+        parser.add_argument('--json', dest='saida_json', help='Grava os resultados neste arquivo.')
+
+    def handle(self, *args, **options):
+        if options['repeticoes'] < 1:
+            raise CommandError('--repeticoes precisa ser positivo.')
+        caminhos = {'json+DjangoJSONEncoder': (
+            lambda obj: json.dumps(obj, cls=DjangoJSONEncoder).encode('utf-8'), json.loads,
+        )}
+        for nome, classe in sorted(BACKENDS.items()):
+            instancia = classe()
+            caminhos[nome] = (instancia.dumps, instancia.loads)
+
+        resultados = []
+        for tamanho in options['tamanhos'] or [200, 2000, 20000]:
+            payload = payload_historico(tamanho)
+            for nome, (dumps, loads) in caminhos.items():
+                corpo = dumps(payload)
+                codificar = medir_funcao(lambda: dumps(payload), options['repeticoes'], options['aquecimento'])
+                decodificar = medir_funcao(lambda: loads(corpo), options['repeticoes'], options['aquecimento'])
+                mb_por_s = round(len(corpo) / 1e6 / (codificar['p50_ms'] / 1000), 1) if codificar['p50_ms'] else None
+                resultados.append({'pedidos': tamanho, 'backend': nome, 'bytes': len(corpo),
+                                   'codificar': codificar, 'decodificar': decodificar, 'codificar_mb_por_s': mb_por_s})
+                self.stdout.write(
+                    f"{tamanho:6} pedidos  {nome:24} {len(corpo) / 1024:9.1f} KiB  "
+                    f"dumps p50 {codificar['p50_ms']:8.2f} ms ({mb_por_s or 0:7.1f} MB/s)  "
+                    f"loads p50 {decodificar['p50_ms']:8.2f} ms"
+                )
+
+        if options['saida_json']:
+            with open(options['saida_json'], 'w', encoding='utf-8') as arquivo:
+                json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados gravados em {options['saida_json']}."))
@@ -0,0 +1,81 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from dashboard.models import Pedido, Notificacao
+from dashboard.carga import medir_funcao
+from dashboard.notificacoes import NOTIFICACOES_RECENTES
+from dashboard import repositorio
+
+STATUS_PENDENTE = 2
+STATUS_EM_ANDAMENTO = 1
+IDS_POR_DELTA = 20
+
+
+def _ids(itens):
+    return [item.id for item in itens] if isinstance(itens, list) else getattr(itens, 'id', itens)
+
+
+# (nome, versão ORM/djongo, versão do repositório pymongo) para cada consulta quente
+def consultas(ids_recentes):
+    return [
+        ('contar_pedidos_por_status',
+         lambda: Pedido.objects.filter(status=STATUS_EM_ANDAMENTO).count(),
+         lambda: repositorio.contar_pedidos(STATUS_EM_ANDAMENTO)),
+        ('primeiro_da_fila',
+         lambda: Pedido.objects.filter(status=STATUS_PENDENTE).order_by('prioridade', 'id').first(),
+         repositorio.primeiro_da_fila),
+        ('pedidos_por_ids',
+         lambda: list(Pedido.objects.filter(id__in=ids_recentes).order_by('-id')),
+         lambda: repositorio.pedidos_por_ids(ids_recentes)),
+        ('contar_nao_lidas',
+         lambda: Notificacao.objects.filter(lida=False).count(),
+         repositorio.contar_nao_lidas),
+        ('notificacoes_recentes',
+         lambda: list(Notificacao.objects.order_by('-data_criacao')[:NOTIFICACOES_RECENTES]),
+         lambda: repositorio.notificacoes_recentes(NOTIFICACOES_RECENTES)),
+    ]
+
+
+class Command(BaseCommand):
+    help = ('Micro-benchmark das consultas quentes: mede cada uma pelo ORM (djongo) e pelo '
+            'repositório pymongo (dashboard/repositorio.py) no banco configurado, confere que '
+            'as duas devolvem o mesmo resultado e mostra p50/p99 e o ganho. Só faz leituras; '
+            'use gerar_dados_carga antes para medir com volume.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=2000)
+        parser.add_argument('--aquecimento', type=int, default=100)
+        parser.add_argument('--consulta', action='append', dest='consultas_escolhidas',
+                            help='Nome da consulta a medir (pode repetir). Padrão: todas.')
+        parser.add_argument('--json', dest='saida_json', help='Grava os resultados neste arquivo.')
+
+    def handle(self, *args, **options):
+        ids_recentes = list(Pedido.objects.order_by('-id').values_list('id', flat=True)[:IDS_POR_DELTA])
+        todas = consultas(ids_recentes)
+        escolhidas = options['consultas_escolhidas']
+        if escolhidas:
+            desconhecidas = set(escolhidas) - {nome for nome, _, _ in todas}
+            if desconhecidas:
+                raise CommandError(f"Consultas desconhecidas: {', '.join(sorted(desconhecidas))}")
+            todas = [consulta for consulta in todas if consulta[0] in escolhidas]
+
+        resultados = []
+        for nome, orm, direto in todas:
+            if _ids(orm()) != _ids(direto()):
+                raise CommandError(f'{nome}: ORM e repositório devolveram resultados diferentes.')
+            medidas = {
+                caminho: medir_funcao(funcao, options['repeticoes'], options['aquecimento'])
+                for caminho, funcao in (('orm', orm), ('pymongo', direto))
+            }
+            p50_orm, p50_direto = medidas['orm']['p50_ms'], medidas['pymongo']['p50_ms']
+            ganho = round(p50_orm / p50_direto, 2) if p50_direto else None
+            resultados.append({'consulta': nome, 'ganho_p50': ganho, **medidas})
+            self.stdout.write(
+                f"{nome:28} orm p50 {p50_orm:7.3f} ms p99 {medidas['orm']['p99_ms']:7.3f} ms  "
+                f"pymongo p50 {p50_direto:7.3f} ms p99 {medidas['pymongo']['p99_ms']:7.3f} ms  "
+                f"{ganho or 0:5.1f}x"
+            )
+
+        if options['saida_json']:
+            with open(options['saida_json'], 'w', encoding='utf-8') as arquivo:
+                json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados gravados em {options['saida_json']}."))
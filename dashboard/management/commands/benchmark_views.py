@@ -0,0 +1,57 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from dashboard.carga import porta_livre, esperar_porta, subir_daphne, encerrar, medir_http
+
+ENDPOINTS_PADRAO = [
+    '/',
+    '/pedidos/',
+    '/pedidos/historico',
+    '/api/graficoPedidos/?period=30days',
+]
+
+MODOS = {
+    'sync': '0',
+    'async': '1',
+}
+
+
+class Command(BaseCommand):
+    help = ('Compara as views síncronas e assíncronas (VIEWS_ASYNC) sob carga: sobe um '
+            'Daphne por modo contra o banco configurado e mede req/s e latências p50/p95/p99 '
+            'de cada endpoint.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requisicoes', type=int, default=500, help='Requisições por endpoint.')
+        parser.add_argument('--concorrencia', type=int, default=32)
+        parser.add_argument('--aquecimento', type=int, default=20, help='Requisições descartadas antes de medir.')
+        parser.add_argument('--endpoint', action='append', dest='endpoints',
+                            help='Caminho a medir (pode repetir). Padrão: home, novo pedido, histórico e gráfico.')
+        parser.add_argument('--modo', choices=sorted(MODOS), action='append', dest='modos')
+        parser.add_argument('--json', dest='saida_json', help='Grava os resultados neste arquivo.')
+        parser.add_argument('--timeout', type=float, default=15.0)
+
+    def handle(self, *args, **options):
+        endpoints = options['endpoints'] or ENDPOINTS_PADRAO
+        resultados = []
+        for modo in options['modos'] or sorted(MODOS, reverse=True):
+            porta = porta_livre()
+            processo = subir_daphne(porta, {'VIEWS_ASYNC': MODOS[modo], 'ROBO_STREAM_AUTOSTART': '0'})
+            try:
+                if not esperar_porta(porta, options['timeout']):
+                    raise CommandError(f'Daphne ({modo}) não subiu na porta {porta}.')
+                for caminho in endpoints:
+                    medir_http(porta, caminho, options['aquecimento'], min(options['concorrencia'], 4))
+                    resumo = medir_http(porta, caminho, options['requisicoes'], options['concorrencia'])
+                    resultados.append(dict(modo=modo, endpoint=caminho, concorrencia=options['concorrencia'], **resumo))
+                    self.stdout.write(
+                        f"{modo:5} {caminho:40} {resumo['req_por_s'] or 0:8.1f} req/s  "
+                        f"p50 {resumo['p50_ms'] or 0:7.1f} ms  p99 {resumo['p99_ms'] or 0:7.1f} ms  "
+                        f"erros {resumo['erros']}"
+                    )
+            finally:
+                encerrar([processo])
+
+        if options['saida_json']:
+            with open(options['saida_json'], 'w', encoding='utf-8') as arquivo:
+                json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados gravados em {options['saida_json']}."))
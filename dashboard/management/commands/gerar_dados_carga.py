@@ -0,0 +1,32 @@
+import json
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from dashboard.carga import gerar_dados
+
+
+class Command(BaseCommand):
+    help = ('Semeia pedidos e notificações sintéticos no banco configurado (MONGO_DB) para '
+            'testes de carga. Não use contra o banco de produção.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pedidos', type=int, default=100000)
+        parser.add_argument('--notificacoes', type=int, default=20000)
+        parser.add_argument('--dias', type=int, default=365, help='Janela de datas dos documentos gerados.')
+        parser.add_argument('--lote', type=int, default=5000, help='Documentos por insert_many.')
+        parser.add_argument('--semente', type=int, help='Semente do gerador, para massas reproduzíveis.')
+        parser.add_argument('--json', action='store_true', help='Imprime o resumo em JSON.')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        resumo = gerar_dados(options['pedidos'], options['notificacoes'], options['dias'],
+                             options['lote'], options['semente'])
+        resumo['banco'] = settings.DATABASES['default']['NAME']
+        resumo['duracao_s'] = round(time.monotonic() - inicio, 2)
+        if options['json']:
+            self.stdout.write(json.dumps(resumo))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{resumo['pedidos']} pedidos e {resumo['notificacoes']} notificações gerados em "
+                f"'{resumo['banco']}' ({resumo['duracao_s']} s)."
+            ))
@@ -0,0 +1,20 @@
+import asyncio
+from django.core.management.base import BaseCommand
+from dashboard.robo_stream import MonitorRobo
+
+
+class Command(BaseCommand):
+    help = ('Acompanha a coleção dashboard_robo e publica robo.status no grupo do dashboard. '
+            'Use com ROBO_STREAM_AUTOSTART=0 quando houver mais de um worker.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--janela', type=float, default=None, help='Janela de coalescência em segundos.')
+        parser.add_argument('--polling', type=float, default=None, help='Intervalo do polling por _id em segundos.')
+
+    def handle(self, *args, **options):
+        monitor = MonitorRobo(janela=options['janela'], intervalo_polling=options['polling'])
+        self.stdout.write("Monitorando dashboard_robo (Ctrl+C para sair)...")
+        try:
+            asyncio.run(monitor.executar())
+        except KeyboardInterrupt:
+            monitor.parar()
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from dashboard.contadores import reconciliar_contadores
+
+
+class Command(BaseCommand):
+    help = 'Recalcula do zero o documento de contadores de pedidos usado pelo dashboard.'
+
+    def handle(self, *args, **options):
+        doc = reconciliar_contadores()
+        contagens = ', '.join(f"{k}={v}" for k, v in sorted(doc.items()) if k.startswith('status_'))
+        self.stdout.write(self.style.SUCCESS(
+            f"Contadores reconciliados: {contagens}, pendente_id={doc['pendente_id']}"
+        ))
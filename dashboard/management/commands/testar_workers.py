@@ -0,0 +1,102 @@
+import asyncio
+import json
+import shutil
+import subprocess
+import time
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from dashboard.broadcast import broadcast, frame_toast
+from dashboard.carga import porta_livre, esperar_porta, subir_daphne, encerrar
+from dashboard.coalescencia import desembrulhar
+
+BACKENDS = {
+    'redis': 'channels_redis.core.RedisChannelLayer',
+    'redis_pubsub': 'channels_redis.pubsub.RedisPubSubChannelLayer',
+}
+
+
+class Command(BaseCommand):
+    help = ('Sobe N workers Daphne usando um channel layer Redis (ou um redis-server local '
+            'temporário como stand-in), conecta um WebSocket em cada um e confirma que um '
+            'broadcast feito fora deles chega a todos. Requer o pacote "websockets".')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=3)
+        parser.add_argument('--backend', choices=sorted(BACKENDS), default='redis')
+        parser.add_argument('--redis-url', help='Redis já em execução; sem isso sobe um redis-server local.')
+        parser.add_argument('--timeout', type=float, default=15.0)
+
+    def handle(self, *args, **options):
+        try:
+            import websockets  # noqa: F401
+        except ImportError:
+            raise CommandError('Instale o pacote "websockets" para rodar o harness.')
+
+        processos = []
+        try:
+            redis_url = options['redis_url'] or self._subir_redis(processos, options['timeout'])
+            portas = self._subir_workers(processos, options['workers'], options['backend'], redis_url, options['timeout'])
+            resultado = asyncio.run(self._verificar(portas, options['backend'], redis_url, options['timeout']))
+        finally:
+            encerrar(processos)
+
+        for porta, latencia in sorted(resultado.items()):
+            status = f"{latencia * 1000:.1f} ms" if latencia is not None else "NÃO RECEBEU"
+            self.stdout.write(f"worker :{porta} -> {status}")
+        if any(latencia is None for latencia in resultado.values()):
+            raise CommandError('O broadcast não chegou a todos os workers.')
+        self.stdout.write(self.style.SUCCESS(f"Broadcast entregue aos {len(resultado)} workers."))
+
+    def _subir_redis(self, processos, timeout):
+        executavel = shutil.which('redis-server')
+        if not executavel:
+            raise CommandError('redis-server não encontrado; informe --redis-url.')
+        porta = porta_livre()
+        processos.append(subprocess.Popen(
+            [executavel, '--port', str(porta), '--save', '', '--appendonly', 'no'],
+            stdout=subprocess.DEVNULL,
+        ))
+        if not esperar_porta(porta, timeout):
+            raise CommandError('redis-server local não respondeu.')
+        return f'redis://127.0.0.1:{porta}/0'
+
+    def _subir_workers(self, processos, quantidade, backend, redis_url, timeout):
+        env = {'CHANNEL_LAYER': backend, 'REDIS_URL': redis_url, 'ROBO_STREAM_AUTOSTART': '0'}
+        portas = [porta_livre() for _ in range(quantidade)]
+        for porta in portas:
+            processos.append(subir_daphne(porta, env))
+        for porta in portas:
+            if not esperar_porta(porta, timeout):
+                raise CommandError(f'Worker na porta {porta} não subiu.')
+        return portas
+
+    async def _verificar(self, portas, backend, redis_url, timeout):
+        import websockets
+        from django.utils.module_loading import import_string
+
+        marcador = f'harness-{uuid.uuid4().hex}'
+        conexoes = {porta: await websockets.connect(f'ws://127.0.0.1:{porta}/ws/dashboard/') for porta in portas}
+        # Dá tempo de cada consumer entrar no grupo e enviar os frames iniciais
+        await asyncio.sleep(1)
+
+        async def aguardar(porta, ws, enviado_em):
+            limite = time.monotonic() + timeout
+            while time.monotonic() < limite:
+                try:
+                    frame = json.loads(await asyncio.wait_for(ws.recv(), limite - time.monotonic()))
+                except asyncio.TimeoutError:
+                    break
+                if any(f.get('toast_message') == marcador for f in desembrulhar(frame)):
+                    return porta, time.monotonic() - enviado_em
+            return porta, None
+
+        # O harness age como mais um worker: publica pelo mesmo Redis, fora dos Daphne
+        layer = import_string(BACKENDS[backend])(hosts=[redis_url])
+        try:
+            enviado_em = time.monotonic()
+            await broadcast(frame_toast(marcador, 'info'), channel_layer=layer)
+            resultados = await asyncio.gather(*(aguardar(p, ws, enviado_em) for p, ws in conexoes.items()))
+        finally:
+            for ws in conexoes.values():
+                await ws.close()
+        return dict(resultados)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from dashboard.indices import criar_indices, indices_faltando
+
+
+class Command(BaseCommand):
+    help = 'Lista os índices declarados nos modelos que não existem no MongoDB (e os cria com --criar).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--criar', action='store_true', help='Cria os índices ausentes.')
+
+    def handle(self, *args, **options):
+        if options['criar']:
+            criados = criar_indices()
+            for tabela, nome, chave in criados:
+                self.stdout.write(f"Criado {nome} {chave} em {tabela}")
+            self.stdout.write(self.style.SUCCESS(f"{len(criados)} índice(s) criado(s)."))
+            return
+
+        faltando = indices_faltando()
+        if not faltando:
+            self.stdout.write(self.style.SUCCESS("Todos os índices declarados existem."))
+            return
+        for tabela, nome, chave in faltando:
+            self.stdout.write(self.style.WARNING(f"Ausente: {nome} {chave} em {tabela}"))
+        raise CommandError(f"{len(faltando)} índice(s) ausente(s).")
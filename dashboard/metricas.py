@@ -0,0 +1,97 @@
+import threading
+from bisect import bisect_left
+
+# Registro de métricas em memória do processo, exposto em formato texto do Prometheus
+# pela view /metrics. Cada worker tem o seu registro; com vários workers o Prometheus
+# deve coletar cada um separadamente.
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_trava = threading.Lock()
+_metricas = {}
+
+
+class _Contador:
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda):
+        self.nome, self.ajuda = nome, ajuda
+        self.valores = {}
+
+    def inc(self, rotulos, valor=1):
+        with _trava:
+            self.valores[rotulos] = self.valores.get(rotulos, 0) + valor
+
+    def linhas(self):
+        for rotulos, valor in sorted(self.valores.items()):
+            yield f"{self.nome}{_formatar_rotulos(rotulos)} {valor}"
+
+
+class _Histograma:
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, buckets=BUCKETS_SEGUNDOS):
+        self.nome, self.ajuda, self.buckets = nome, ajuda, buckets
+        self.valores = {}
+
+    def observar(self, rotulos, valor):
+        with _trava:
+            contagens, soma = self.valores.get(rotulos, ([0] * (len(self.buckets) + 1), 0.0))
+            contagens[bisect_left(self.buckets, valor)] += 1
+            self.valores[rotulos] = (contagens, soma + valor)
+
+    def linhas(self):
+        for rotulos, (contagens, soma) in sorted(self.valores.items()):
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (float('inf'),), contagens):
+                acumulado += contagem
+                le = '+Inf' if limite == float('inf') else repr(limite)
+                yield f"{self.nome}_bucket{_formatar_rotulos(rotulos + (('le', le),))} {acumulado}"
+            yield f"{self.nome}_sum{_formatar_rotulos(rotulos)} {soma}"
+            yield f"{self.nome}_count{_formatar_rotulos(rotulos)} {acumulado}"
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_rotulos(rotulos):
+    if not rotulos:
+        return ''
+    pares = ','.join(f'{chave}="{_escapar(valor)}"' for chave, valor in rotulos)
+    return '{' + pares + '}'
+
+
+def _registrar(classe, nome, ajuda):
+    with _trava:
+        if nome not in _metricas:
+            _metricas[nome] = classe(nome, ajuda)
+        return _metricas[nome]
+
+
+def contador(nome, ajuda):
+    return _registrar(_Contador, nome, ajuda)
+
+
+def histograma(nome, ajuda):
+    return _registrar(_Histograma, nome, ajuda)
+
+
+def rotulos(**valores):
+    return tuple(sorted(valores.items()))
+
+
+def exportar():
+    blocos = []
+    with _trava:
+        for metrica in sorted(_metricas.values(), key=lambda m: m.nome):
+            blocos.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+            blocos.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+            blocos.extend(metrica.linhas())
+    return '\n'.join(blocos) + '\n'
+
+
+def limpar():
+    with _trava:
+        for metrica in _metricas.values():
+            metrica.valores.clear()
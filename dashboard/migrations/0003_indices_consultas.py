@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+
+def criar_indices(apps, schema_editor):
+    from dashboard.indices import criar_indices as criar
+    criar(app_registry=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_auto_20250627_1017'),
+    ]
+
+    # O estado registra os índices normalmente; no banco eles são criados pelo pymongo,
+    # que ignora chaves já indexadas com outro nome (o AddIndex do djongo falharia).
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='pedido',
+                    index=models.Index(fields=['status', 'id'], name='pedido_status_id_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='pedido',
+                    index=models.Index(fields=['data'], name='pedido_data_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='notificacao',
+                    index=models.Index(fields=['lida', 'data_criacao'], name='notif_lida_data_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='notificacao',
+                    index=models.Index(fields=['data_criacao'], name='notif_data_criacao_idx'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(criar_indices, migrations.RunPython.noop),
+            ],
+        ),
+    ]
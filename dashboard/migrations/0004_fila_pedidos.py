@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+
+def criar_indices(apps, schema_editor):
+    from dashboard.indices import criar_indices as criar
+    criar(app_registry=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='prioridade',
+            field=models.IntegerField(choices=[(0, 'Urgente'), (1, 'Alta'), (2, 'Normal'), (3, 'Baixa')], default=2, verbose_name='Prioridade na Fila'),
+        ),
+        # Mesmo esquema da 0003: índice no estado, criado no banco pelo pymongo
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='pedido',
+                    index=models.Index(fields=['status', 'prioridade', 'id'], name='pedido_fila_idx'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(criar_indices, migrations.RunPython.noop),
+            ],
+        ),
+    ]
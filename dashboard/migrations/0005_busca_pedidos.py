@@ -0,0 +1,54 @@
+from django.db import migrations, models
+import djongo.models.fields
+from pymongo import UpdateOne
+
+LOTE = 1000
+
+
+def criar_indices(apps, schema_editor):
+    from dashboard.indices import criar_indices as criar
+    criar(app_registry=apps)
+
+
+# Grava as chaves de busca nos pedidos que ainda não as têm, em lotes pelo pymongo
+def preencher_chaves_busca(apps, schema_editor):
+    from dashboard.busca import chaves_busca
+    from dashboard.mongo import get_database
+    colecao = get_database()[apps.get_model('dashboard', 'Pedido')._meta.db_table]
+    operacoes = []
+    for doc in colecao.find({'busca': {'$exists': False}}, {'_id': 1, 'pecas': 1}):
+        operacoes.append(UpdateOne({'_id': doc['_id']}, {'$set': {'busca': chaves_busca(doc.get('pecas'))}}))
+        if len(operacoes) >= LOTE:
+            colecao.bulk_write(operacoes, ordered=False)
+            operacoes = []
+    if operacoes:
+        colecao.bulk_write(operacoes, ordered=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_fila_pedidos'),
+    ]
+
+    # Campo e índice no estado; no banco as chaves são preenchidas e o índice criado pelo
+    # pymongo, como nas migrações 0003 e 0004
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='pedido',
+                    name='busca',
+                    field=djongo.models.fields.JSONField(default=list, editable=False, verbose_name='Chaves de Busca'),
+                ),
+                migrations.AddIndex(
+                    model_name='pedido',
+                    index=models.Index(fields=['busca', 'id'], name='pedido_busca_idx'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(preencher_chaves_busca, migrations.RunPython.noop),
+                migrations.RunPython(criar_indices, migrations.RunPython.noop),
+            ],
+        ),
+    ]
@@ -8,6 +8,19 @@ PEDIDO_STATUS_CHOICES = [
     (0, 'Concluído'),
 ]
 
+# Prioridade na fila de pedidos pendentes: menor valor sai primeiro
+PRIORIDADE_URGENTE = 0
+PRIORIDADE_ALTA = 1
+PRIORIDADE_NORMAL = 2
+PRIORIDADE_BAIXA = 3
+
+PRIORIDADE_CHOICES = [
+    (PRIORIDADE_URGENTE, 'Urgente'),
+    (PRIORIDADE_ALTA, 'Alta'),
+    (PRIORIDADE_NORMAL, 'Normal'),
+    (PRIORIDADE_BAIXA, 'Baixa'),
+]
+
 TIPO_FORMA_CHOICES = [
     ('circulo', 'Círculo'),
     ('quadrado', 'Quadrado'),
@@ -40,25 +53,45 @@ class Pedido(models.Model):
     data = models.DateTimeField(default=timezone.now, verbose_name="Data e Hora do Pedido")
     pecas = models.JSONField(verbose_name="IDs das Peças nas Montagens")
     status = models.IntegerField(choices=PEDIDO_STATUS_CHOICES, default=2, verbose_name="Status do Pedido")
+    prioridade = models.IntegerField(choices=PRIORIDADE_CHOICES, default=PRIORIDADE_NORMAL, verbose_name="Prioridade na Fila")
+    # Chaves de busca derivadas das montagens (ver dashboard/busca.py), gravadas no save
+    busca = models.JSONField(default=list, editable=False, verbose_name="Chaves de Busca")
 
     def __str__(self):
         return f"Pedido {self.pk} - Status: {self.get_status_display()}"
 
+    def chaves_busca(self):
+        from .busca import chaves_busca
+        return chaves_busca(self.pecas)
+
+    def save(self, *args, **kwargs):
+        self.busca = self.chaves_busca()
+        super().save(*args, **kwargs)
+
     def get_pecas_nomes(self):
+        from .catalogo import get_catalogo
+        catalogo = get_catalogo()
         flat_list_ids = [item for sublist in self.pecas for item in sublist]
-        pecas_obj = Peca.objects.filter(id__in=flat_list_ids)
-        peca_map = {p.id: p.name for p in pecas_obj}
-        return [peca_map.get(peca_id, "Desconhecido") for peca_id in flat_list_ids]
+        return [catalogo[peca_id].name if peca_id in catalogo else "Desconhecido" for peca_id in flat_list_ids]
 
     def get_pecas_shape_types(self):
+        from .catalogo import get_catalogo
+        catalogo = get_catalogo()
         flat_list_ids = [item for sublist in self.pecas for item in sublist]
-        pecas_obj = Peca.objects.filter(id__in=flat_list_ids)
-        peca_map = {p.id: p.tipo for p in pecas_obj}
-        return [peca_map.get(peca_id, "unknown") for peca_id in flat_list_ids]
+        return [catalogo[peca_id].tipo if peca_id in catalogo else "unknown" for peca_id in flat_list_ids]
 
     class Meta:
         verbose_name = "Pedido de Montagem"
         verbose_name_plural = "Pedidos de Montagem"
+        # Filtro por status com ordenação por id, intervalos de data (gráficos/histórico),
+        # a fila de pendentes (status=2 ordenado por prioridade e chegada) e a busca
+        # por peça/montagem (índice multikey sobre as chaves de busca)
+        indexes = [
+            models.Index(fields=['status', 'id'], name='pedido_status_id_idx'),
+            models.Index(fields=['data'], name='pedido_data_idx'),
+            models.Index(fields=['status', 'prioridade', 'id'], name='pedido_fila_idx'),
+            models.Index(fields=['busca', 'id'], name='pedido_busca_idx'),
+        ]
 
 
 # Modelo para Notificação
@@ -76,4 +109,9 @@ class Notificacao(models.Model):
     class Meta:
         verbose_name = "Notificação"
         verbose_name_plural = "Notificações"
-        ordering = ['-data_criacao']
\ No newline at end of file
+        ordering = ['-data_criacao']
+        # Contagem de não lidas e listagem das mais recentes
+        indexes = [
+            models.Index(fields=['lida', 'data_criacao'], name='notif_lida_data_idx'),
+            models.Index(fields=['data_criacao'], name='notif_data_criacao_idx'),
+        ]
\ No newline at end of file
@@ -0,0 +1,47 @@
+import threading
+from django.conf import settings
+from pymongo import MongoClient
+
+# Limites do pool usados quando settings.DATABASES['default']['CLIENT'] não define outros
+POOL_PADRAO = {
+    'maxPoolSize': 50,
+    'minPoolSize': 0,
+    'maxIdleTimeMS': 60000,
+    'waitQueueTimeoutMS': 5000,
+}
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _client_kwargs():
+    db_settings = settings.DATABASES['default']
+    kwargs = dict(POOL_PADRAO)
+    # Mesmo 'host' que o djongo recebe em CLIENT, para o ORM e o pymongo usarem o mesmo servidor
+    kwargs.setdefault('host', 'mongodb://localhost:27017/')
+    kwargs.update(db_settings.get('CLIENT', {}))
+    return kwargs
+
+
+# Cliente pymongo único por processo, criado na primeira chamada. O MongoClient já
+# mantém um pool de conexões thread-safe, então todo acesso direto ao MongoDB no app
+# (views, consumers, comandos) deve passar por aqui em vez de abrir um cliente novo.
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(**_client_kwargs())
+    return _client
+
+
+def get_database():
+    return get_client()[settings.DATABASES['default'].get('NAME', 'pi-iv')]
+
+
+def close_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
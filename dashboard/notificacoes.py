@@ -0,0 +1,13 @@
+from . import repositorio
+
+NOTIFICACOES_RECENTES = 10
+
+
+# Contagem com filtro em 'lida' pelo índice notif_lida_data_idx: custo constante
+# mesmo com meses de histórico, sem trazer as notificações para a memória.
+def contar_nao_lidas():
+    return repositorio.contar_nao_lidas()
+
+
+def listar_recentes(limite=NOTIFICACOES_RECENTES):
+    return repositorio.notificacoes_recentes(limite)
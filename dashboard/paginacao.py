@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+from django.utils import timezone
+from .models import Pedido, PEDIDO_STATUS_CHOICES
+from .busca import parse_busca, ids_pagina_busca
+from .repositorio import pedidos_por_ids
+
+PAGE_SIZE_PADRAO = 50
+PAGE_SIZE_MAXIMO = 200
+
+STATUS_VALIDOS = {valor for valor, _ in PEDIDO_STATUS_CHOICES}
+
+
+def _parse_int(valor, nome):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f'Parâmetro "{nome}" inválido: {valor}')
+
+
+def _parse_data(valor, nome):
+    # Datas chegam como 'AAAA-MM-DD' e são interpretadas no fuso do projeto
+    try:
+        dia = datetime.strptime(valor, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        raise ValueError(f'Parâmetro "{nome}" inválido: {valor} (use AAAA-MM-DD)')
+    return timezone.make_aware(dia, timezone.get_current_timezone())
+
+
+# Converte os parâmetros da requisição (QueryDict ou dict) nos filtros da paginação.
+# Lança ValueError com uma mensagem amigável se algum parâmetro for inválido.
+def parse_filtros_historico(params):
+    filtros = {'cursor': None, 'limit': PAGE_SIZE_PADRAO, 'status': None, 'data_inicio': None, 'data_fim': None,
+               'pedido_id': None, 'busca': []}
+
+    if params.get('cursor') not in (None, ''):
+        filtros['cursor'] = _parse_int(params.get('cursor'), 'cursor')
+
+    if params.get('limit') not in (None, ''):
+        limit = _parse_int(params.get('limit'), 'limit')
+        filtros['limit'] = max(1, min(limit, PAGE_SIZE_MAXIMO))
+
+    if params.get('status') not in (None, ''):
+        status = _parse_int(params.get('status'), 'status')
+        if status not in STATUS_VALIDOS:
+            raise ValueError(f'Status inválido: {status}')
+        filtros['status'] = status
+
+    if params.get('data_inicio'):
+        filtros['data_inicio'] = _parse_data(params.get('data_inicio'), 'data_inicio')
+
+    if params.get('data_fim'):
+        # data_fim é inclusiva: o filtro vai até o início do dia seguinte
+        filtros['data_fim'] = _parse_data(params.get('data_fim'), 'data_fim') + timedelta(days=1)
+
+    busca = parse_busca(params)
+    if busca['status'] is not None:
+        # Status digitado na busca equivale ao filtro de status
+        if filtros['status'] not in (None, busca['status']):
+            raise ValueError('A busca e o filtro pedem status diferentes.')
+        filtros['status'] = busca['status']
+    filtros['pedido_id'] = busca['pedido_id']
+    filtros['busca'] = busca['busca']
+
+    return filtros
+
+
+# Retorna (pedidos, next_cursor) usando paginação por chave (id decrescente).
+# O cursor é o id do último pedido da página anterior; a próxima página começa no
+# primeiro id menor que ele, então o custo não depende do tamanho do histórico.
+# Com chaves de busca (peça/montagem) os ids da página vêm do índice de busca pelo
+# pymongo e só esses pedidos são carregados (dashboard/repositorio.py).
+def buscar_pagina_pedidos(cursor=None, limit=PAGE_SIZE_PADRAO, status=None, data_inicio=None, data_fim=None,
+                          pedido_id=None, busca=None):
+    if busca:
+        filtros = {'status': status, 'data_inicio': data_inicio, 'data_fim': data_fim,
+                   'pedido_id': pedido_id, 'busca': busca}
+        ids = ids_pagina_busca(filtros, cursor, limit + 1)
+        pedidos = pedidos_por_ids(ids)
+        next_cursor = pedidos[limit - 1].id if len(pedidos) > limit else None
+        return pedidos[:limit], next_cursor
+
+    qs = Pedido.objects.all()
+    if pedido_id is not None:
+        qs = qs.filter(id=pedido_id)
+    if status is not None:
+        qs = qs.filter(status=status)
+    if data_inicio is not None:
+        qs = qs.filter(data__gte=data_inicio)
+    if data_fim is not None:
+        qs = qs.filter(data__lt=data_fim)
+    if cursor is not None:
+        qs = qs.filter(id__lt=cursor)
+
+    # Busca um item a mais só para saber se existe próxima página
+    pedidos = list(qs.order_by('-id')[:limit + 1])
+    next_cursor = pedidos[limit - 1].id if len(pedidos) > limit else None
+    return pedidos[:limit], next_cursor
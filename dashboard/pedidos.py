@@ -0,0 +1,86 @@
+from django.utils import timezone
+from pymongo import ReturnDocument
+from .models import Pedido, PRIORIDADE_CHOICES, PRIORIDADE_NORMAL
+from .catalogo import get_catalogo
+from .mongo import get_database
+
+STATUS_PENDENTE = 2
+PECAS_POR_PEDIDO = 9
+PECAS_POR_MONTAGEM = 3
+PEDIDOS_LOTE_MAXIMO = 500
+
+PRIORIDADES_VALIDAS = {valor for valor, _ in PRIORIDADE_CHOICES}
+
+
+def ids_pecas_cadastradas():
+    return set(get_catalogo())
+
+
+# Valida as 9 peças de um pedido ({'peca1': ..., 'peca9': ...}) contra o conjunto de
+# ids já carregado em memória e devolve a matriz 3x3 de montagens.
+# Lança ValueError com a mesma mensagem que a API devolve ao cliente.
+def validar_pecas_pedido(data_json, ids_validos):
+    pecas_ids = []
+    for i in range(1, PECAS_POR_PEDIDO + 1):
+        peca_str_id = data_json.get(f'peca{i}')
+        if peca_str_id is None:
+            raise ValueError(f'Peça {i} não fornecida.')
+        try:
+            peca_id = int(peca_str_id)
+        except (TypeError, ValueError):
+            peca_id = None
+        if peca_id not in ids_validos:
+            raise ValueError(f'Peça inválida ou não encontrada: {peca_str_id}')
+        pecas_ids.append(peca_id)
+
+    matriz_pecas_ids = [pecas_ids[i:i + PECAS_POR_MONTAGEM] for i in range(0, PECAS_POR_PEDIDO, PECAS_POR_MONTAGEM)]
+    for idx, montagem in enumerate(matriz_pecas_ids, 1):
+        if len(set(montagem)) < PECAS_POR_MONTAGEM:
+            raise ValueError(f'Montagem {idx} contém peças repetidas.')
+    return matriz_pecas_ids
+
+
+# Prioridade opcional enviada pelo cliente; ausente = normal
+def parse_prioridade(valor):
+    if valor in (None, ''):
+        return PRIORIDADE_NORMAL
+    try:
+        prioridade = int(valor)
+    except (TypeError, ValueError):
+        prioridade = None
+    if prioridade not in PRIORIDADES_VALIDAS:
+        raise ValueError(f'Prioridade inválida: {valor}')
+    return prioridade
+
+
+# Reserva 'qtd' ids sequenciais no mesmo contador que o djongo usa para o AutoField
+# (coleção __schema__), para que documentos inseridos direto pelo pymongo não colidam
+# com os criados pelo ORM.
+def _reservar_ids(qtd, modelo=Pedido):
+    schema = get_database()['__schema__'].find_one_and_update(
+        {'name': modelo._meta.db_table, 'auto': {'$exists': True}},
+        {'$inc': {'auto.seq': qtd}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if schema is None:
+        raise RuntimeError(f"Contador de ids de {modelo._meta.db_table} não encontrado; rode as migrações.")
+    ultimo = int(schema['auto']['seq'])
+    return list(range(ultimo - qtd + 1, ultimo + 1))
+
+
+# Insere todos os pedidos com um único insert_many e devolve as instâncias (não salvas
+# de novo) com id preenchido, na ordem recebida. 'prioridades' acompanha 'matrizes'.
+def criar_pedidos_em_lote(matrizes, status=STATUS_PENDENTE, prioridades=None):
+    agora = timezone.now()
+    ids = _reservar_ids(len(matrizes))
+    prioridades = prioridades or [PRIORIDADE_NORMAL] * len(matrizes)
+    pedidos = [
+        Pedido(id=pedido_id, data=agora, pecas=matriz, status=status, prioridade=prioridade)
+        for pedido_id, matriz, prioridade in zip(ids, matrizes, prioridades)
+    ]
+    get_database()[Pedido._meta.db_table].insert_many(
+        [{'id': p.id, 'data': p.data, 'pecas': p.pecas, 'status': p.status, 'prioridade': p.prioridade,
+          'busca': p.chaves_busca()} for p in pedidos],
+        ordered=True,
+    )
+    return pedidos
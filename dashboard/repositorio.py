@@ -0,0 +1,84 @@
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import DEFERRED
+from .models import Pedido, Notificacao
+from .mongo import get_database
+
+# Consultas quentes escritas direto no pymongo. O djongo traduz cada chamada do ORM
+# de SQL para comandos do MongoDB em tempo de execução, e nessas consultas pequenas
+# (contagens, o primeiro da fila, notificações recentes) a tradução custa mais que a
+# própria consulta. Os modelos continuam sendo o esquema: coleções e colunas vêm de
+# _meta, e os documentos voltam como instâncias do modelo (Model.from_db), então quem
+# chama não percebe a diferença. Compare com: manage.py benchmark_repositorio.
+
+STATUS_PENDENTE = 2
+
+CAMPOS_PEDIDO = ('id', 'data', 'status', 'prioridade', 'pecas')
+CAMPOS_NOTIFICACAO = ('id', 'titulo', 'mensagem', 'data_criacao', 'lida', 'tipo', 'link')
+
+
+def _colecao(modelo):
+    return get_database()[modelo._meta.db_table]
+
+
+def _projecao(modelo, campos):
+    projecao = {modelo._meta.get_field(nome).column: 1 for nome in campos}
+    projecao['_id'] = 0
+    return projecao
+
+
+def _valor(valor):
+    # O pymongo devolve datas em UTC sem fuso; o ORM as devolveria com fuso
+    if settings.USE_TZ and isinstance(valor, datetime) and valor.tzinfo is None:
+        return valor.replace(tzinfo=dt_timezone.utc)
+    return valor
+
+
+# Documento -> instância do modelo; campos fora da projeção ficam adiados (DEFERRED)
+def _instancia(modelo, doc):
+    campos = modelo._meta.concrete_fields
+    valores = [_valor(doc[campo.column]) if campo.column in doc else DEFERRED for campo in campos]
+    return modelo.from_db(DEFAULT_DB_ALIAS, [campo.attname for campo in campos], valores)
+
+
+def contar_pedidos(status=None):
+    return _colecao(Pedido).count_documents({} if status is None else {'status': status})
+
+
+# Primeiro pedido da fila de pendentes (prioridade, depois chegada), pelo pedido_fila_idx
+def primeiro_da_fila():
+    doc = _colecao(Pedido).find_one(
+        {'status': STATUS_PENDENTE},
+        _projecao(Pedido, ('id', 'data', 'status', 'prioridade')),
+        sort=[('prioridade', 1), ('id', 1)],
+    )
+    return _instancia(Pedido, doc) if doc else None
+
+
+# Pedidos com os ids dados, do mais novo para o mais antigo
+def pedidos_por_ids(ids, campos=CAMPOS_PEDIDO):
+    ids = list(ids)
+    if not ids:
+        return []
+    cursor = _colecao(Pedido).find({'id': {'$in': ids}}, _projecao(Pedido, campos)).sort('id', -1)
+    return [_instancia(Pedido, doc) for doc in cursor]
+
+
+# count_documents com filtro em 'lida' usa o notif_lida_data_idx
+def contar_nao_lidas():
+    return _colecao(Notificacao).count_documents({'lida': False})
+
+
+def notificacoes_recentes(limite):
+    cursor = _colecao(Notificacao).find({}, _projecao(Notificacao, CAMPOS_NOTIFICACAO))
+    return [_instancia(Notificacao, doc) for doc in cursor.sort('data_criacao', -1).limit(limite)]
+
+
+# Uma única escrita em vez de exists() + update(): devolve False se a notificação não existe
+def marcar_notificacao_lida(notificacao_id):
+    return _colecao(Notificacao).update_one({'id': notificacao_id}, {'$set': {'lida': True}}).matched_count > 0
+
+
+def marcar_todas_lidas():
+    return _colecao(Notificacao).update_many({'lida': False}, {'$set': {'lida': True}}).modified_count
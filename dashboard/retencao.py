@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from pymongo import ReplaceOne
+from .models import Notificacao
+from .mongo import get_database
+from .codificacao import dumps_texto, loads
+
+logger = logging.getLogger(__name__)
+
+COLECAO_ARQUIVO = 'dashboard_notificacao_arquivo'
+DESTINOS = ('colecao', 'jsonl')
+LOTE_PADRAO = 500
+
+_tarefa = None
+
+
+def _compactar(doc, arquivada_em):
+    # Só o necessário para auditoria; 'lida' é sempre True aqui e fica de fora
+    return {
+        '_id': doc['_id'],
+        'id': doc.get('id'),
+        'titulo': doc.get('titulo'),
+        'mensagem': doc.get('mensagem'),
+        'tipo': doc.get('tipo'),
+        'link': doc.get('link'),
+        'data_criacao': doc.get('data_criacao'),
+        'arquivada_em': arquivada_em,
+    }
+
+
+def _linha_jsonl(doc):
+    return dumps_texto({
+        **doc,
+        '_id': str(doc['_id']),
+        'data_criacao': doc['data_criacao'].isoformat() if doc.get('data_criacao') else None,
+        'arquivada_em': doc['arquivada_em'].isoformat(),
+    })
+
+
+# Só o último lote de uma execução interrompida pode estar no arquivo e ainda na coleção
+# (o delete vem depois da gravação), então basta comparar com as últimas linhas: o custo
+# não cresce com o arquivo. Uma linha incompleta (queda no meio da escrita) é ignorada;
+# a notificação dela continua na coleção e é gravada de novo.
+def _ids_no_fim_do_arquivo(arquivo, linhas, bloco=64 * 1024):
+    if not os.path.exists(arquivo):
+        return set()
+    with open(arquivo, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        posicao = f.tell()
+        fim = b''
+        # Uma linha a mais: a primeira do trecho lido pode estar cortada ao meio
+        while posicao > 0 and fim.count(b'\n') <= linhas:
+            tamanho = min(bloco, posicao)
+            posicao -= tamanho
+            f.seek(posicao)
+            fim = f.read(tamanho) + fim
+    ids = set()
+    for linha in fim.splitlines()[-linhas:]:
+        try:
+            ids.add(loads(linha)['_id'])
+        except (ValueError, KeyError, TypeError):
+            continue
+    return ids
+
+
+def _abrir_jsonl(arquivo):
+    saida = open(arquivo, 'a', encoding='utf-8')
+    if saida.tell() > 0:
+        with open(arquivo, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                # Começa numa linha nova em vez de emendar na linha incompleta
+                saida.write('\n')
+    return saida
+
+
+# Move notificações lidas com mais de 'dias' dias para o arquivo (coleção compacta ou
+# arquivo JSONL) e as apaga da coleção principal, em lotes pequenos por _id: cada lote
+# é copiado antes de ser apagado e as leituras do dashboard seguem normais durante o job.
+# A cópia acontece pelo menos uma vez: uma queda entre a cópia e o delete deixa o lote
+# nos dois lugares, e a reexecução o copia de novo. Por isso a coleção usa upsert por _id
+# e o JSONL pula os _ids que já estão no fim do arquivo (um lote, de pelo menos LOTE_PADRAO
+# linhas), então reexecutar após uma falha é seguro.
+# Retorna quantas notificações foram (ou seriam, com simular=True) movidas.
+def arquivar_notificacoes(dias=None, destino='colecao', arquivo=None, lote=LOTE_PADRAO, simular=False):
+    if destino not in DESTINOS:
+        raise ValueError(f'Destino inválido: {destino}')
+    if destino == 'jsonl' and not arquivo and not simular:
+        raise ValueError('Informe o arquivo JSONL de destino.')
+
+    dias = settings.NOTIFICACOES_RETENCAO_DIAS if dias is None else dias
+    db = get_database()
+    notificacoes = db[Notificacao._meta.db_table]
+    filtro = {'lida': True, 'data_criacao': {'$lt': timezone.now() - timedelta(days=dias)}}
+
+    saida = None
+    if destino == 'jsonl' and not simular:
+        ja_arquivados = _ids_no_fim_do_arquivo(arquivo, max(lote, LOTE_PADRAO))
+        saida = _abrir_jsonl(arquivo)
+    movidas = 0
+    ultimo_id = None
+    try:
+        while True:
+            filtro_lote = dict(filtro)
+            if ultimo_id is not None:
+                filtro_lote['_id'] = {'$gt': ultimo_id}
+            docs = list(notificacoes.find(filtro_lote, sort=[('_id', 1)], limit=lote))
+            if not docs:
+                break
+            ultimo_id = docs[-1]['_id']
+            movidas += len(docs)
+            if simular:
+                continue
+
+            arquivada_em = timezone.now()
+            compactos = [_compactar(doc, arquivada_em) for doc in docs]
+            if saida is not None:
+                saida.writelines(
+                    _linha_jsonl(doc) + '\n' for doc in compactos if str(doc['_id']) not in ja_arquivados
+                )
+                saida.flush()
+                os.fsync(saida.fileno())
+            else:
+                db[COLECAO_ARQUIVO].bulk_write(
+                    [ReplaceOne({'_id': doc['_id']}, doc, upsert=True) for doc in compactos],
+                    ordered=False,
+                )
+            notificacoes.delete_many({'_id': {'$in': [doc['_id'] for doc in docs]}, 'lida': True})
+    finally:
+        if saida is not None:
+            saida.close()
+    return movidas
+
+
+async def _executar_periodicamente(intervalo_segundos):
+    while True:
+        await asyncio.sleep(intervalo_segundos)
+        try:
+            movidas = await sync_to_async(arquivar_notificacoes, thread_sensitive=False)()
+            logger.info("Retenção de notificações: %d arquivada(s)", movidas)
+        except Exception:
+            logger.exception("Erro na retenção periódica de notificações")
+
+
+# Agenda o job no event loop do servidor ASGI se NOTIFICACOES_RETENCAO_INTERVALO_HORAS > 0
+def iniciar_retencao_periodica():
+    global _tarefa
+    intervalo_horas = settings.NOTIFICACOES_RETENCAO_INTERVALO_HORAS
+    if intervalo_horas <= 0:
+        return None
+    if _tarefa is None or _tarefa.done():
+        _tarefa = asyncio.get_running_loop().create_task(_executar_periodicamente(intervalo_horas * 3600))
+    return _tarefa
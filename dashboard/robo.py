@@ -0,0 +1,48 @@
+import threading
+import time
+from django.conf import settings
+from .mongo import get_database
+
+# Repositório de leitura da coleção 'dashboard_robo', alimentada pelo Node-RED/CLP
+COLECAO_ROBO = 'dashboard_robo'
+ESTADO_DESCONHECIDO = 'Desconhecido'
+
+_cache = {'doc': None, 'expira_em': 0.0}
+_cache_lock = threading.Lock()
+
+
+def ler_ultimo_status():
+    return get_database()[COLECAO_ROBO].find_one(sort=[('_id', -1)])
+
+
+# Último documento de status com cache curto: dentro do intervalo, uma rajada de
+# acessos à home faz no máximo uma consulta (as demais esperam o lock e reaproveitam).
+def ultimo_status(ttl=None):
+    ttl = settings.ROBO_STATUS_CACHE_TTL if ttl is None else ttl
+    if ttl <= 0:
+        return ler_ultimo_status()
+
+    with _cache_lock:
+        agora = time.monotonic()
+        if agora >= _cache['expira_em']:
+            _cache['doc'] = ler_ultimo_status()
+            _cache['expira_em'] = agora + ttl
+        return _cache['doc']
+
+
+def estado_robo(ttl=None):
+    doc = ultimo_status(ttl)
+    return doc.get('status', ESTADO_DESCONHECIDO) if doc else ESTADO_DESCONHECIDO
+
+
+# Usado pelo monitor de mudanças (dashboard.robo_stream) para manter o cache da home em dia
+def atualizar_cache(doc, ttl=None):
+    ttl = settings.ROBO_STATUS_CACHE_TTL if ttl is None else ttl
+    with _cache_lock:
+        _cache['doc'] = doc
+        _cache['expira_em'] = time.monotonic() + ttl
+
+
+def invalidar_cache():
+    with _cache_lock:
+        _cache['expira_em'] = 0.0
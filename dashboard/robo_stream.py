@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from pymongo.errors import OperationFailure, PyMongoError
+from . import robo, despacho
+from .broadcast import broadcast, frame_robo_status
+from .mongo import get_database
+
+logger = logging.getLogger(__name__)
+
+_tarefa = None
+
+
+def _bloqueante(func, *args, **kwargs):
+    # Chamadas pymongo bloqueantes rodam no pool de threads, fora do event loop
+    return sync_to_async(func, thread_sensitive=False)(*args, **kwargs)
+
+
+# Acompanha a coleção 'dashboard_robo' e publica 'robo.status' no grupo do dashboard.
+# Usa change streams quando o MongoDB é um replica set; em servidor standalone cai
+# para um polling por _id (a coleção recebe um documento novo a cada mudança do CLP).
+# Rajadas dentro da janela de coalescência viram um único envio com o último estado.
+class MonitorRobo:
+    def __init__(self, janela=None, intervalo_polling=None, channel_layer=None):
+        self.janela = settings.ROBO_STREAM_JANELA if janela is None else janela
+        self.intervalo_polling = settings.ROBO_STREAM_POLLING if intervalo_polling is None else intervalo_polling
+        self.channel_layer = channel_layer
+        self._parar = False
+        self._ultimo_estado = None
+
+    def parar(self):
+        self._parar = True
+
+    async def publicar(self, doc):
+        robo.atualizar_cache(doc)
+        frame = frame_robo_status(doc)
+        if frame['status'] != self._ultimo_estado:
+            self._ultimo_estado = frame['status']
+            await broadcast(frame, channel_layer=self.channel_layer)
+        # Robô ocioso: tenta entregar o próximo pedido da fila (ver dashboard.despacho)
+        if settings.DESPACHO_AUTOMATICO and despacho.robo_ocioso(doc):
+            frames = await _bloqueante(despacho.despachar_proximo, doc)
+            if frames:
+                await broadcast(*frames, channel_layer=self.channel_layer)
+
+    async def _via_change_stream(self, colecao):
+        pipeline = [{'$match': {'operationType': {'$in': ['insert', 'update', 'replace']}}}]
+        max_await_ms = max(int(self.janela * 1000), 50)
+        stream = await _bloqueante(colecao.watch, pipeline, full_document='updateLookup', max_await_time_ms=max_await_ms)
+        logger.info("Monitor do robô usando change streams")
+        try:
+            while not self._parar:
+                change = await _bloqueante(stream.try_next)
+                if change is None:
+                    continue
+                doc = change.get('fullDocument')
+                # Drena o restante da rajada e fica só com o estado mais recente
+                limite = time.monotonic() + self.janela
+                while time.monotonic() < limite:
+                    seguinte = await _bloqueante(stream.try_next)
+                    if seguinte is None:
+                        break
+                    doc = seguinte.get('fullDocument') or doc
+                if doc is not None:
+                    await self.publicar(doc)
+        finally:
+            await _bloqueante(stream.close)
+
+    async def _via_polling(self, colecao):
+        logger.info("Monitor do robô usando polling por _id a cada %.2fs", self.intervalo_polling)
+        ultimo = await _bloqueante(colecao.find_one, sort=[('_id', -1)])
+        ultimo_id = ultimo['_id'] if ultimo else None
+        if ultimo:
+            await self.publicar(ultimo)
+        while not self._parar:
+            await asyncio.sleep(self.intervalo_polling)
+            filtro = {'_id': {'$gt': ultimo_id}} if ultimo_id is not None else {}
+            doc = await _bloqueante(colecao.find_one, filtro, sort=[('_id', -1)])
+            if doc:
+                ultimo_id = doc['_id']
+                await self.publicar(doc)
+
+    async def executar(self):
+        colecao = get_database()[robo.COLECAO_ROBO]
+        usar_change_stream = True
+        while not self._parar:
+            try:
+                if usar_change_stream:
+                    await self._via_change_stream(colecao)
+                else:
+                    await self._via_polling(colecao)
+            except OperationFailure as e:
+                if usar_change_stream:
+                    logger.info("Change streams indisponíveis (%s); usando polling", e)
+                    usar_change_stream = False
+                else:
+                    logger.exception("Erro no monitor do robô, tentando novamente em 5s")
+                    await asyncio.sleep(5)
+            except PyMongoError:
+                logger.exception("Erro no monitor do robô, tentando novamente em 5s")
+                await asyncio.sleep(5)
+
+
+# Inicia (uma vez por processo) o monitor como tarefa no event loop do servidor ASGI
+def iniciar_monitor_robo():
+    global _tarefa
+    if _tarefa is None or _tarefa.done():
+        _tarefa = asyncio.get_running_loop().create_task(MonitorRobo().executar())
+    return _tarefa
@@ -1,8 +1,13 @@
 # dashboard/routing.py
 
-from django.urls import re_path
+from django.urls import path, re_path
 from . import consumers
 
 websocket_urlpatterns = [
     re_path(r'ws/dashboard/$', consumers.DashboardConsumer.as_asgi()),
-]
\ No newline at end of file
+]
+
+# Rotas HTTP atendidas por consumers antes de cair no Django (setup/asgi.py)
+http_urlpatterns = [
+    path('pedidos/exportar/', consumers.ExportacaoConsumer.as_asgi()),
+]
@@ -0,0 +1,74 @@
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from .models import PEDIDO_STATUS_CHOICES
+from .catalogo import catalogo_com_versao
+
+# Serialização única de pedidos para o histórico (página, JSON paginado, WebSocket e
+# deltas). Cada pedido vira o mesmo dicionário em todos os caminhos, e o resultado fica
+# memoizado por (id, status, versão do catálogo): um broadcast ou uma nova página só
+# formata os pedidos que ainda não foram vistos ou que mudaram de status.
+
+STATUS_MAP = dict(PEDIDO_STATUS_CHOICES)
+STATUS_DESCONHECIDO = "Desconhecido"
+
+PECA_NAO_ENCONTRADA = (None, "desconhecida", "Peça não encontrada")
+
+_tabela = {'versao': None, 'linhas': None}
+_memo = OrderedDict()
+_lock = threading.Lock()
+
+
+# Tabela id -> (id, tipo, nome) montada uma vez por versão do catálogo
+def _tabela_pecas(catalogo, versao):
+    if _tabela['linhas'] is None or _tabela['versao'] != versao:
+        _tabela.update(
+            versao=versao,
+            linhas={pid: (peca.id, peca.tipo, peca.name) for pid, peca in catalogo.items()},
+        )
+    return _tabela['linhas']
+
+
+def _serializar(pedido, tabela):
+    montagens = pedido.pecas if isinstance(pedido.pecas, list) else []
+    pecas = [
+        tabela.get(pid, PECA_NAO_ENCONTRADA)
+        for montagem in montagens if isinstance(montagem, list)
+        for pid in montagem
+    ]
+    ids, shapes, names = (list(coluna) for coluna in zip(*pecas)) if pecas else ([], [], [])
+    return {
+        'id': pedido.id,
+        'status': STATUS_MAP.get(pedido.status, STATUS_DESCONHECIDO),
+        'pecas_list_ids': ids,
+        'pecas_list_shapes': shapes,
+        'pecas_list_names': names,
+        'data': pedido.data.strftime("%d/%m/%Y %H:%M") if pedido.data else "Sem data"
+    }
+
+
+# Os dicionários devolvidos são compartilhados com o cache: trate-os como somente leitura
+def formatar_pedidos(pedidos):
+    catalogo, versao = catalogo_com_versao()
+    limite = settings.SERIALIZACAO_MEMO_MAX
+    resultado = []
+    with _lock:
+        tabela = _tabela_pecas(catalogo, versao)
+        for pedido in pedidos:
+            chave = (pedido.id, pedido.status, versao)
+            formatado = _memo.get(chave)
+            if formatado is None:
+                formatado = _serializar(pedido, tabela)
+                _memo[chave] = formatado
+                if len(_memo) > limite:
+                    _memo.popitem(last=False)
+            else:
+                _memo.move_to_end(chave)
+            resultado.append(formatado)
+    return resultado
+
+
+def limpar_memo():
+    with _lock:
+        _memo.clear()
+        _tabela.update(versao=None, linhas=None)
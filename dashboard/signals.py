@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Peca, Pedido
+from .catalogo import invalidar_catalogo
+from .contadores import marcar_alteracao, versao_ja_registrada
+
+
+@receiver(post_save, sender=Peca)
+@receiver(post_delete, sender=Peca)
+def peca_alterada(sender, **kwargs):
+    invalidar_catalogo()
+
+
+# Saves e exclusões pelo ORM (admin, shell, testes) também mudam a versão dos dados.
+# Criações feitas pela aplicação já a avançam junto com os contadores (registrar_criacao)
+@receiver(post_save, sender=Pedido)
+@receiver(post_delete, sender=Pedido)
+def pedido_alterado(sender, instance, created=False, **kwargs):
+    if versao_ja_registrada(instance, created):
+        return
+    marcar_alteracao()
@@ -1,6 +1,6 @@
 import { showLoader, hideLoader, setupGlobalTooltips } from '/static/js/modules/utils.js';
 import { connectWebSocket, initializeNotifications } from '/static/js/modules/notifications.js';
-import { initializeModals } from '/static/js/modules/modals.js';
+import { initializeModals, showOrderDetailsModal } from '/static/js/modules/modals.js';
 import { updateOrdersChart } from '/static/js/modules/charts.js';
 import { newOrderForm, confirmOrderButton, initializeNewOrderPieceSelectors, handleConfirmOrderClick } from '/static/js/modules/newOrder.js';
 
@@ -44,34 +44,96 @@ function updateDashboardUI(data) {
     }
 }
 
-function updateHistoricoUI(pedidos) {
-    if (window.location.pathname !== '/pedidos/historico') return;
-    const pedidosContainer = document.getElementById('pedidos-container');
-    if (!pedidosContainer) return;
+const robotStatusEl = document.getElementById('robot-status');
+
+// Mesmo markup do bloco "Estado do Robô" em home.html
+function updateRobotStatusUI(status) {
+    if (!robotStatusEl) return;
+    switch (status) {
+        case 'Ocioso':
+            robotStatusEl.innerHTML = '<i class="fas fa-circle text-green-500 text-base animate-pulse"></i> <span class="text-green-600">Ocioso</span>';
+            break;
+        case 'Em Montagem':
+            robotStatusEl.innerHTML = '<i class="fas fa-spinner fa-spin text-yellow-500 text-base"></i> <span class="text-yellow-700">Em Montagem</span>';
+            break;
+        case 'Erro':
+            robotStatusEl.innerHTML = '<i class="fas fa-exclamation-triangle text-red-500 text-base animate-bounce"></i> <span class="text-red-700">Erro!</span>';
+            break;
+        default: {
+            robotStatusEl.innerHTML = '<i class="fas fa-question-circle text-gray-400 text-base"></i> <span class="text-gray-600"></span>';
+            robotStatusEl.querySelector('span').textContent = status;
+        }
+    }
+}
+
+function statusSpanHTML(status) {
+    switch (status) {
+        case 'Em Andamento': return '<span class="text-yellow-600 font-semibold">Em andamento</span>';
+        case 'Concluído': return '<span class="text-green-600 font-semibold">Concluído</span>';
+        case 'Cancelado': return '<span class="text-red-600 font-semibold">Cancelado</span>';
+        default: return `<span class="text-gray-600">${status}</span>`;
+    }
+}
+
+function createPedidoItem(pedido) {
+    const li = document.createElement('li');
+    li.className = 'pedido-item w-full flex flex-col sm:flex-row sm:items-center justify-between p-3 bg-gray-50 rounded-lg shadow-sm cursor-pointer hover:bg-gray-100 transition-colors duration-200 hover-scale-105 active-scale-95';
+    li.setAttribute('role', 'listitem');
+    li.setAttribute('tabindex', '0');
+    li.dataset.id = pedido.id;
+    li.innerHTML = `
+        <div class="mb-3 sm:mb-0 sm:max-w-xs">
+            <p class="text-xs sm:text-sm text-gray-600">Pedido ID: <span class="font-semibold text-gray-800">${pedido.id}</span></p>
+            <p class="text-xs sm:text-sm text-gray-600">Data: <span class="font-semibold text-gray-800">${pedido.data}</span></p>
+            <p class="text-xs sm:text-sm text-gray-600">Status: <span class="pedido-status"></span></p>
+        </div>
+    `;
+    li.addEventListener('click', function() {
+        const { id, status, pecas } = this.dataset;
+        showOrderDetailsModal(id, status, pecas);
+    });
+    return li;
+}
 
-    pedidosContainer.innerHTML = '';
+function applyPedidoToItem(li, pedido) {
+    li.dataset.status = pedido.status;
+    li.dataset.pecas = pedido.pecas_list_ids.join(',');
+    li.setAttribute('aria-label', `Detalhes do pedido ${pedido.id}, status ${pedido.status}`);
+    const statusEl = li.querySelector('.pedido-status');
+    if (statusEl) statusEl.outerHTML = `<span class="pedido-status">${statusSpanHTML(pedido.status)}</span>`;
+}
+
+// Aplica um delta do histórico: atualiza os pedidos já listados e insere os novos no topo
+function applyHistoricoDelta(pedidos) {
+    if (window.location.pathname !== '/pedidos/historico') return;
+    const lista = document.getElementById('pedidoLista');
+    if (!lista) return;
 
     pedidos.forEach(pedido => {
-        const div = document.createElement('div');
-        div.classList.add('pedido-item');
-        div.innerHTML = `
-            <h3>Pedido #${pedido.id} - Status: ${pedido.status}</h3>
-            <p>Data: ${pedido.data}</p>
-            <p>Peças: ${pedido.pecas_list_names.join(', ')}</p>
-        `;
-        pedidosContainer.appendChild(div);
+        let li = lista.querySelector(`.pedido-item[data-id="${pedido.id}"]`);
+        if (!li) {
+            const params = new URLSearchParams(window.location.search);
+            const isFirstPage = !params.has('cursor');
+            // Com uma busca ativa o pedido novo pode não atender ao filtro: não é inserido
+            const hasSearch = ['search', 'peca', 'montagem'].some(nome => params.get(nome));
+            if (!isFirstPage || hasSearch) return;
+            li = createPedidoItem(pedido);
+            lista.prepend(li);
+        }
+        applyPedidoToItem(li, pedido);
     });
 }
 
 document.addEventListener('dashboardUpdate', (event) => {
     updateDashboardUI(event.detail);
+});
 
-    if (window.location.pathname === '/pedidos/historico') {
-        fetch('/pedidos/json/')
-            .then(res => res.ok ? res.json() : Promise.reject('Failed to fetch'))
-            .then(data => updateHistoricoUI(data.pedidos))
-            .catch(console.error);
-    }
+document.addEventListener('roboStatus', (event) => {
+    updateRobotStatusUI(event.detail);
+});
+
+document.addEventListener('historicoDelta', (event) => {
+    applyHistoricoDelta(event.detail);
 });
 
 document.addEventListener('DOMContentLoaded', () => {
@@ -97,5 +159,7 @@ document.addEventListener('DOMContentLoaded', () => {
         document.getElementById('filter7Days')?.addEventListener('click', () => updateOrdersChart('7days'));
         document.getElementById('filter30Days')?.addEventListener('click', () => updateOrdersChart('30days'));
         document.getElementById('filterThisMonth')?.addEventListener('click', () => updateOrdersChart('this_month'));
+        document.getElementById('filter90Days')?.addEventListener('click', () => updateOrdersChart('90days'));
+        document.getElementById('filter12Months')?.addEventListener('click', () => updateOrdersChart('12months'));
     }
 });
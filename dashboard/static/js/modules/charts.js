@@ -5,6 +5,8 @@ export const ordersChartCanvas = document.getElementById('ordersChart');
 export const filter7DaysBtn = document.getElementById('filter7Days');
 export const filter30DaysBtn = document.getElementById('filter30Days');
 export const filterThisMonthBtn = document.getElementById('filterThisMonth');
+export const filter90DaysBtn = document.getElementById('filter90Days');
+export const filter12MonthsBtn = document.getElementById('filter12Months');
 let ordersChart; // Chart.js 
 
 async function fetchOrdersChartData(period) {
@@ -94,7 +96,9 @@ function updateFilterButtonStyles(activePeriod) {
     const buttons = [
         { btn: filter7DaysBtn, period: '7days' },
         { btn: filter30DaysBtn, period: '30days' },
-        { btn: filterThisMonthBtn, period: 'this_month' }
+        { btn: filterThisMonthBtn, period: 'this_month' },
+        { btn: filter90DaysBtn, period: '90days' },
+        { btn: filter12MonthsBtn, period: '12months' }
     ];
 
     buttons.forEach(({ btn, period }) => {
@@ -164,13 +164,8 @@ export function setupOrderSearch() {
     }
     noResultsMessage.style.display = 'none';
 
+    // Digitar filtra a página atual; Enter envia o formulário e busca no servidor
     searchInput.addEventListener('input', filterOrders);
-    searchInput.addEventListener('keydown', (event) => {
-        if (event.key === 'Enter') {
-            event.preventDefault();
-            filterOrders();
-        }
-    });
 }
 
 export function initializeModals() {
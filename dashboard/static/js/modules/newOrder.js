@@ -92,6 +92,11 @@ export async function handleConfirmOrderClick(event) {
         return;
     }
 
+    const prioridadeSelect = newOrderForm.querySelector('select[name="prioridade"]');
+    if (prioridadeSelect && prioridadeSelect.value !== '') {
+        orderData.prioridade = parseInt(prioridadeSelect.value);
+    }
+
     try {
         const response = await fetch('/pedidos/', {
             method: 'POST',
@@ -8,6 +8,62 @@ const noNotificationsMessageElem = document.getElementById('no-notifications-mes
 const markAllReadBtn = document.getElementById('mark-all-read');
 
 let websocket = null;
+let historicoVersao = null; // última versão do histórico aplicada neste cliente
+
+function handleHistoricoDelta(data) {
+    if (historicoVersao === null) return; // Sem snapshot ainda
+    // Deltas mesclados pelo servidor listam em 'versoes' todas as versões que cobrem
+    const versoes = (data.versoes || [data.versao]).filter(v => v > historicoVersao);
+    if (versoes.length === 0) return; // Já refletido no snapshot recebido
+    if (versoes.some((v, i) => v !== historicoVersao + 1 + i)) {
+        console.warn(`Histórico fora de sincronia (versão ${historicoVersao} -> ${data.versao}), pedindo resync.`);
+        historicoVersao = null;
+        websocket.send(JSON.stringify({ type: 'historico_resync' }));
+        return;
+    }
+    historicoVersao = versoes[versoes.length - 1];
+    document.dispatchEvent(new CustomEvent('historicoDelta', { detail: data.pedidos }));
+}
+
+function handleFrame(data) {
+    switch (data.type) {
+        case 'lote':
+            // Vários eventos próximos mesclados pelo servidor num único frame
+            data.frames.forEach(handleFrame);
+            break;
+        case 'dashboard_update':
+            document.dispatchEvent(new CustomEvent('dashboardUpdate', { detail: data.data }));
+            break;
+        case 'dashboard_message':
+            if (data.message_type === 'show_toast') {
+                showToast(data.toast_message, data.toast_type);
+            }
+            break;
+        case 'notification.update':
+            updateNotificationCountUI(data.unread_count);
+            break;
+        case 'notification.new':
+            showToast(data.notification.titulo, 'info', 5000);
+            updateNotificationCountUI(data.unread_count);
+            break;
+        case 'notifications.list':
+            renderNotificationsList(data.notifications, data.unread_count);
+            break;
+        case 'historico_update':
+            // Só o snapshot do connect/resync define a versão; páginas extras não
+            if (historicoVersao === null) historicoVersao = data.versao;
+            document.dispatchEvent(new CustomEvent('historicoUpdate', { detail: data }));
+            break;
+        case 'historico.delta':
+            handleHistoricoDelta(data);
+            break;
+        case 'robo.status':
+            document.dispatchEvent(new CustomEvent('roboStatus', { detail: data.status }));
+            break;
+        default:
+            console.log('Unknown WebSocket message type:', data.type);
+    }
+}
 
 export function connectWebSocket(forceNew = false) {
     if (!notificationBell && window.location.pathname !== '/' && !forceNew) return;
@@ -21,31 +77,7 @@ export function connectWebSocket(forceNew = false) {
 
     websocket.onopen = () => console.log("WebSocket connected!");
 
-    websocket.onmessage = (event) => {
-        const data = JSON.parse(event.data);
-        switch (data.type) {
-            case 'dashboard_update':
-                document.dispatchEvent(new CustomEvent('dashboardUpdate', { detail: data.data }));
-                break;
-            case 'dashboard_message':
-                if (data.message_type === 'show_toast') {
-                    showToast(data.toast_message, data.toast_type);
-                }
-                break;
-            case 'notification.update':
-                updateNotificationCountUI(data.unread_count);
-                break;
-            case 'notification.new':
-                showToast(data.notification.titulo, 'info', 5000);
-                updateNotificationCountUI(data.unread_count);
-                break;
-            case 'notifications.list':
-                renderNotificationsList(data.notifications, data.unread_count);
-                break;
-            default:
-                console.log('Unknown WebSocket message type:', data.type);
-        }
-    };
+    websocket.onmessage = (event) => handleFrame(JSON.parse(event.data));
 
     websocket.onclose = (event) => {
         console.warn("WebSocket disconnected. Reconnecting in 3s...", event.code, event.reason);
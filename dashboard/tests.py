@@ -1,12 +1,46 @@
-from django.test import TestCase
+from django.test import TestCase, SimpleTestCase, RequestFactory, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from unittest.mock import patch, AsyncMock, ANY
 from django.db.utils import IntegrityError
 from django.db import DatabaseError
+import asyncio
 import json
+import os
+import threading
+import tempfile
+from datetime import date, timedelta
 
-from .models import Peca, Estoque, Pedido
+from .models import Peca, Estoque, Pedido, Notificacao
+from .paginacao import parse_filtros_historico, buscar_pagina_pedidos, PAGE_SIZE_MAXIMO
+from .historico_delta import montar_delta_historico, versao_historico
+from .graficos import dados_grafico_pedidos, intervalo_periodo
+from .contadores import reconciliar_contadores, ler_contadores, registrar_criacao, registrar_transicao, versao_dados
+from .broadcast import get_dashboard_data
+from . import robo, views, views_async
+from .robo_stream import MonitorRobo
+from .pedidos import validar_pecas_pedido
+from .catalogo import get_catalogo, versao_catalogo
+from .indices import indices_declarados, indices_faltando
+from .notificacoes import contar_nao_lidas, listar_recentes
+from .retencao import COLECAO_ARQUIVO, arquivar_notificacoes
+from .mongo import get_database
+from .carga import gerar_dados, resumir_latencias, medir_funcao
+from . import metricas
+from .instrumentacao import InstrumentacaoConsumerMixin
+from .exportacao import gerar_exportacao
+from .serializacao import formatar_pedidos, limpar_memo
+from . import despacho
+from .transicoes import TransicaoInvalida, avancar_status
+from .busca import chaves_busca
+from . import repositorio, codificacao
+from .codificacao import BACKENDS
+from .cache_respostas import ALIAS_CACHE
+from .coalescencia import Coalescedor, mesclar_frames, desembrulhar
+from django.core.cache import caches
+from asgiref.sync import async_to_sync
+from channels.testing import HttpCommunicator
+from .consumers import DashboardConsumer, ExportacaoConsumer
 
 
 def criar_pecas_base():
@@ -183,3 +217,921 @@ class ViewsTest(TestCase):
         self.assertEqual(primeiro['pecas_list_names'], ['Círculo', 'Hexágono', 'Quadrado'])
         self.assertEqual(primeiro['pecas_list_shapes'], ['circulo', 'hexagono', 'quadrado'])
 
+
+class PaginacaoHistoricoTest(TestCase):
+    def setUp(self):
+        self.pecas = criar_pecas_base()
+        self.pedidos = [Pedido.objects.create(pecas=[[1, 2, 3]], status=0) for _ in range(5)]
+
+    def tearDown(self):
+        Pedido.objects.all().delete()
+        Peca.objects.all().delete()
+
+    def test_paginas_por_cursor(self):
+        pagina1, cursor = buscar_pagina_pedidos(limit=2)
+        self.assertEqual([p.id for p in pagina1], [self.pedidos[4].id, self.pedidos[3].id])
+        self.assertEqual(cursor, self.pedidos[3].id)
+
+        pagina2, cursor = buscar_pagina_pedidos(cursor=cursor, limit=2)
+        self.assertEqual([p.id for p in pagina2], [self.pedidos[2].id, self.pedidos[1].id])
+
+        pagina3, cursor = buscar_pagina_pedidos(cursor=cursor, limit=2)
+        self.assertEqual([p.id for p in pagina3], [self.pedidos[0].id])
+        self.assertIsNone(cursor)
+
+    def test_parse_filtros(self):
+        filtros = parse_filtros_historico({'limit': '9999', 'status': '2', 'data_fim': '2025-06-30'})
+        self.assertEqual(filtros['limit'], PAGE_SIZE_MAXIMO)
+        self.assertEqual(filtros['status'], 2)
+        self.assertEqual(filtros['data_fim'].day, 1)
+
+        with self.assertRaises(ValueError):
+            parse_filtros_historico({'status': '7'})
+        with self.assertRaises(ValueError):
+            parse_filtros_historico({'data_inicio': '30/06/2025'})
+
+    def test_pedidos_json_paginado(self):
+        response = self.client.get(reverse('pedidosJson'), {'limit': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['pedidos']), 3)
+        self.assertEqual(response.json()['next_cursor'], self.pedidos[2].id)
+
+        response = self.client.get(reverse('pedidosJson'), {'cursor': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class HistoricoDeltaTest(TestCase):
+    def setUp(self):
+        self.pecas = criar_pecas_base()
+        self.pedido1 = Pedido.objects.create(pecas=[[1, 2, 3]], status=0)
+        self.pedido2 = Pedido.objects.create(pecas=[[3, 2, 1]], status=2)
+
+    def tearDown(self):
+        Pedido.objects.all().delete()
+        Peca.objects.all().delete()
+
+    def test_delta_contem_apenas_pedidos_alterados(self):
+        delta = montar_delta_historico([self.pedido2.id])
+        self.assertEqual(delta['type'], 'historico.delta')
+        self.assertEqual([p['id'] for p in delta['pedidos']], [self.pedido2.id])
+        self.assertEqual(delta['pedidos'][0]['status'], 'Pendente')
+        self.assertEqual(delta['pedidos'][0]['pecas_list_names'], ['Quadrado', 'Hexágono', 'Círculo'])
+
+    def test_versao_incrementa_a_cada_delta(self):
+        primeiro = montar_delta_historico([self.pedido1.id])
+        segundo = montar_delta_historico([self.pedido2.id])
+        self.assertEqual(segundo['versao'], primeiro['versao'] + 1)
+        self.assertEqual(versao_historico(), segundo['versao'])
+
+
+class BroadcastTest(TestCase):
+    def setUp(self):
+        self.pecas = criar_pecas_base()
+
+    def tearDown(self):
+        Pedido.objects.all().delete()
+        Notificacao.objects.all().delete()
+        Peca.objects.all().delete()
+
+    @patch('dashboard.views.get_channel_layer')
+    def test_novo_pedido_calcula_broadcast_uma_vez(self, mock_get_channel_layer):
+        mock_layer = AsyncMock()
+        mock_get_channel_layer.return_value = mock_layer
+
+        payload = {f'peca{i}': str(pid) for i, pid in enumerate([1, 2, 3, 1, 3, 2, 2, 1, 3], 1)}
+        response = self.client.post(reverse('novoPedido'), json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+        # Uma notificação no banco e um único group_send com os frames já serializados
+        self.assertEqual(Notificacao.objects.count(), 1)
+        mock_layer.group_send.assert_called_once_with('dashboard_updates', {'type': 'broadcast.text', 'texts': ANY, 'enviado_em': ANY})
+        texts = mock_layer.group_send.call_args[0][1]['texts']
+        self.assertEqual(
+            [json.loads(t)['type'] for t in texts],
+            ['notification.new', 'dashboard_update', 'dashboard_message', 'historico.delta']
+        )
+
+
+class ViewsAsyncTest(TestCase):
+    def setUp(self):
+        self.pecas = criar_pecas_base()
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        Pedido.objects.all().delete()
+        Notificacao.objects.all().delete()
+        Peca.objects.all().delete()
+
+    @patch('dashboard.broadcast.get_channel_layer')
+    def test_novo_pedido_async_aguarda_group_send(self, mock_get_channel_layer):
+        mock_layer = AsyncMock()
+        mock_get_channel_layer.return_value = mock_layer
+
+        payload = {f'peca{i}': str(pid) for i, pid in enumerate([1, 2, 3, 1, 3, 2, 2, 1, 3], 1)}
+        request = self.factory.post('/pedidos/', json.dumps(payload), content_type='application/json')
+        response = async_to_sync(views_async.novoPedido)(request)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Pedido.objects.filter(status=2).count(), 1)
+        mock_layer.group_send.assert_awaited_once_with('dashboard_updates', {'type': 'broadcast.text', 'texts': ANY, 'enviado_em': ANY})
+
+    def test_grafico_async_igual_ao_sincrono(self):
+        request = self.factory.get('/api/graficoPedidos/', {'period': '30days'})
+        sincrono = views.getGraficoPedidos(request)
+        assincrono = async_to_sync(views_async.getGraficoPedidos)(request)
+        self.assertEqual(json.loads(assincrono.content), json.loads(sincrono.content))
+
+
+class GraficoPedidosTest(TestCase):
+    def setUp(self):
+        self.pecas = criar_pecas_base()
+        agora = timezone.now()
+        Pedido.objects.create(pecas=[[1, 2, 3]], status=0, data=agora)
+        Pedido.objects.create(pecas=[[1, 2, 3]], status=2, data=agora)
+        Pedido.objects.create(pecas=[[1, 2, 3]], status=0, data=agora - timedelta(days=3))
+        # Fora da janela de 7 dias
+        Pedido.objects.create(pecas=[[1, 2, 3]], status=0, data=agora - timedelta(days=40))
+
+    def tearDown(self):
+        Pedido.objects.all().delete()
+        Peca.objects.all().delete()
+
+    def test_buckets_diarios(self):
+        dados = dados_grafico_pedidos('7days')
+        self.assertEqual(len(dados['labels']), 7)
+        self.assertEqual(dados['created_counts'][-1], 2)
+        self.assertEqual(dados['completed_counts'][-1], 1)
+        self.assertEqual(dados['created_counts'][-4], 1)
+        self.assertEqual(sum(dados['created_counts']), 3)
+
+    def test_buckets_mensais(self):
+        dados = dados_grafico_pedidos('12months')
+        self.assertEqual(len(dados['labels']), 12)
+        self.assertEqual(sum(dados['created_counts']), 4)
+
+    def test_intervalo_semanal(self):
+        inicio, fim, bucket = intervalo_periodo('90days', hoje=date(2025, 6, 30))
+        self.assertEqual(bucket, 'semana')
+        self.assertEqual((fim - inicio).days, 89)
+
+    def test_view_periodo_invalido_usa_padrao(self):
+        response = self.client.get(reverse('graficoPedidos'), {'period': 'xyz'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['labels']), 7)
+
+
+class ContadoresTest(TestCase):
+    def setUp(self):
+        self.pecas = criar_pecas_base()
+        Pedido.objects.create(pecas=[[1, 2, 3]], status=0)
+        Pedido.objects.create(pecas=[[1, 2, 3]], status=1)
+        self.pendente = Pedido.objects.create(pecas=[[1, 2, 3]], status=2)
+        reconciliar_contadores()
+
+    def tearDown(self):
+        Pedido.objects.all().delete()
+        Peca.objects.all().delete()
+
+    def test_reconciliar(self):
+        doc = ler_contadores()
+        self.assertEqual((doc['status_0'], doc['status_1'], doc['status_2']), (1, 1, 1))
+        self.assertEqual(doc['pendente_id'], self.pendente.id)
+
+    def test_transicao_atualiza_contagem_e_pendente(self):
+        registrar_transicao(self.pendente.id, 2, 1)
+        doc = ler_contadores()
+        self.assertEqual((doc['status_1'], doc['status_2']), (2, 0))
+        self.assertIsNone(doc['pendente_id'])
+
+        data = get_dashboard_data()
+        self.assertEqual(data['em_andamento_count'], 2)
+        self.assertEqual(data['total_pedidos_count'], 3)
+        self.assertIsNone(data['pending_order'])
+
+    def test_criacao_define_pendente(self):
+        registrar_transicao(self.pendente.id, 2, 1)
+        novo = Pedido.objects.create(pecas=[[1, 2, 3]], status=2)
+        registrar_criacao(novo)
+        doc = ler_contadores()
+        self.assertEqual(doc['status_2'], 1)
+        self.assertEqual(doc['pendente_id'], novo.id)
+
+
+class RoboStatusCacheTest(SimpleTestCase):
+    def setUp(self):
+        robo.invalidar_cache()
+
+    @patch('dashboard.robo.ler_ultimo_status', return_value={'status': 'Ocioso'})
+    def test_rajada_faz_uma_consulta_por_intervalo(self, mock_ler):
+        for _ in range(20):
+            self.assertEqual(robo.estado_robo(ttl=60), 'Ocioso')
+        self.assertEqual(mock_ler.call_count, 1)
+
+        robo.invalidar_cache()
+        robo.estado_robo(ttl=60)
+        self.assertEqual(mock_ler.call_count, 2)
+
+    @patch('dashboard.robo.ler_ultimo_status', return_value=None)
+    def test_sem_cache_e_sem_documento(self, mock_ler):
+        self.assertEqual(robo.estado_robo(ttl=0), robo.ESTADO_DESCONHECIDO)
+        self.assertEqual(robo.estado_robo(ttl=0), robo.ESTADO_DESCONHECIDO)
+        self.assertEqual(mock_ler.call_count, 2)
+
+
+class MonitorRoboTest(SimpleTestCase):
+    @patch('dashboard.robo_stream.broadcast', new_callable=AsyncMock)
+    def test_publica_somente_mudancas_de_estado(self, mock_broadcast):
+        monitor = MonitorRobo(janela=0, intervalo_polling=0)
+
+        async def cenario():
+            for estado in ['Ocioso', 'Ocioso', 'Em Montagem', 'Em Montagem', 'Ocioso']:
+                await monitor.publicar({'status': estado})
+
+        async_to_sync(cenario)()
+        enviados = [chamada.args[0]['status'] for chamada in mock_broadcast.call_args_list]
+        self.assertEqual(enviados, ['Ocioso', 'Em Montagem', 'Ocioso'])
+        self.assertEqual(robo.estado_robo(), 'Ocioso')
+
+
+class PedidosLoteTest(TestCase):
+    def setUp(self):
+        self.pecas = criar_pecas_base()
+        self.item = {f'peca{i}': str(pid) for i, pid in enumerate([1, 2, 3, 1, 3, 2, 2, 1, 3], 1)}
+
+    def tearDown(self):
+        Pedido.objects.all().delete()
+        Notificacao.objects.all().delete()
+        Peca.objects.all().delete()
+
+    def test_validar_pecas_pedido(self):
+        self.assertEqual(validar_pecas_pedido(self.item, {1, 2, 3}), [[1, 2, 3], [1, 3, 2], [2, 1, 3]])
+        with self.assertRaisesMessage(ValueError, 'Peça inválida ou não encontrada: 99'):
+            validar_pecas_pedido(dict(self.item, peca1='99'), {1, 2, 3})
+        with self.assertRaisesMessage(ValueError, 'Montagem 1 contém peças repetidas.'):
+            validar_pecas_pedido(dict(self.item, peca2='1'), {1, 2, 3})
+
+    @patch('dashboard.views.get_channel_layer')
+    def test_lote_cria_todos_com_um_broadcast(self, mock_get_channel_layer):
+        mock_layer = AsyncMock()
+        mock_get_channel_layer.return_value = mock_layer
+        existente = Pedido.objects.create(pecas=[[1, 2, 3]], status=0)
+
+        response = self.client.post(reverse('novosPedidosLote'), json.dumps({'pedidos': [self.item] * 3}), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        ids = response.json()['pedido_ids']
+        self.assertEqual(len(ids), 3)
+        self.assertTrue(all(pid > existente.id for pid in ids))
+        self.assertEqual(Pedido.objects.filter(status=2).count(), 3)
+        self.assertEqual(Notificacao.objects.count(), 1)
+        mock_layer.group_send.assert_called_once()
+
+        # O ORM continua numerando depois dos ids reservados pelo lote
+        seguinte = Pedido.objects.create(pecas=[[1, 2, 3]], status=0)
+        self.assertEqual(seguinte.id, ids[-1] + 1)
+
+    @patch('dashboard.views.get_channel_layer')
+    def test_lote_invalido_nao_cria_nada(self, mock_get_channel_layer):
+        mock_get_channel_layer.return_value = AsyncMock()
+        lote = [self.item, dict(self.item, peca5='42')]
+        response = self.client.post(reverse('novosPedidosLote'), json.dumps(lote), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['erros'], [{'indice': 1, 'message': 'Peça inválida ou não encontrada: 42'}])
+        self.assertEqual(Pedido.objects.count(), 0)
+
+
+class CatalogoPecasTest(TestCase):
+    def setUp(self):
+        self.pecas = criar_pecas_base()
+
+    def tearDown(self):
+        Pedido.objects.all().delete()
+        Peca.objects.all().delete()
+
+    def test_catalogo_em_cache_sem_consultas(self):
+        get_catalogo()
+        with self.assertNumQueries(0):
+            catalogo = get_catalogo()
+            pedido = Pedido(pecas=[[1, 2, 3]])
+            self.assertEqual(pedido.get_pecas_nomes(), ['Círculo', 'Hexágono', 'Quadrado'])
+        self.assertEqual(catalogo[2].tipo, 'hexagono')
+
+    def test_invalida_ao_salvar_e_excluir_peca(self):
+        versao = versao_catalogo()
+        peca = self.pecas['circulo']
+        peca.color_hex = '#ABCDEF'
+        peca.save()
+        self.assertEqual(get_catalogo()[1].color_hex, '#ABCDEF')
+        self.assertGreater(versao_catalogo(), versao)
+
+        peca.delete()
+        self.assertNotIn(1, get_catalogo())
+
+
+class IndicesTest(TestCase):
+    def test_indices_declarados(self):
+        declarados = {nome: chave for _, nome, chave in indices_declarados()}
+        self.assertEqual(declarados['pedido_status_id_idx'], [('status', 1), ('id', 1)])
+        self.assertEqual(declarados['pedido_busca_idx'], [('busca', 1), ('id', 1)])
+        self.assertEqual(declarados['notif_lida_data_idx'], [('lida', 1), ('data_criacao', 1)])
+
+    def test_migracao_cria_todos_os_indices(self):
+        self.assertEqual(indices_faltando(), [])
+
+
+class NotificacoesTest(TestCase):
+    def setUp(self):
+        agora = timezone.now()
+        for i in range(12):
+            Notificacao.objects.create(
+                titulo=f'N{i}', mensagem='...', lida=i < 5, data_criacao=agora - timedelta(minutes=i)
+            )
+
+    def tearDown(self):
+        Notificacao.objects.all().delete()
+
+    def test_contar_nao_lidas(self):
+        self.assertEqual(contar_nao_lidas(), 7)
+
+    def test_listar_recentes(self):
+        recentes = listar_recentes()
+        self.assertEqual(len(recentes), 10)
+        self.assertEqual([n.titulo for n in recentes[:3]], ['N0', 'N1', 'N2'])
+
+
+class RetencaoNotificacoesTest(TestCase):
+    def setUp(self):
+        antiga = timezone.now() - timedelta(days=60)
+        self.antigas_lidas = [
+            Notificacao.objects.create(titulo=f'A{i}', mensagem='...', lida=True, data_criacao=antiga)
+            for i in range(3)
+        ]
+        Notificacao.objects.create(titulo='Antiga não lida', mensagem='...', lida=False, data_criacao=antiga)
+        Notificacao.objects.create(titulo='Recente lida', mensagem='...', lida=True)
+
+    def tearDown(self):
+        Notificacao.objects.all().delete()
+        get_database()[COLECAO_ARQUIVO].delete_many({})
+
+    def test_simular_nao_move(self):
+        self.assertEqual(arquivar_notificacoes(dias=30, simular=True), 3)
+        self.assertEqual(Notificacao.objects.count(), 5)
+
+    def test_arquiva_em_colecao(self):
+        self.assertEqual(arquivar_notificacoes(dias=30, lote=2), 3)
+        self.assertEqual(Notificacao.objects.count(), 2)
+        arquivadas = list(get_database()[COLECAO_ARQUIVO].find())
+        self.assertEqual(sorted(a['titulo'] for a in arquivadas), ['A0', 'A1', 'A2'])
+        self.assertNotIn('lida', arquivadas[0])
+
+    def test_arquiva_em_jsonl(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'notificacoes.jsonl')
+            self.assertEqual(arquivar_notificacoes(dias=30, destino='jsonl', arquivo=caminho), 3)
+            with open(caminho, encoding='utf-8') as f:
+                linhas = [json.loads(linha) for linha in f]
+        self.assertEqual(len(linhas), 3)
+        self.assertEqual(Notificacao.objects.filter(lida=True).count(), 1)
+
+    def test_jsonl_reexecucao_nao_duplica(self):
+        # Simula uma queda depois de gravar A0 no arquivo e antes de apagá-la da coleção
+        doc = get_database()[Notificacao._meta.db_table].find_one({'titulo': 'A0'})
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'notificacoes.jsonl')
+            with open(caminho, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'_id': str(doc['_id']), 'titulo': 'A0'}) + '\n{"_id": "incomple')
+            self.assertEqual(arquivar_notificacoes(dias=30, destino='jsonl', arquivo=caminho), 3)
+            with open(caminho, encoding='utf-8') as f:
+                titulos = [json.loads(linha)['titulo'] for linha in f if linha.strip().endswith('}')]
+        self.assertEqual(sorted(titulos), ['A0', 'A1', 'A2'])
+
+
+class CargaTest(TestCase):
+    def tearDown(self):
+        Pedido.objects.all().delete()
+        Notificacao.objects.all().delete()
+        Peca.objects.all().delete()
+
+    def test_gerar_dados_em_lotes(self):
+        resumo = gerar_dados(pedidos=25, notificacoes=7, lote=10, semente=1)
+        self.assertEqual(Pedido.objects.count(), 25)
+        self.assertEqual(Notificacao.objects.count(), 7)
+        self.assertEqual(len(set(Pedido.objects.values_list('id', flat=True))), 25)
+        self.assertEqual(sum(ler_contadores().get(f'status_{s}', 0) for s in range(4)), 25)
+        self.assertTrue(set(resumo['pecas_ids']) >= {1, 2, 3})
+
+    def test_resumir_latencias(self):
+        resumo = resumir_latencias([i / 1000 for i in range(1, 101)], duracao=2.0, erros=3)
+        self.assertEqual(resumo['requisicoes'], 103)
+        self.assertEqual(resumo['req_por_s'], 50.0)
+        self.assertEqual(resumo['p50_ms'], 51.0)
+        self.assertEqual(resumo['p99_ms'], 99.0)
+
+
+class InstrumentacaoTest(TestCase):
+    def setUp(self):
+        criar_pecas_base()
+        metricas.limpar()
+
+    def tearDown(self):
+        Peca.objects.all().delete()
+
+    def test_histograma_exportado_no_formato_prometheus(self):
+        hist = metricas.histograma('teste_seconds', 'Teste.')
+        hist.observar(metricas.rotulos(view='x'), 0.03)
+        texto = metricas.exportar()
+        self.assertIn('# TYPE teste_seconds histogram', texto)
+        self.assertIn('teste_seconds_bucket{view="x",le="0.025"} 0', texto)
+        self.assertIn('teste_seconds_bucket{view="x",le="0.05"} 1', texto)
+        self.assertIn('teste_seconds_count{view="x"} 1', texto)
+
+    def test_requisicao_registra_tempo_e_consultas(self):
+        self.client.get(reverse('historico'))
+        texto = self.client.get(reverse('metricas')).content.decode()
+        self.assertIn('dashboard_http_requests_total{metodo="GET",status="200",view="historico"} 1', texto)
+        linha_db = next(l for l in texto.splitlines()
+                        if l.startswith('dashboard_db_operations_total{alvo="historico",origem="http"}'))
+        self.assertGreater(int(linha_db.split()[-1]), 0)
+
+    def test_tipo_da_mensagem_vem_do_receive(self):
+        class Base:
+            async def dispatch(self, message):
+                self.rotular_mensagem(codificacao.loads(message['text']).get('type'))
+
+        class Consumer(InstrumentacaoConsumerMixin, Base):
+            tipos_mensagem_cliente = frozenset({'fetch_unread_count'})
+
+        consumer = Consumer()
+        with patch('dashboard.codificacao.loads', wraps=codificacao.loads) as decodificar:
+            for tipo in ('fetch_unread_count', 'desconhecido'):
+                async_to_sync(consumer.dispatch)({'type': 'websocket.receive', 'text': json.dumps({'type': tipo})})
+        # Um único parse por mensagem: a instrumentação não decodifica o JSON
+        self.assertEqual(decodificar.call_count, 2)
+        texto = metricas.exportar()
+        self.assertIn('dashboard_ws_message_seconds_count{tipo="receive:fetch_unread_count"} 1', texto)
+        self.assertIn('dashboard_ws_message_seconds_count{tipo="receive:outro"} 1', texto)
+
+
+class ExportacaoPedidosTest(TestCase):
+    def setUp(self):
+        self.pecas = criar_pecas_base()
+        for status in (0, 0, 1, 2, 0):
+            Pedido.objects.create(pecas=[[1, 2, 3], [3, 2, 1], [2, 1, 99]], status=status)
+
+    def tearDown(self):
+        Pedido.objects.all().delete()
+        Peca.objects.all().delete()
+
+    def _baixar(self, **params):
+        response = self.client.get(reverse('exportarPedidos'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv_em_lotes_com_nomes_das_pecas(self):
+        filtros = parse_filtros_historico({})
+        linhas = ''.join(gerar_exportacao('csv', filtros, get_catalogo(), lote=2)).strip().splitlines()
+        self.assertEqual(linhas[0], 'id,data,status_codigo,status,pecas_ids,pecas_nomes,pecas_tipos')
+        self.assertEqual(len(linhas), 6)
+        self.assertIn('Círculo;Hexágono;Quadrado', linhas[1])
+        self.assertIn('Peça não encontrada', linhas[1])
+
+    def test_view_csv_em_streaming(self):
+        self.assertEqual(len(self._baixar(formato='csv').strip().splitlines()), 6)
+
+    def test_jsonl_com_filtro_de_status(self):
+        linhas = [json.loads(l) for l in self._baixar(formato='jsonl', status='0').splitlines()]
+        self.assertEqual(len(linhas), 3)
+        self.assertTrue(all(l['status'] == 'Concluído' for l in linhas))
+        self.assertEqual([l['id'] for l in linhas], sorted(l['id'] for l in linhas))
+
+    def test_formato_invalido(self):
+        response = self.client.get(reverse('exportarPedidos'), {'formato': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_consumer_asgi_em_pedacos(self):
+        comunicador = HttpCommunicator(ExportacaoConsumer.as_asgi(), 'GET', '/pedidos/exportar/?formato=jsonl&status=0')
+        response = async_to_sync(comunicador.get_response)(timeout=5)
+        self.assertEqual(response['status'], 200)
+        self.assertEqual(dict(response['headers'])[b'Content-Type'], b'application/x-ndjson; charset=utf-8')
+        linhas = [json.loads(l) for l in response['body'].decode('utf-8').splitlines()]
+        self.assertEqual(len(linhas), 3)
+
+        comunicador = HttpCommunicator(ExportacaoConsumer.as_asgi(), 'GET', '/pedidos/exportar/?formato=xml')
+        self.assertEqual(async_to_sync(comunicador.get_response)(timeout=5)['status'], 400)
+
+
+class SerializacaoPedidosTest(TestCase):
+    def setUp(self):
+        self.pecas = criar_pecas_base()
+        limpar_memo()
+        self.pedido = Pedido.objects.create(pecas=[[1, 2, 3], [3, 99, 1]], status=2)
+
+    def tearDown(self):
+        Pedido.objects.all().delete()
+        Peca.objects.all().delete()
+
+    def test_formata_e_reaproveita_por_id_e_status(self):
+        primeiro = formatar_pedidos([self.pedido])[0]
+        self.assertEqual(primeiro['status'], 'Pendente')
+        self.assertEqual(primeiro['pecas_list_ids'], [1, 2, 3, 3, None, 1])
+        self.assertEqual(primeiro['pecas_list_names'][4], 'Peça não encontrada')
+        self.assertIs(formatar_pedidos([self.pedido])[0], primeiro)
+
+        self.pedido.status = 3
+        self.assertEqual(formatar_pedidos([self.pedido])[0]['status'], 'Cancelado')
+
+    def test_catalogo_alterado_invalida_memo(self):
+        formatar_pedidos([self.pedido])
+        self.pecas['circulo'].name = 'Círculo Azul'
+        self.pecas['circulo'].save()  # o sinal post_save invalida o catálogo
+        self.assertEqual(formatar_pedidos([self.pedido])[0]['pecas_list_names'][0], 'Círculo Azul')
+
+    def test_historico_e_json_usam_o_mesmo_formato(self):
+        json_pedidos = self.client.get(reverse('pedidosJson')).json()['pedidos']
+        html_pedidos = self.client.get(reverse('historico')).context['pedidos']
+        self.assertEqual(json_pedidos, html_pedidos)
+
+
+class FilaDespachoTest(TestCase):
+    def setUp(self):
+        criar_pecas_base()
+        get_database()[despacho.COLECAO_DESPACHO].delete_many({})
+        get_database()[robo.COLECAO_ROBO].delete_many({})
+        reconciliar_contadores()
+
+    def tearDown(self):
+        get_database()[despacho.COLECAO_DESPACHO].delete_many({})
+        get_database()[robo.COLECAO_ROBO].delete_many({})
+        Pedido.objects.all().delete()
+        Notificacao.objects.all().delete()
+        Peca.objects.all().delete()
+
+    def _criar(self, prioridade=None):
+        payload = {f'peca{i}': str(pid) for i, pid in enumerate([1, 2, 3, 1, 3, 2, 2, 1, 3], 1)}
+        if prioridade is not None:
+            payload['prioridade'] = prioridade
+        with patch('dashboard.views.get_channel_layer', return_value=AsyncMock()):
+            response = self.client.post(reverse('novoPedido'), json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        return int(response.json()['pedido_id'])
+
+    def test_fila_aceita_varios_pendentes_por_prioridade(self):
+        normal = self._criar()
+        urgente = self._criar(prioridade=0)
+        self._criar(prioridade=3)
+        self.assertEqual(Pedido.objects.filter(status=2).count(), 3)
+        self.assertEqual(ler_contadores()['pendente_id'], urgente)
+
+        registrar_transicao(urgente, 2, 1)
+        Pedido.objects.filter(id=urgente).update(status=1)
+        self.assertEqual(ler_contadores()['pendente_id'], normal)
+
+    @override_settings(DESPACHO_AUTOMATICO=True)
+    def test_despacho_ocupa_o_robo_uma_vez(self):
+        primeiro = self._criar()
+        segundo = self._criar()
+        get_database()[robo.COLECAO_ROBO].insert_one({'status': 'Ocioso'})
+
+        frames = despacho.despachar_proximo()
+        self.assertEqual([f['type'] for f in frames][-1], 'historico.delta')
+        self.assertEqual(Pedido.objects.get(id=primeiro).status, 1)
+        # Robô ainda reporta ocioso, mas a vaga está ocupada pelo primeiro pedido
+        self.assertEqual(despacho.despachar_proximo(), [])
+        self.assertEqual(Pedido.objects.get(id=segundo).status, 2)
+
+        Pedido.objects.filter(id=primeiro).update(status=0)
+        registrar_transicao(primeiro, 1, 0)
+        self.assertTrue(despacho.apos_mudanca_na_fila(primeiro, 0))
+        self.assertEqual(Pedido.objects.get(id=segundo).status, 1)
+
+    def test_prioridade_invalida(self):
+        payload = {f'peca{i}': '1' if i % 3 == 1 else ('2' if i % 3 == 2 else '3') for i in range(1, 10)}
+        payload['prioridade'] = 9
+        response = self.client.post(reverse('novoPedido'), json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class TransicoesStatusTest(TestCase):
+    def setUp(self):
+        criar_pecas_base()
+        self.pedido = Pedido.objects.create(pecas=[[1, 2, 3]], status=2)
+        reconciliar_contadores()
+
+    def tearDown(self):
+        Pedido.objects.all().delete()
+        Notificacao.objects.all().delete()
+        Peca.objects.all().delete()
+
+    def test_avanca_pela_tabela(self):
+        self.assertEqual(avancar_status(self.pedido.id), (self.pedido.id, 2, 1))
+        self.assertEqual(avancar_status(self.pedido.id, 1).status_novo, 0)
+        with self.assertRaisesMessage(TransicaoInvalida, 'Pedido já concluído.'):
+            avancar_status(self.pedido.id)
+        with self.assertRaises(Pedido.DoesNotExist):
+            avancar_status(self.pedido.id + 1000)
+
+    def test_consumer_aceita_id_como_texto(self):
+        processar = async_to_sync(DashboardConsumer()._process_pending_order_in_db)
+        resultado = processar(str(self.pedido.id))
+        self.assertEqual(resultado['status'], 'success')
+        self.assertEqual(resultado['pedido_id'], self.pedido.id)
+        self.assertEqual(Pedido.objects.get(id=self.pedido.id).status, 1)
+        self.assertEqual(processar('abc'), {'status': 'error', 'message': 'ID de pedido inválido.'})
+
+    @override_settings(DESPACHO_AUTOMATICO=True)
+    def test_despacho_automatico_recusa_inicio_manual(self):
+        for status_esperado in (None, 2):
+            with self.assertRaisesMessage(TransicaoInvalida, 'despacho automático') as contexto:
+                avancar_status(self.pedido.id, status_esperado)
+            self.assertEqual(contexto.exception.status_http, 409)
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.status, 2)
+
+        # A conclusão de um pedido em andamento continua manual
+        Pedido.objects.filter(id=self.pedido.id).update(status=1)
+        self.assertEqual(avancar_status(self.pedido.id).status_novo, 0)
+
+    def test_cliques_simultaneos_avancam_uma_vez(self):
+        resultados = []
+
+        def clicar():
+            try:
+                resultados.append(avancar_status(self.pedido.id, 2))
+            except TransicaoInvalida as e:
+                resultados.append(e.status_http)
+
+        threads = [threading.Thread(target=clicar) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sum(1 for r in resultados if r == 409), 7)
+        self.assertEqual(Pedido.objects.get(id=self.pedido.id).status, 1)
+        self.assertEqual(ler_contadores()['status_1'], 1)
+
+    @patch('dashboard.views.get_channel_layer')
+    def test_view_com_status_esperado(self, mock_get_channel_layer):
+        mock_get_channel_layer.return_value = AsyncMock()
+        url = reverse('updateStatusPedido', args=[self.pedido.id])
+        self.assertEqual(self.client.get(url + '?de=2').status_code, 200)
+        response = self.client.get(url + '?de=2')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Pedido.objects.get(id=self.pedido.id).status, 1)
+        self.assertEqual(self.client.get(url + '?de=x').status_code, 400)
+        self.assertEqual(self.client.get(reverse('updateStatusPedido', args=[self.pedido.id + 1000])).status_code, 404)
+
+
+class BuscaPedidosTest(TestCase):
+    def setUp(self):
+        criar_pecas_base()
+        self.so_circulos = Pedido.objects.create(pecas=[[1, 1, 1], [1, 1, 1], [1, 1, 1]], status=0)
+        self.misto = Pedido.objects.create(pecas=[[1, 2, 3], [3, 3, 3], [1, 1, 1]], status=1)
+        self.invertido = Pedido.objects.create(pecas=[[3, 2, 1], [1, 1, 1], [1, 1, 1]], status=2)
+
+    def tearDown(self):
+        Pedido.objects.all().delete()
+        Peca.objects.all().delete()
+
+    def _ids(self, params):
+        pedidos, _ = buscar_pagina_pedidos(**parse_filtros_historico(params))
+        return [p.id for p in pedidos]
+
+    def test_chaves_gravadas_na_criacao(self):
+        doc = get_database()[Pedido._meta.db_table].find_one({'id': self.misto.id})
+        self.assertIn('peca:2', doc['busca'])
+        self.assertIn('montagem:1-2-3', doc['busca'])
+        self.assertEqual(doc['busca'], chaves_busca(self.misto.pecas))
+
+    def test_busca_por_peca_montagem_id_e_status(self):
+        self.assertEqual(self._ids({'search': 'Hexágono'}), [self.invertido.id, self.misto.id])
+        self.assertEqual(self._ids({'peca': 'quadrado,2'}), [self.invertido.id, self.misto.id])
+        self.assertEqual(self._ids({'montagem': 'circulo,hexagono,quadrado'}), [self.misto.id])
+        self.assertEqual(self._ids({'search': f'#{self.so_circulos.id}'}), [self.so_circulos.id])
+        self.assertEqual(self._ids({'search': 'em andamento'}), [self.misto.id])
+        self.assertEqual(self._ids({'search': 'hexagono', 'status': '2'}), [self.invertido.id])
+
+        with self.assertRaises(ValueError):
+            parse_filtros_historico({'peca': 'triangulo'})
+        with self.assertRaises(ValueError):
+            parse_filtros_historico({'montagem': '1,2'})
+
+    def test_pagina_da_busca_por_cursor(self):
+        pagina, cursor = buscar_pagina_pedidos(limit=1, busca=['peca:2'])
+        self.assertEqual([p.id for p in pagina], [self.invertido.id])
+        pagina, cursor = buscar_pagina_pedidos(cursor=cursor, limit=1, busca=['peca:2'])
+        self.assertEqual([p.id for p in pagina], [self.misto.id])
+        self.assertIsNone(cursor)
+
+    def test_json_devolve_so_a_pagina_encontrada(self):
+        response = self.client.get(reverse('pedidosJson'), {'search': 'hexagono', 'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['id'] for p in response.json()['pedidos']], [self.invertido.id])
+        self.assertEqual(response.json()['next_cursor'], self.invertido.id)
+        self.assertEqual(self.client.get(reverse('pedidosJson'), {'peca': 'x'}).status_code, 400)
+
+
+class RepositorioTest(TestCase):
+    def setUp(self):
+        criar_pecas_base()
+        self.normal = Pedido.objects.create(pecas=[[1, 2, 3]], status=2)
+        self.urgente = Pedido.objects.create(pecas=[[3, 2, 1]], status=2, prioridade=0)
+        self.concluido = Pedido.objects.create(pecas=[[1, 1, 1]], status=0)
+        self.notificacao = Notificacao.objects.create(titulo='N', mensagem='...')
+
+    def tearDown(self):
+        Pedido.objects.all().delete()
+        Notificacao.objects.all().delete()
+        Peca.objects.all().delete()
+
+    def test_mesmo_resultado_que_o_orm(self):
+        self.assertEqual(repositorio.primeiro_da_fila().id, self.urgente.id)
+        self.assertEqual(repositorio.contar_pedidos(2), Pedido.objects.filter(status=2).count())
+
+        ids = [self.normal.id, self.concluido.id]
+        direto = repositorio.pedidos_por_ids(ids)
+        orm = list(Pedido.objects.filter(id__in=ids).order_by('-id'))
+        self.assertEqual([(p.id, p.status, p.pecas, p.data) for p in direto],
+                         [(p.id, p.status, p.pecas, p.data) for p in orm])
+        # Relida pelo ORM: o BSON guarda milissegundos, o timezone.now() do setUp microssegundos
+        gravada = Notificacao.objects.get(pk=self.notificacao.pk)
+        self.assertEqual(repositorio.notificacoes_recentes(5)[0].data_criacao, gravada.data_criacao)
+
+    def test_marcar_notificacao_lida(self):
+        self.assertEqual(repositorio.contar_nao_lidas(), 1)
+        self.assertTrue(repositorio.marcar_notificacao_lida(self.notificacao.id))
+        self.assertFalse(repositorio.marcar_notificacao_lida(self.notificacao.id + 1000))
+        self.assertEqual(repositorio.contar_nao_lidas(), 0)
+
+    def test_medir_funcao(self):
+        resumo = medir_funcao(repositorio.contar_nao_lidas, 5, aquecimento=1)
+        self.assertEqual(resumo['requisicoes'], 5)
+        self.assertIsNotNone(resumo['p50_ms'])
+
+
+class CodificacaoJsonTest(SimpleTestCase):
+    def test_backends_equivalentes(self):
+        agora = timezone.now()
+        payload = {'pedidos': [{'id': 1, 'status': 'Concluído'}], 'data': agora, 7: None}
+        for nome, classe in BACKENDS.items():
+            with self.subTest(backend=nome):
+                backend = classe()
+                corpo = backend.dumps(payload)
+                self.assertIsInstance(corpo, bytes)
+                decodificado = backend.loads(corpo)
+                self.assertEqual(decodificado['pedidos'][0]['status'], 'Concluído')
+                self.assertEqual(decodificado['7'], None)
+                self.assertTrue(decodificado['data'].startswith(agora.strftime('%Y-%m-%dT%H:%M')))
+                self.assertTrue(decodificado['data'].endswith('Z'))
+
+    @override_settings(JSON_BACKEND='stdlib')
+    def test_resposta_json(self):
+        response = codificacao.RespostaJson({'ok': True}, status=201)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(codificacao.loads(response.content), {'ok': True})
+        self.assertEqual(codificacao.dumps_texto({'a': 'é'}), '{"a":"é"}')
+
+    @override_settings(JSON_BACKEND='inexistente')
+    def test_backend_invalido(self):
+        with self.assertRaises(ValueError):
+            codificacao.dumps({})
+
+
+class CacheRespostasTest(TestCase):
+    def setUp(self):
+        criar_pecas_base()
+        Pedido.objects.create(pecas=[[1, 2, 3]], status=0)
+        reconciliar_contadores()
+        caches[ALIAS_CACHE].clear()
+
+    def tearDown(self):
+        Pedido.objects.all().delete()
+        Notificacao.objects.all().delete()
+        Peca.objects.all().delete()
+        caches[ALIAS_CACHE].clear()
+
+    def test_etag_e_304(self):
+        url = reverse('pedidosJson')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Pedido.objects.create(pecas=[[3, 2, 1]], status=2)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['pedidos']), 2)
+
+    def test_if_modified_since_nao_mascara_troca_de_catalogo(self):
+        url = reverse('pedidosJson')
+        response = self.client.get(url)
+        # A ETag depende da versão do catálogo, que não tem data: sem Last-Modified
+        self.assertNotIn('Last-Modified', response)
+        peca = Peca.objects.first()
+        peca.name = 'Renomeada'
+        peca.save()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+
+    def test_repeticao_sai_do_cache(self):
+        url = reverse('graficoPedidos')
+        with patch('dashboard.views.dados_grafico_pedidos', wraps=dados_grafico_pedidos) as gerar:
+            primeira = self.client.get(url, {'period': '7days'})
+            segunda = self.client.get(url, {'period': '7days'})
+            self.client.get(url, {'period': '30days'})
+        self.assertEqual(gerar.call_count, 2)
+        self.assertEqual(primeira.content, segunda.content)
+        self.assertEqual(segunda['ETag'], primeira['ETag'])
+
+    def test_versao_cresce_com_transicao_e_reconciliacao(self):
+        versao, alterado_em = versao_dados()
+        self.assertIsNotNone(alterado_em)
+        pedido = Pedido.objects.create(pecas=[[1, 1, 1]], status=2)
+        registrar_transicao(pedido.id, 2, 1)
+        depois = versao_dados()[0]
+        self.assertGreater(depois, versao)
+        reconciliar_contadores()
+        self.assertGreater(versao_dados()[0], depois)
+
+    def test_criacao_pela_view_avanca_versao_uma_vez(self):
+        versao = versao_dados()[0]
+        payload = {f'peca{i}': str(pid) for i, pid in enumerate([1, 2, 3, 1, 3, 2, 2, 1, 3], 1)}
+        with patch('dashboard.views.get_channel_layer', return_value=AsyncMock()):
+            response = self.client.post(reverse('novoPedido'), json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(versao_dados()[0], versao + 1)
+
+        # Criação direta pelo ORM (admin, shell) continua avançando pelo sinal
+        Pedido.objects.create(pecas=[[1, 2, 3]], status=0)
+        self.assertEqual(versao_dados()[0], versao + 2)
+
+
+class CoalescenciaBroadcastTest(SimpleTestCase):
+    def test_mesclar_mantem_snapshot_mais_novo_e_junta_deltas(self):
+        eventos = [
+            [{'type': 'notification.new', 'id': 1}, {'type': 'dashboard_update', 'data': 'a'},
+             {'type': 'historico.delta', 'versao': 7, 'pedidos': [{'id': 10, 'status': 2}]}],
+            [{'type': 'dashboard_update', 'data': 'b'},
+             {'type': 'historico.delta', 'versao': 8, 'pedidos': [{'id': 10, 'status': 1}, {'id': 11, 'status': 2}]}],
+        ]
+        frames, substituidos = mesclar_frames(eventos)
+        self.assertEqual(substituidos, 2)
+        self.assertEqual([f['type'] for f in frames], ['notification.new', 'dashboard_update', 'historico.delta'])
+        self.assertEqual(frames[1]['data'], 'b')
+        self.assertEqual(frames[2]['versoes'], [7, 8])
+        self.assertEqual(frames[2]['versao'], 8)
+        self.assertEqual(frames[2]['pedidos'], [{'id': 11, 'status': 2}, {'id': 10, 'status': 1}])
+
+    @override_settings(BROADCAST_JANELA_MS=50)
+    def test_eventos_na_janela_viram_um_group_send(self):
+        mock_layer = AsyncMock()
+        coalescedor = Coalescedor('grupo_teste')
+
+        enviados_ao_retornar = []
+
+        async def cenario():
+            await asyncio.gather(*[
+                coalescedor.enviar([{'type': 'dashboard_update', 'data': i}], mock_layer) for i in range(3)
+            ])
+            # Quem dispara não espera a janela: o envio fica com a tarefa de descarga
+            enviados_ao_retornar.append(mock_layer.group_send.await_count)
+            await asyncio.sleep(0.2)
+
+        async_to_sync(cenario)()
+        self.assertEqual(enviados_ao_retornar, [0])
+        mock_layer.group_send.assert_called_once()
+        texts = mock_layer.group_send.call_args[0][1]['texts']
+        self.assertEqual(len(texts), 1)
+        lote = json.loads(texts[0])
+        self.assertEqual(lote['type'], 'lote')
+        self.assertEqual(lote['gatilhos'], 3)
+        self.assertEqual(desembrulhar(lote), [{'type': 'dashboard_update', 'data': 2}])
+
+    @override_settings(BROADCAST_JANELA_MS=60000)
+    def test_loop_encerrado_antes_da_janela_ainda_envia(self):
+        mock_layer = AsyncMock()
+        coalescedor = Coalescedor('grupo_teste')
+
+        async def cenario():
+            await coalescedor.enviar([{'type': 'dashboard_update', 'data': 1}], mock_layer)
+            await coalescedor.enviar([{'type': 'dashboard_update', 'data': 2}], mock_layer)
+
+        # O loop de um asyncio.run cancela as tarefas pendentes ao terminar; a descarga
+        # cancelada ainda envia o que estava no buffer
+        asyncio.run(cenario())
+        mock_layer.group_send.assert_called_once()
+        lote = json.loads(mock_layer.group_send.call_args[0][1]['texts'][0])
+        self.assertEqual(desembrulhar(lote), [{'type': 'dashboard_update', 'data': 2}])
+
+    @override_settings(BROADCAST_JANELA_MS=0)
+    def test_janela_zero_envia_cada_evento(self):
+        mock_layer = AsyncMock()
+        coalescedor = Coalescedor('grupo_teste')
+        for i in range(2):
+            async_to_sync(coalescedor.enviar)([{'type': 'dashboard_update', 'data': i}], mock_layer)
+        self.assertEqual(mock_layer.group_send.call_count, 2)
+        frame = json.loads(mock_layer.group_send.call_args[0][1]['texts'][0])
+        self.assertEqual(frame, {'type': 'dashboard_update', 'data': 1})
@@ -0,0 +1,99 @@
+from collections import namedtuple
+from django.conf import settings
+from pymongo import ReturnDocument
+from .models import Pedido
+from .mongo import get_database
+from .contadores import registrar_transicao
+from .serializacao import STATUS_MAP
+
+STATUS_CONCLUIDO = 0
+STATUS_EM_ANDAMENTO = 1
+STATUS_PENDENTE = 2
+
+# Única tabela de transições manuais permitidas: status atual -> próximo status
+TRANSICOES = {
+    STATUS_PENDENTE: STATUS_EM_ANDAMENTO,
+    STATUS_EM_ANDAMENTO: STATUS_CONCLUIDO,
+}
+
+MENSAGEM_DESPACHO = 'Com o despacho automático ligado, os pedidos pendentes saem da fila só pelo robô.'
+
+Transicao = namedtuple('Transicao', ['pedido_id', 'status_anterior', 'status_novo'])
+
+
+class TransicaoInvalida(ValueError):
+    def __init__(self, mensagem, status_http=400):
+        super().__init__(mensagem)
+        self.status_http = status_http
+
+
+# Com o despacho automático só o despachante (dashboard.despacho) tira pedidos da fila:
+# um início manual não ocuparia a vaga do robô, e o despacho seguinte mandaria um
+# segundo pedido enquanto o primeiro ainda está em andamento.
+def transicoes_manuais():
+    if settings.DESPACHO_AUTOMATICO:
+        return {de: para for de, para in TRANSICOES.items() if de != STATUS_PENDENTE}
+    return TRANSICOES
+
+
+def parse_status_esperado(valor):
+    if valor in (None, ''):
+        return None
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise TransicaoInvalida(f'Status esperado inválido: {valor}')
+
+
+def _atualizacao(status_esperado, transicoes):
+    if status_esperado is not None:
+        return status_esperado, {'$set': {'status': transicoes[status_esperado]}}
+    # Sem status esperado: avança a partir do status atual, decidido no próprio servidor
+    ramos = [{'case': {'$eq': ['$status', de]}, 'then': para} for de, para in transicoes.items()]
+    return {'$in': list(transicoes)}, [{'$set': {'status': {'$switch': {'branches': ramos, 'default': '$status'}}}}]
+
+
+def _erro(pedido_id, status_esperado, transicoes):
+    # Só no caminho de falha: uma leitura para dizer por que a transição não aconteceu
+    atual = get_database()[Pedido._meta.db_table].find_one({'id': pedido_id}, {'_id': 0, 'status': 1})
+    if atual is None:
+        return Pedido.DoesNotExist('Pedido não encontrado.')
+    status_atual = atual.get('status')
+    if status_esperado is not None and status_atual != status_esperado:
+        return TransicaoInvalida(
+            f'O pedido #{pedido_id} está "{STATUS_MAP.get(status_atual, status_atual)}", '
+            f'não "{STATUS_MAP.get(status_esperado, status_esperado)}".',
+            status_http=409,
+        )
+    if status_atual == STATUS_CONCLUIDO:
+        return TransicaoInvalida('Pedido já concluído.')
+    if status_atual in TRANSICOES and status_atual not in transicoes:
+        return TransicaoInvalida(MENSAGEM_DESPACHO, status_http=409)
+    return TransicaoInvalida('Pedido não está em estado processável.')
+
+
+# Avança o status do pedido com um único update condicional (compare-and-set): o filtro
+# exige o status de origem, então dois cliques simultâneos não avançam o pedido duas
+# vezes e o resto do documento (pecas, data) nunca é regravado. Com status_esperado
+# o chamador diz de qual status parte; sem ele, qualquer status com transição serve.
+# Lança Pedido.DoesNotExist ou TransicaoInvalida (com o status HTTP sugerido).
+# Com DESPACHO_AUTOMATICO o início (pendente -> em andamento) fica com o despachante.
+def avancar_status(pedido_id, status_esperado=None):
+    transicoes = transicoes_manuais()
+    if status_esperado is not None and status_esperado not in transicoes:
+        if status_esperado in TRANSICOES:
+            raise TransicaoInvalida(MENSAGEM_DESPACHO, status_http=409)
+        raise TransicaoInvalida(f'Não há transição a partir do status {status_esperado}.')
+    filtro_status, atualizacao = _atualizacao(status_esperado, transicoes)
+    anterior = get_database()[Pedido._meta.db_table].find_one_and_update(
+        {'id': pedido_id, 'status': filtro_status},
+        atualizacao,
+        projection={'_id': 0, 'status': 1},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if anterior is None:
+        raise _erro(pedido_id, status_esperado, transicoes)
+
+    transicao = Transicao(pedido_id, anterior['status'], TRANSICOES[anterior['status']])
+    registrar_transicao(pedido_id, transicao.status_anterior, transicao.status_novo)
+    return transicao
@@ -1,12 +1,18 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, views_async
+
+# Com VIEWS_ASYNC as views de maior tráfego são servidas pelas versões assíncronas
+views_principais = views_async if settings.VIEWS_ASYNC else views
 
 urlpatterns = [
-    path('', views.home, name='home'),
-    path('pedidos/', views.novoPedido, name='novoPedido'),
-    path('pedidos/historico', views.historico, name='historico'), 
-    path('api/graficoPedidos/', views.getGraficoPedidos, name='graficoPedidos'),
-    path('api/pedidos/<int:pedido_id>/updateStatus/', views.updateStatusPedido, name='updateStatusPedido')
+    path('', views_principais.home, name='home'),
+    path('pedidos/', views_principais.novoPedido, name='novoPedido'),
+    path('pedidos/historico', views_principais.historico, name='historico'),
+    path('pedidos/json/', views.pedidos_json, name='pedidosJson'),
+    path('pedidos/exportar/', views.exportar_pedidos, name='exportarPedidos'),
+    path('api/pedidos/lote/', views.novosPedidosLote, name='novosPedidosLote'),
+    path('api/graficoPedidos/', views_principais.getGraficoPedidos, name='graficoPedidos'),
+    path('api/pedidos/<int:pedido_id>/updateStatus/', views.updateStatusPedido, name='updateStatusPedido'),
+    path('metrics', views.metricas_prometheus, name='metricas'),
 ]
-
-    
\ No newline at end of file
@@ -0,0 +1,21 @@
+from pymongo import ReturnDocument
+from .mongo import get_database
+
+# Contadores de versão compartilhados entre processos, um documento por chave:
+# {'_id': 'historico', 'valor': 42}
+COLECAO_VERSOES = 'dashboard_versoes'
+
+
+def proxima_versao(chave):
+    doc = get_database()[COLECAO_VERSOES].find_one_and_update(
+        {'_id': chave},
+        {'$inc': {'valor': 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc['valor']
+
+
+def versao_atual(chave):
+    doc = get_database()[COLECAO_VERSOES].find_one({'_id': chave})
+    return doc['valor'] if doc else 0
@@ -1,259 +1,259 @@
-from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
+from django.shortcuts import render
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.utils import timezone
 from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-from .models import Pedido, Peca
-from datetime import timedelta
-from collections import defaultdict
-from django.db import transaction
+from .models import Pedido, PEDIDO_STATUS_CHOICES, PRIORIDADE_CHOICES, PRIORIDADE_NORMAL
+from .catalogo import get_catalogo
+from .paginacao import parse_filtros_historico, buscar_pagina_pedidos
+from .exportacao import FORMATOS, gerar_exportacao, nome_arquivo, parse_exportacao
+from .historico_delta import montar_delta_historico
+from .serializacao import STATUS_MAP, formatar_pedidos
+from .graficos import PERIODOS, PERIODO_PADRAO, dados_grafico_pedidos
+from .pedidos import PEDIDOS_LOTE_MAXIMO, ids_pecas_cadastradas, validar_pecas_pedido, criar_pedidos_em_lote, parse_prioridade
+from .despacho import apos_mudanca_na_fila
+from .transicoes import TransicaoInvalida, avancar_status, parse_status_esperado
+from .contadores import criado_pela_aplicacao, registrar_criacao
+from .robo import estado_robo
+from . import metricas
+from .codificacao import RespostaJson, loads
+from .cache_respostas import responder_versionado
+from .broadcast import get_dashboard_data, broadcast_sync, frame_dashboard_update, frame_nova_notificacao, frame_toast
 import traceback
 import json
-from django.conf import settings
-from pymongo import MongoClient
 
-def home(request):
-    em_andamento_count = Pedido.objects.filter(status=1).count()
-    pedidos_concluidos_count = Pedido.objects.filter(status=0).count()
-    total_pedidos = em_andamento_count + pedidos_concluidos_count
-    pedido_pendente = Pedido.objects.filter(status=2).first()
-
-    mongo_uri = settings.DATABASES['default'].get('CLIENT', {}).get('host', 'mongodb://localhost:27017/')
-    mongo_db_name = settings.DATABASES['default'].get('NAME', 'pi-iv')
-
-    client = MongoClient(mongo_uri)
-    db = client[mongo_db_name]
-    collection = db['dashboard_robo']
+def _contexto_home():
+    dashboard_data = get_dashboard_data()
+    return {
+        'em_andamento_count': dashboard_data['em_andamento_count'],
+        'concluido_count': dashboard_data['concluido_count'],
+        'total_pedidos_count': dashboard_data['total_pedidos_count'],
+        'pedido_pendente': dashboard_data['pending_order'],
+        'estado_robo': estado_robo(),
+    }
 
-    robo_status_doc = collection.find_one(sort=[('_id', -1)])
 
-    estado_robo = robo_status_doc.get('status', 'Desconhecido') if robo_status_doc else 'Desconhecido'
+def home(request):
+    return render(request, 'home.html', _contexto_home())
 
-    client.close()
 
-    return render(request, 'home.html', {
-        'em_andamento_count': em_andamento_count,
-        'concluido_count': pedidos_concluidos_count,
-        'total_pedidos_count': total_pedidos,
-        'pedido_pendente': pedido_pendente,
-        'estado_robo': estado_robo,
-    })
+# Valida e cria um pedido pendente e devolve (status_http, resposta, frames para o grupo).
+# Compartilhado pela view síncrona e pela assíncrona (dashboard/views_async.py).
+def _criar_pedido(body):
+    try:
+        data_json = loads(body)
+        try:
+            matriz_pecas_ids = validar_pecas_pedido(data_json, ids_pecas_cadastradas())
+            prioridade = parse_prioridade(data_json.get('prioridade'))
+        except ValueError as e:
+            return 400, {'message': str(e)}, ()
+
+        # Vários pedidos podem aguardar na fila; o despacho segue prioridade e chegada
+        pedido = criado_pela_aplicacao(Pedido(pecas=matriz_pecas_ids, status=2, prioridade=prioridade))
+        pedido.save(force_insert=True)
+        registrar_criacao(pedido)
+
+        frames = (
+            frame_nova_notificacao(
+                "Novo Pedido Criado!",
+                f"O pedido #{pedido.id} foi criado e está pendente.",
+                "pedido_criado",
+                f"/pedidos/historico?search={pedido.id}"
+            ),
+            frame_dashboard_update(),
+            frame_toast(f'✅ Pedido #{pedido.id} criado com sucesso!', 'success'),
+            montar_delta_historico([pedido.id]),
+            *apos_mudanca_na_fila(),
+        )
+        return 201, {'message': 'Pedido criado com sucesso!', 'pedido_id': str(pedido.id)}, frames
+
+    except json.JSONDecodeError:
+        return 400, {'message': 'JSON inválido.'}, ()
+    except Exception as e:
+        traceback.print_exc()
+        return 500, {'message': f'Erro interno: {str(e)}'}, (frame_toast('❌ Erro interno ao criar o pedido.', 'error'),)
+
+
+def _contexto_novo_pedido():
+    pecas = get_catalogo().values()
+    return {
+        'pecas_cadastradas': [{'id': p.id, 'name': p.name, 'tipo': p.tipo} for p in pecas],
+        'prioridades': PRIORIDADE_CHOICES,
+        'prioridade_padrao': PRIORIDADE_NORMAL,
+    }
 
 
 @csrf_exempt
 def novoPedido(request):
-    channel_layer = get_channel_layer()
-
     if request.method == 'POST':
-        try:
-            data_json = json.loads(request.body)
-            pecas_ids = []
-            for i in range(1, 10):
-                peca_str_id = data_json.get(f'peca{i}')
-                if peca_str_id is None:
-                    return JsonResponse({'message': f'Peça {i} não fornecida.'}, status=400)
-                try:
-                    peca_id = int(peca_str_id)
-                    peca = Peca.objects.get(id=peca_id)
-                    pecas_ids.append(peca.id)
-                except (ValueError, Peca.DoesNotExist):
-                    return JsonResponse({'message': f'Peça inválida ou não encontrada: {peca_str_id}'}, status=400)
-
-            matriz_pecas_ids = [pecas_ids[i:i+3] for i in range(0, 9, 3)]
-            for idx, montagem in enumerate(matriz_pecas_ids, 1):
-                if len(set(montagem)) < 3:
-                    return JsonResponse({'message': f'Montagem {idx} contém peças repetidas.'}, status=400)
-
-            with transaction.atomic():
-                if Pedido.objects.filter(status=2).exists():
-                    return JsonResponse({'message': '🚨 Já existe um pedido pendente.'}, status=409)
-                pedido = Pedido.objects.create(pecas=matriz_pecas_ids, status=2)
-
-            async_to_sync(channel_layer.group_send)(
-                'dashboard_updates',
-                {
-                    'type': 'notification.create',
-                    'titulo': f"Novo Pedido Criado!",
-                    'mensagem': f"O pedido #{pedido.id} foi criado e está pendente.",
-                    'tipo': "pedido_criado",
-                    'link': f"/pedidos/historico?search={pedido.id}"
-                }
-            )
-            async_to_sync(channel_layer.group_send)(
-                'dashboard_updates',
-                {'type': 'dashboard_update_trigger'}
-            )
-            async_to_sync(channel_layer.group_send)(
-                'dashboard_updates',
-                {
-                    'type': 'dashboard.message',
-                    'message_type': 'show_toast',
-                    'toast_message': f'✅ Pedido #{pedido.id} criado com sucesso!',
-                    'toast_type': 'success'
-                }
-            )
-            return JsonResponse({'message': 'Pedido criado com sucesso!', 'pedido_id': str(pedido.id)}, status=201)
-
-        except json.JSONDecodeError:
-            return JsonResponse({'message': 'JSON inválido.'}, status=400)
-        except Exception as e:
-            traceback.print_exc()
-            async_to_sync(channel_layer.group_send)(
-                'dashboard_updates',
-                {
-                    'type': 'dashboard.message',
-                    'message_type': 'show_toast',
-                    'toast_message': '❌ Erro interno ao criar o pedido.',
-                    'toast_type': 'error'
-                }
-            )
-            return JsonResponse({'message': f'Erro interno: {str(e)}'}, status=500)
+        status, resposta, frames = _criar_pedido(request.body)
+        if frames:
+            broadcast_sync(*frames, channel_layer=get_channel_layer())
+        return RespostaJson(resposta, status=status)
 
     elif request.method == 'GET':
-        pecas = Peca.objects.all()
-        return render(request, 'novoPedido.html', {
-            'pecas_cadastradas': [{'id': p.id, 'name': p.name, 'tipo': p.tipo} for p in pecas]
-        })
-
-    return JsonResponse({'message': 'Método não permitido.'}, status=405)
-
-def updateStatusPedido(request, pedido_id):
-    pedido = get_object_or_404(Pedido, id=pedido_id)
+        return render(request, 'novoPedido.html', _contexto_novo_pedido())
 
-    if pedido.status == 2:
-        pedido.status = 1
-        msg_status = "Em Andamento"
-    elif pedido.status == 1:
-        pedido.status = 0
-        msg_status = "Concluído"
-    else:
-        return JsonResponse({'status': 'error', 'message': 'Pedido já concluído.'}, status=400)
+    return RespostaJson({'message': 'Método não permitido.'}, status=405)
 
-    pedido.save()
+@csrf_exempt
+def novosPedidosLote(request):
+    if request.method != 'POST':
+        return RespostaJson({'message': 'Método não permitido.'}, status=405)
+
+    try:
+        data_json = loads(request.body)
+    except json.JSONDecodeError:
+        return RespostaJson({'message': 'JSON inválido.'}, status=400)
+
+    itens = data_json.get('pedidos') if isinstance(data_json, dict) else data_json
+    if not isinstance(itens, list) or not itens:
+        return RespostaJson({'message': 'Envie uma lista não vazia de pedidos em "pedidos".'}, status=400)
+    if len(itens) > PEDIDOS_LOTE_MAXIMO:
+        return RespostaJson({'message': f'Lote muito grande: máximo de {PEDIDOS_LOTE_MAXIMO} pedidos.'}, status=400)
+
+    # Uma única consulta ao catálogo de peças para validar o lote inteiro
+    ids_validos = ids_pecas_cadastradas()
+    prioridade_lote = data_json.get('prioridade') if isinstance(data_json, dict) else None
+    matrizes, prioridades, erros = [], [], []
+    for indice, item in enumerate(itens):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError('Cada pedido deve ser um objeto com peca1..peca9.')
+            matrizes.append(validar_pecas_pedido(item, ids_validos))
+            prioridades.append(parse_prioridade(item.get('prioridade', prioridade_lote)))
+        except ValueError as e:
+            erros.append({'indice': indice, 'message': str(e)})
+    if erros:
+        return RespostaJson({'message': 'Nenhum pedido foi criado: o lote contém pedidos inválidos.', 'erros': erros}, status=400)
 
     channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        'dashboard_updates',
-        {
-            'type': 'notification.create',
-            'titulo': f"Status do Pedido #{pedido.id} Atualizado!",
-            'mensagem': f"O pedido #{pedido.id} foi marcado como '{msg_status}'.",
-            'tipo': "pedido_status",
-            'link': f"/pedidos/historico?search={pedido.id}"
-        }
+    try:
+        pedidos = criar_pedidos_em_lote(matrizes, prioridades=prioridades)
+        registrar_criacao(*pedidos)
+    except Exception as e:
+        traceback.print_exc()
+        broadcast_sync(frame_toast('❌ Erro interno ao criar o lote de pedidos.', 'error'), channel_layer=channel_layer)
+        return RespostaJson({'message': f'Erro interno: {str(e)}'}, status=500)
+
+    pedido_ids = [p.id for p in pedidos]
+    broadcast_sync(
+        frame_nova_notificacao(
+            f"{len(pedido_ids)} Novos Pedidos Criados!",
+            f"Os pedidos #{pedido_ids[0]} a #{pedido_ids[-1]} foram criados e estão pendentes.",
+            "pedido_criado",
+            "/pedidos/historico?status=2"
+        ),
+        frame_dashboard_update(),
+        frame_toast(f'✅ {len(pedido_ids)} pedidos criados em lote!', 'success'),
+        montar_delta_historico(pedido_ids),
+        *apos_mudanca_na_fila(),
+        channel_layer=channel_layer
     )
-    async_to_sync(channel_layer.group_send)(
-        'dashboard_updates',
-        {'type': 'dashboard_update_trigger'}
+    return RespostaJson({'message': f'{len(pedido_ids)} pedidos criados com sucesso!', 'pedido_ids': pedido_ids}, status=201)
+
+# ?de=<status> torna a mudança condicional: se o pedido já saiu desse status (outro
+# clique, outra aba, o despacho automático), responde 409 em vez de avançar de novo.
+def updateStatusPedido(request, pedido_id):
+    try:
+        transicao = avancar_status(pedido_id, parse_status_esperado(request.GET.get('de')))
+    except Pedido.DoesNotExist:
+        raise Http404('Pedido não encontrado.')
+    except TransicaoInvalida as e:
+        return RespostaJson({'status': 'error', 'message': str(e)}, status=e.status_http)
+
+    msg_status = STATUS_MAP[transicao.status_novo]
+    broadcast_sync(
+        frame_nova_notificacao(
+            f"Status do Pedido #{pedido_id} Atualizado!",
+            f"O pedido #{pedido_id} foi marcado como '{msg_status}'.",
+            "pedido_status",
+            f"/pedidos/historico?search={pedido_id}"
+        ),
+        frame_dashboard_update(),
+        frame_toast(f'Status do pedido #{pedido_id} atualizado para "{msg_status}".', 'success'),
+        montar_delta_historico([pedido_id]),
+        *apos_mudanca_na_fila(pedido_id, transicao.status_novo),
+        channel_layer=get_channel_layer()
     )
-    async_to_sync(channel_layer.group_send)(
-        'dashboard_updates',
-        {
-            'type': 'dashboard.message',
-            'message_type': 'show_toast',
-            'toast_message': f'Status do pedido #{pedido.id} atualizado para "{msg_status}".',
-            'toast_type': 'success'
-        }
+    return RespostaJson({'status': 'success', 'message': 'Status atualizado com sucesso!'})
+
+def _contexto_historico(params):
+    erro_filtros = None
+    try:
+        filtros = parse_filtros_historico(params)
+    except ValueError as e:
+        # Parâmetros inválidos na URL: mostra a primeira página sem filtros e o motivo
+        erro_filtros = str(e)
+        filtros = parse_filtros_historico({})
+    pedidos, next_cursor = buscar_pagina_pedidos(**filtros)
+    pedidos_formatados = formatar_pedidos(pedidos)
+
+    proxima_pagina = None
+    if next_cursor is not None:
+        proxima = params.copy()
+        proxima['cursor'] = next_cursor
+        proxima_pagina = proxima.urlencode()
+
+    return {
+        'pedidos': pedidos_formatados,
+        'next_cursor': next_cursor,
+        'proxima_pagina': proxima_pagina,
+        'filtros': params,
+        'erro_filtros': erro_filtros,
+        'status_choices': PEDIDO_STATUS_CHOICES,
+    }
+
+
+def _resposta_historico(request):
+    return responder_versionado(
+        request, 'historico', lambda: render(request, 'historico.html', _contexto_historico(request.GET)), catalogo=True,
     )
-    return JsonResponse({'status': 'success', 'message': 'Status atualizado com sucesso!'})
+
 
 def historico(request):
-    pedidos = Pedido.objects.all()
-    all_pecas = {p.id: p for p in Peca.objects.all()}
-
-    status_map = {0: "Concluído", 1: "Em Andamento", 2: "Pendente", 3: "Cancelado"}
-    pedidos_formatados = []
-
-    for pedido in pedidos:
-        pecas_ids, pecas_shapes, pecas_names = [], [], []
-        if isinstance(pedido.pecas, list):
-            for montagem in pedido.pecas:
-                if isinstance(montagem, list):
-                    for pid in montagem:
-                        peca = all_pecas.get(pid)
-                        if peca:
-                            pecas_ids.append(peca.id)
-                            pecas_shapes.append(peca.tipo)
-                            pecas_names.append(peca.name)
-                        else:
-                            pecas_ids.append(None)
-                            pecas_shapes.append("desconhecida")
-                            pecas_names.append("Peça não encontrada")
-        pedidos_formatados.append({
-            'id': pedido.id,
-            'status': status_map.get(pedido.status, "Desconhecido"),
-            'pecas_list_ids': pecas_ids,
-            'pecas_list_shapes': pecas_shapes,
-            'pecas_list_names': pecas_names,
-            'data': pedido.data.strftime("%d/%m/%Y %H:%M") if pedido.data else "Sem data"
-        })
-
-    pedidos_formatados.sort(key=lambda p: p['id'], reverse=True)
-    return render(request, 'historico.html', {'pedidos': pedidos_formatados})
+    return _resposta_historico(request)
+
+def _json_pedidos(params):
+    try:
+        filtros = parse_filtros_historico(params)
+    except ValueError as e:
+        return RespostaJson({'message': str(e)}, status=400)
+    pedidos, next_cursor = buscar_pagina_pedidos(**filtros)
+    return RespostaJson({'pedidos': formatar_pedidos(pedidos), 'next_cursor': next_cursor})
+
 
 def pedidos_json(request):
-    pedidos = Pedido.objects.all()
-    all_pecas = {p.id: p for p in Peca.objects.all()}
-
-    status_map = {0: "Concluído", 1: "Em Andamento", 2: "Pendente"}
-    pedidos_formatados = []
-
-    for pedido in pedidos:
-        pecas_ids, pecas_shapes, pecas_names = [], [], []
-        if isinstance(pedido.pecas, list):
-            for montagem in pedido.pecas:
-                if isinstance(montagem, list):
-                    for pid in montagem:
-                        peca = all_pecas.get(pid)
-                        if peca:
-                            pecas_ids.append(peca.id)
-                            pecas_shapes.append(peca.tipo)
-                            pecas_names.append(peca.name)
-                        else:
-                            pecas_ids.append(None)
-                            pecas_shapes.append("desconhecida")
-                            pecas_names.append("Peça não encontrada")
-        pedidos_formatados.append({
-            'id': pedido.id,
-            'status': status_map.get(pedido.status, "Desconhecido"),
-            'pecas_list_ids': pecas_ids,
-            'pecas_list_shapes': pecas_shapes,
-            'pecas_list_names': pecas_names,
-            'data': pedido.data.strftime("%d/%m/%Y %H:%M") if pedido.data else "Sem data"
-        })
-
-    pedidos_formatados.sort(key=lambda p: p['id'], reverse=True)
-    return JsonResponse({'pedidos': pedidos_formatados})
+    return responder_versionado(request, 'pedidos', lambda: _json_pedidos(request.GET), catalogo=True)
+
+# Versão WSGI (e do cliente de testes). Sob ASGI a mesma URL é atendida pelo
+# ExportacaoConsumer (dashboard.routing): o Django 3.1 itera o StreamingHttpResponse
+# no event loop, e cada lote lido do MongoDB travaria o worker inteiro.
+def exportar_pedidos(request):
+    try:
+        formato, filtros = parse_exportacao(request.GET)
+    except ValueError as e:
+        return RespostaJson({'message': str(e)}, status=400)
+
+    # O catálogo é carregado aqui (thread da view) e o gerador só usa o pymongo
+    response = StreamingHttpResponse(gerar_exportacao(formato, filtros, get_catalogo()), content_type=FORMATOS[formato][0])
+    response['Content-Disposition'] = f'attachment; filename="{nome_arquivo(formato)}"'
+    return response
+
+def _periodo_grafico(params):
+    period = params.get('period', PERIODO_PADRAO)
+    return period if period in PERIODOS else PERIODO_PADRAO
+
+
+def _resposta_grafico(request):
+    return responder_versionado(
+        request, 'grafico', lambda: RespostaJson(dados_grafico_pedidos(_periodo_grafico(request.GET))), por_dia=True,
+    )
+
 
 def getGraficoPedidos(request):
-    period = request.GET.get('period', '7days')
-    end_date = timezone.now().date()
-
-    if period == '30days':
-        start_date = end_date - timedelta(days=29)
-    elif period == 'this_month':
-        start_date = end_date.replace(day=1)
-    else:
-        start_date = end_date - timedelta(days=6)
-
-    pedidos = Pedido.objects.all()
-    created, completed = defaultdict(int), defaultdict(int)
-
-    for day in (start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)):
-        created[day] = 0
-        completed[day] = 0
-
-    for pedido in pedidos:
-        pedido_day = pedido.data.date()
-        if start_date <= pedido_day <= end_date:
-            created[pedido_day] += 1
-            if pedido.status == 0:
-                completed[pedido_day] += 1
-
-    labels = [d.strftime("%d/%m") for d in sorted(created)]
-    return JsonResponse({
-        'labels': labels,
-        'created_counts': [created[d] for d in sorted(created)],
-        'completed_counts': [completed[d] for d in sorted(completed)],
-    })
+    return _resposta_grafico(request)
+
+
+# Métricas deste processo no formato texto do Prometheus (ver dashboard/instrumentacao.py)
+def metricas_prometheus(request):
+    return HttpResponse(metricas.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,41 @@
+from django.shortcuts import render
+from .broadcast import broadcast
+from .codificacao import RespostaJson
+from .executor import em_executor
+from . import views
+
+# Versões assíncronas das views mais acessadas, ligadas em dashboard/urls.py quando
+# settings.VIEWS_ASYNC está ativo. A lógica é a mesma das views síncronas (funções
+# _contexto_* / _criar_pedido em views.py); só a parte bloqueante vai para o executor
+# limitado e o group_send é aguardado direto no event loop, sem async_to_sync.
+
+
+async def home(request):
+    return await em_executor(lambda: render(request, 'home.html', views._contexto_home()))
+
+
+async def novoPedido(request):
+    if request.method == 'POST':
+        status, resposta, frames = await em_executor(views._criar_pedido, request.body)
+        if frames:
+            await broadcast(*frames)
+        return RespostaJson(resposta, status=status)
+
+    elif request.method == 'GET':
+        return await em_executor(lambda: render(request, 'novoPedido.html', views._contexto_novo_pedido()))
+
+    return RespostaJson({'message': 'Método não permitido.'}, status=405)
+
+
+# No Django 3.1 o @csrf_exempt embrulha a view numa função síncrona, o que faria o
+# handler tratar a corrotina como view síncrona; marcamos a isenção direto.
+novoPedido.csrf_exempt = True
+
+
+# Versão, cache e montagem da resposta (views._resposta_*) rodam juntas no executor
+async def historico(request):
+    return await em_executor(views._resposta_historico, request)
+
+
+async def getGraficoPedidos(request):
+    return await em_executor(views._resposta_grafico, request)
@@ -1,13 +1,23 @@
 import os
 from django.core.asgi import get_asgi_application
+from django.urls import re_path
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 import dashboard.routing # Importa o routing da sua app dashboard
+from dashboard.checks import avisar_indices_na_subida
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'setup.settings')
 
+django_asgi_app = get_asgi_application()
+
+# O Daphne não roda as checagens do Django: índices faltando vão para o log na subida
+avisar_indices_na_subida()
+
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+    # Exportação em streaming por um consumer assíncrono; o resto vai para o Django
+    "http": URLRouter(
+        dashboard.routing.http_urlpatterns + [re_path(r'', django_asgi_app)]
+    ),
     "websocket": AuthMiddlewareStack(
         URLRouter(
             dashboard.routing.websocket_urlpatterns
@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'dashboard.instrumentacao.InstrumentacaoMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,12 +81,39 @@ WSGI_APPLICATION = 'setup.wsgi.application'
 ASGI_APPLICATION = "setup.asgi.application"
 
 
-# Example for development (no Redis needed)
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer',
-    },
-}
+# Channel layer escolhido por variável de ambiente:
+#   CHANNEL_LAYER=memory        -> InMemoryChannelLayer (padrão, um único processo)
+#   CHANNEL_LAYER=redis         -> channels_redis (vários workers Daphne compartilhando grupos)
+#   CHANNEL_LAYER=redis_pubsub  -> channels_redis com Redis Pub/Sub
+CHANNEL_LAYER = os.getenv('CHANNEL_LAYER', 'memory')
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+if CHANNEL_LAYER == 'redis':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [REDIS_URL],
+                'capacity': int(os.getenv('CHANNEL_LAYER_CAPACITY', 1500)),
+                'expiry': 10,
+            },
+        },
+    }
+elif CHANNEL_LAYER == 'redis_pubsub':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.pubsub.RedisPubSubChannelLayer',
+            'CONFIG': {
+                'hosts': [REDIS_URL],
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
 
 
 # Database
@@ -94,12 +122,94 @@ CHANNEL_LAYERS = {
 DATABASES = {
     'default': {
         'ENGINE': 'djongo',
-        'NAME': 'pi-iv',
-        'HOST': 'localhost',
-        'PORT': 27017,
+        'NAME': os.getenv('MONGO_DB', 'pi-iv'),
+        # Repassado ao MongoClient do djongo e ao cliente compartilhado de dashboard/mongo.py.
+        # O djongo ignora HOST/PORT no nível de cima, então o servidor vai em CLIENT['host']
+        'CLIENT': {
+            'host': f"mongodb://{os.getenv('MONGO_HOST', 'localhost')}:{int(os.getenv('MONGO_PORT', 27017))}/",
+            'maxPoolSize': int(os.getenv('MONGO_MAX_POOL_SIZE', 50)),
+            'minPoolSize': int(os.getenv('MONGO_MIN_POOL_SIZE', 0)),
+        },
     }
 }
 
+# Instrumentação (dashboard/instrumentacao.py): tempos, comandos MongoDB e bytes por
+# requisição/mensagem, expostos em /metrics. Unidades mais lentas que o limite são
+# registradas como WARNING no logger 'dashboard.instrumentacao' (as demais em DEBUG).
+INSTRUMENTACAO_ATIVA = os.getenv('INSTRUMENTACAO_ATIVA', '1') == '1'
+INSTRUMENTACAO_LENTO_MS = float(os.getenv('INSTRUMENTACAO_LENTO_MS', 500))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'dashboard.instrumentacao': {
+            'handlers': ['console'],
+            'level': os.getenv('INSTRUMENTACAO_LOG_NIVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# Serve home, novoPedido, historico e o gráfico pelas views assíncronas
+# (dashboard/views_async.py); a parte bloqueante roda num pool de ASYNC_VIEWS_THREADS threads.
+VIEWS_ASYNC = os.getenv('VIEWS_ASYNC', '0') == '1'
+ASYNC_VIEWS_THREADS = int(os.getenv('ASYNC_VIEWS_THREADS', 8))
+
+# Tempo (s) que o último status do robô fica em cache na home; 0 desativa o cache
+ROBO_STATUS_CACHE_TTL = float(os.getenv('ROBO_STATUS_CACHE_TTL', 2))
+
+# Retenção de notificações (dashboard/retencao.py): lidas com mais de N dias vão para o
+# arquivo. O job roda via `python manage.py arquivar_notificacoes` ou, se o intervalo
+# for maior que zero, periodicamente dentro do servidor ASGI.
+NOTIFICACOES_RETENCAO_DIAS = int(os.getenv('NOTIFICACOES_RETENCAO_DIAS', 30))
+NOTIFICACOES_RETENCAO_INTERVALO_HORAS = float(os.getenv('NOTIFICACOES_RETENCAO_INTERVALO_HORAS', 0))
+
+# Quantos pedidos já formatados (dashboard/serializacao.py) cada processo mantém em memória
+SERIALIZACAO_MEMO_MAX = int(os.getenv('SERIALIZACAO_MEMO_MAX', 10000))
+
+# Backend de JSON para frames do WebSocket e respostas da API (dashboard/codificacao.py):
+# 'auto' usa o orjson se estiver instalado, senão a biblioteca padrão
+JSON_BACKEND = os.getenv('JSON_BACKEND', 'auto')
+
+# Janela (ms) em que broadcasts do mesmo processo são mesclados num único envio ao grupo
+# (dashboard/coalescencia.py); 0 envia cada evento na hora
+BROADCAST_JANELA_MS = int(os.getenv('BROADCAST_JANELA_MS', 100))
+
+# Cache das respostas de leitura (histórico, /pedidos/json/, gráfico), chaveado pela
+# versão dos dados (dashboard/cache_respostas.py). Em memória por processo; o TIMEOUT
+# limita quanto tempo respostas de versões antigas continuam ocupando espaço.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'respostas': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'dashboard-respostas',
+        'TIMEOUT': int(os.getenv('RESPOSTAS_CACHE_TTL', 30)),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('RESPOSTAS_CACHE_MAX', 500))},
+    },
+}
+
+# Intervalo (s) em que cada processo confere se o catálogo de peças mudou em outro processo
+CATALOGO_VERIFICACAO_SEGUNDOS = float(os.getenv('CATALOGO_VERIFICACAO_SEGUNDOS', 5))
+
+# Monitor da coleção dashboard_robo (dashboard/robo_stream.py). Com mais de um worker,
+# desative o autostart e rode `python manage.py monitorar_robo` em um único processo.
+ROBO_STREAM_AUTOSTART = os.getenv('ROBO_STREAM_AUTOSTART', '1') == '1'
+ROBO_STREAM_JANELA = float(os.getenv('ROBO_STREAM_JANELA', 0.2))
+ROBO_STREAM_POLLING = float(os.getenv('ROBO_STREAM_POLLING', 0.5))
+
+
+# Fila de pedidos (dashboard/despacho.py): com o despacho automático, o próximo pedido
+# pendente (por prioridade e chegada) vai para 'Em Andamento' assim que o robô reporta
+# o estado ocioso em dashboard_robo.
+DESPACHO_AUTOMATICO = os.getenv('DESPACHO_AUTOMATICO', '0') == '1'
+ROBO_ESTADO_OCIOSO = os.getenv('ROBO_ESTADO_OCIOSO', 'Ocioso')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators